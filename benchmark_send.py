@@ -0,0 +1,296 @@
+#!/usr/bin/env python3
+"""
+Banc de performance des modes d'envoi d'emails
+Association Gamadji Saré
+
+Démarre un serveur SMTP local (puits), génère des fichiers de destinataires
+synthétiques et mesure chaque mode d'envoi, sans délai artificiel :
+- sync          : EmailSender.send_bulk_emails (boucle synchrone)
+- celery        : send_email_task, une tâche par destinataire (mode eager, sans broker)
+- celery-batch  : send_batch_task, une tâche par lot (mode eager, sans broker)
+- asyncio       : AsyncEmailSender (sessions SMTP concurrentes)
+
+Chaque mesure tourne dans un processus séparé et rapporte : emails/s,
+latences p50/p95/p99 par message, temps CPU et pic de mémoire (RSS).
+Les résultats sont ajoutés en JSON (une ligne par mesure) pour pouvoir
+comparer les exécutions entre elles.
+"""
+
+import sys
+import os
+import argparse
+import csv
+import json
+import resource
+import subprocess
+import tempfile
+import time
+from datetime import datetime
+
+# Ajouter le dossier racine au path pour les imports
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+ENGINES = ["sync", "celery", "celery-batch", "asyncio"]
+
+
+def generate_recipients(path, count):
+    """Génère un CSV de destinataires synthétiques"""
+    with open(path, "w", newline="", encoding="utf-8") as csvfile:
+        writer = csv.writer(csvfile)
+        writer.writerow(["name", "email"])
+        for i in range(count):
+            writer.writerow([f"Destinataire {i}", f"destinataire{i}@example.org"])
+
+
+def generate_template(path, personalize=False):
+    """
+    Génère un template représentatif (texte, photos et vidéos), avec des
+    champs de fusion ({{name}}, {{email}}) si personalize=True
+    """
+    from scripts.template_html import EmailTemplate
+
+    photos = [{
+        'id': f"photo{i}",
+        'direct_url': f"https://drive.google.com/thumbnail?id=photo{i}&sz=w1000-h1000",
+        'thumbnail_url': f"https://drive.google.com/thumbnail?id=photo{i}&sz=w800-h800",
+        'info': {'name': f"Fichier_photo{i}"}
+    } for i in range(5)]
+    videos = [{
+        'thumbnail_url': f"https://drive.google.com/thumbnail?id=video{i}&sz=w480-h480",
+        'direct_link': f"https://drive.google.com/file/d/video{i}/view",
+        'info': {'name': f"Fichier_video{i}"}
+    } for i in range(2)]
+    text = "\n\n".join(["Nouvelles du village de Gamadji Saré. " * 20] * 5)
+    if personalize:
+        text = "Bonjour {{name}},\n\n" + text + "\n\nMessage envoyé à {{email}}"
+
+    html = EmailTemplate().generate("Banc de performance", text, photos, videos,
+                                    datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(html)
+
+
+def percentile(values, fraction):
+    """Percentile simple (valeurs triées, plus proche rang)"""
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(fraction * (len(values) - 1))))]
+
+
+def run_engine(engine, port, template_path, csv_path, batch_size, concurrency):
+    """Exécute un mode d'envoi (dans le processus enfant) et retourne ses mesures"""
+    from scripts.email_sender import journal, rate_limit, worker_state
+    from scripts.email_sender.mail import EmailSender
+
+    env_vars = {
+        "EMAIL_SENDER": "bench@example.org",
+        "EMAIL_PASSWORD": "bench",
+        "SMTP_SERVER": "127.0.0.1",
+        "SMTP_PORT": str(port),
+        "SMTP_USE_TLS": "false",
+    }
+    sender = EmailSender(template_path=template_path, env_vars=env_vars)
+    sender.destinataires_path = csv_path
+    journal.JOURNAL_DIR = os.path.join(os.path.dirname(csv_path), "journal")
+
+    # Mesurer la latence de chaque envoi côté expéditeur
+    latencies = []
+    send_html_email = sender.send_html_email
+
+    def timed_send(*args, **kwargs):
+        started = time.perf_counter()
+        result = send_html_email(*args, **kwargs)
+        latencies.append(time.perf_counter() - started)
+        return result
+
+    sender.send_html_email = timed_send
+
+    with open(csv_path, "r", encoding="utf-8") as csvfile:
+        recipients = [{'email': row['email'], 'name': row['name']} for row in csv.DictReader(csvfile)]
+
+    usage_before = resource.getrusage(resource.RUSAGE_SELF)
+    started = time.perf_counter()
+    failed = 0
+
+    if engine == "sync":
+        sender.send_bulk_emails(resume=False, delay_between_emails=0)
+
+    elif engine in ("celery", "celery-batch"):
+        from scripts.email_sender.celery_config import celery_app
+        from scripts.email_sender.tasks import send_batch_task, send_email_task
+
+        celery_app.conf.task_always_eager = True
+        worker_state.set_sender(sender)
+        rate_limit._limiter = rate_limit.RedisTokenBucket(None, "bench", {})
+
+        if engine == "celery":
+            for recipient in recipients:
+                result = send_email_task.apply(args=[recipient['email'], recipient['name'], template_path])
+                failed += result.result.get('status') != 'success'
+        else:
+            for start in range(0, len(recipients), batch_size):
+                result = send_batch_task.apply(kwargs={
+                    'recipients': recipients[start:start + batch_size],
+                    'template_path': template_path
+                })
+                failed += result.result['total'] - result.result['sent']
+
+    elif engine == "asyncio":
+        from scripts.email_sender.async_sender import AsyncEmailSender
+
+        stats = AsyncEmailSender(sender, concurrency=concurrency, rate_per_minute=0).send_bulk_emails()
+        latencies = stats["latencies"]
+        failed = len(stats["failed"])
+
+    else:
+        raise ValueError(f"Mode d'envoi inconnu: {engine}")
+
+    elapsed = time.perf_counter() - started
+    usage_after = resource.getrusage(resource.RUSAGE_SELF)
+    sender.pool.close_all()
+
+    cpu = (usage_after.ru_utime - usage_before.ru_utime) + (usage_after.ru_stime - usage_before.ru_stime)
+    # ru_maxrss est en Ko sous Linux et en octets sous macOS
+    peak_rss_kb = usage_after.ru_maxrss / (1024 if sys.platform == "darwin" else 1)
+
+    return {
+        "engine": engine,
+        "recipients": len(recipients),
+        "failed": failed,
+        "elapsed_s": round(elapsed, 4),
+        "messages_per_s": round(len(recipients) / elapsed, 2) if elapsed else 0.0,
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 3),
+        "cpu_s": round(cpu, 3),
+        "peak_rss_mb": round(peak_rss_kb / 1024, 1),
+    }
+
+
+def git_revision():
+    """Révision git courante (pour comparer les exécutions), ou None"""
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__))
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def load_previous(path):
+    """Charge les dernières mesures connues par (mode, taille)"""
+    previous = {}
+    if path and os.path.exists(path):
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    entry = json.loads(line)
+                    previous[(entry["engine"], entry["recipients"])] = entry
+    return previous
+
+
+def main():
+    """Point d'entrée principal"""
+    parser = argparse.ArgumentParser(
+        description="Mesurer les performances des modes d'envoi contre un serveur SMTP local"
+    )
+    parser.add_argument('--sizes', '-s', type=int, nargs='+', default=[1000, 10000, 100000],
+                        help="Nombres de destinataires à tester (défaut: 1000 10000 100000)")
+    parser.add_argument('--engines', '-e', nargs='+', choices=ENGINES, default=ENGINES,
+                        help="Modes d'envoi à mesurer (défaut: tous)")
+    parser.add_argument('--batch-size', type=int, default=50,
+                        help="Taille des lots pour celery-batch (défaut: 50)")
+    parser.add_argument('--concurrency', type=int, default=4,
+                        help="Sessions SMTP simultanées pour asyncio (défaut: 4)")
+    parser.add_argument('--sink-latency', type=float, default=0.0,
+                        help="Latence artificielle du serveur SMTP par message, en ms (défaut: 0)")
+    parser.add_argument('--personalize', action='store_true',
+                        help="Template avec champs de fusion {{name}} et {{email}} "
+                             "(comparer à une mesure précédente sans cette option)")
+    parser.add_argument('--output', '-o', default="bench_results.jsonl",
+                        help="Fichier de résultats JSON lines (défaut: bench_results.jsonl)")
+    parser.add_argument('--compare', '-c',
+                        help="Fichier de résultats précédent à comparer (défaut: --output)")
+    # Usage interne : exécution d'une seule mesure dans un processus enfant
+    parser.add_argument('--run-one', help=argparse.SUPPRESS)
+    parser.add_argument('--port', type=int, help=argparse.SUPPRESS)
+    parser.add_argument('--template', help=argparse.SUPPRESS)
+    parser.add_argument('--csv', help=argparse.SUPPRESS)
+
+    args = parser.parse_args()
+
+    if args.run_one:
+        # Les messages d'envoi sont ignorés : seule la ligne JSON finale est écrite
+        stdout = sys.stdout
+        sys.stdout = open(os.devnull, "w")
+        result = run_engine(args.run_one, args.port, args.template, args.csv,
+                            args.batch_size, args.concurrency)
+        sys.stdout = stdout
+        print(json.dumps(result))
+        return
+
+    from scripts.email_sender.smtp_sink import SMTPSink
+
+    previous = load_previous(args.compare or args.output)
+    revision = git_revision()
+
+    print("📊 BANC DE PERFORMANCE - ENVOI D'EMAILS")
+    print("=" * 60)
+
+    with tempfile.TemporaryDirectory() as workdir, SMTPSink(latency=args.sink_latency / 1000) as sink:
+        template_path = os.path.join(workdir, "email_template_bench.html")
+        generate_template(template_path, args.personalize)
+        print(f"📄 Template: {os.path.getsize(template_path) / 1024:.1f} Ko")
+        print(f"📮 Serveur SMTP local: {sink.address[0]}:{sink.address[1]}")
+        print()
+        print(f"{'Mode':<14}{'Dest.':>8}{'emails/s':>11}{'p50 ms':>9}{'p95 ms':>9}"
+              f"{'p99 ms':>9}{'CPU s':>8}{'RSS Mo':>8}{'Δ':>9}")
+
+        with open(args.output, "a", encoding="utf-8") as output:
+            for size in args.sizes:
+                csv_path = os.path.join(workdir, f"destinataires_{size}.csv")
+                generate_recipients(csv_path, size)
+
+                for engine in args.engines:
+                    completed = subprocess.run(
+                        [sys.executable, os.path.abspath(__file__),
+                         "--run-one", engine, "--port", str(sink.address[1]),
+                         "--template", template_path, "--csv", csv_path,
+                         "--batch-size", str(args.batch_size),
+                         "--concurrency", str(args.concurrency)],
+                        capture_output=True, text=True
+                    )
+                    if completed.returncode != 0:
+                        print(f"{engine:<14}{size:>8}  ❌ échec: {completed.stderr.strip().splitlines()[-1:]}")
+                        continue
+
+                    result = json.loads(completed.stdout.strip().splitlines()[-1])
+                    result.update({
+                        "timestamp": datetime.now().isoformat(timespec="seconds"),
+                        "revision": revision,
+                        "batch_size": args.batch_size,
+                        "concurrency": args.concurrency,
+                        "sink_latency_ms": args.sink_latency,
+                        "personalized": args.personalize,
+                    })
+                    output.write(json.dumps(result) + "\n")
+                    output.flush()
+
+                    before = previous.get((engine, size))
+                    delta = ""
+                    if before and before.get("messages_per_s"):
+                        delta = f"{(result['messages_per_s'] / before['messages_per_s'] - 1) * 100:+.1f}%"
+
+                    print(f"{engine:<14}{size:>8}{result['messages_per_s']:>11.1f}{result['p50_ms']:>9.2f}"
+                          f"{result['p95_ms']:>9.2f}{result['p99_ms']:>9.2f}{result['cpu_s']:>8.2f}"
+                          f"{result['peak_rss_mb']:>8.1f}{delta:>9}")
+
+    print()
+    print(f"✅ Résultats ajoutés à {args.output}")
+
+
+if __name__ == "__main__":
+    main()
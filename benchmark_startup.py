@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+Banc de performance du démarrage des points d'entrée
+Association Gamadji Saré
+
+Mesure le coût des imports de chaque point d'entrée avec `python -X importtime`,
+dans des processus séparés (modules jamais en cache) :
+- send_emails         : envoi en ligne de commande
+- check_email_status  : suivi des tâches (client Celery chargé à l'usage)
+- worker              : démarrage d'un worker Celery (module des tâches)
+- gui                 : interface graphique
+- generate_template   : générateur de templates en ligne de commande
+
+Chaque point d'entrée est importé plusieurs fois ; la médiane du temps
+d'import (hors démarrage de l'interpréteur) et du temps total du processus
+est retenue, avec les paquets les plus coûteux. Les résultats sont ajoutés
+en JSON (une ligne par mesure) pour pouvoir comparer les exécutions entre elles.
+"""
+
+import sys
+import os
+import argparse
+import json
+import statistics
+import subprocess
+import time
+from collections import Counter
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+# Point d'entrée -> code exécuté (ce que le programme importe avant de travailler)
+TARGETS = {
+    "send_emails": "import send_emails",
+    "check_email_status": "import check_email_status; import scripts.email_sender.celery_config",
+    "worker": "import scripts.email_sender.tasks",
+    "gui": "import gui",
+    "generate_template": "import generate_template",
+}
+
+
+def parse_importtime(stderr, ignored=()):
+    """
+    Analyse la sortie de -X importtime.
+
+    Returns:
+        tuple: (temps d'import total en µs, temps propre en µs par paquet racine)
+    """
+    total = 0
+    packages = Counter()
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        if not self_us.strip().isdigit():
+            continue  # ligne d'en-tête
+        module = name.strip()
+        if module in ignored:
+            continue
+        packages[module.split(".")[0]] += int(self_us)
+        if not name[1:].startswith(" "):  # import de premier niveau (non imbriqué)
+            total += int(cumulative_us)
+    return total, packages
+
+
+def startup_modules():
+    """Modules importés au démarrage de l'interpréteur (site, encodings...), communs à toutes les mesures"""
+    completed = subprocess.run([sys.executable, "-X", "importtime", "-c", "pass"],
+                               capture_output=True, text=True, cwd=ROOT)
+    return {line.split("|")[-1].strip()
+            for line in completed.stderr.splitlines() if "|" in line}
+
+
+def measure(code, repeat, ignored):
+    """Importe le point d'entrée repeat fois ; retourne la mesure médiane, ou None en cas d'échec"""
+    imports, walls, runs = [], [], []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        completed = subprocess.run([sys.executable, "-X", "importtime", "-c", code],
+                                   capture_output=True, text=True, cwd=ROOT)
+        walls.append(time.perf_counter() - started)
+        if completed.returncode != 0:
+            errors = [line for line in completed.stderr.splitlines() if not line.startswith("import time:")]
+            return None, errors[-1] if errors else f"code de sortie {completed.returncode}"
+        total, packages = parse_importtime(completed.stderr, ignored)
+        imports.append(total)
+        runs.append((total, packages))
+
+    median_import = statistics.median(imports)
+    _, packages = min(runs, key=lambda run: abs(run[0] - median_import))
+    return {
+        "import_ms": round(median_import / 1000, 1),
+        "wall_ms": round(statistics.median(walls) * 1000, 1),
+        "packages_ms": {name: round(us / 1000, 1) for name, us in packages.most_common(5)},
+    }, None
+
+
+def git_revision():
+    """Révision git courante (pour comparer les exécutions), ou None"""
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True, cwd=ROOT
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def load_previous(path):
+    """Charge les dernières mesures connues par point d'entrée"""
+    previous = {}
+    if path and os.path.exists(path):
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    entry = json.loads(line)
+                    previous[entry["target"]] = entry
+    return previous
+
+
+def main():
+    """Point d'entrée principal"""
+    parser = argparse.ArgumentParser(
+        description="Mesurer le temps d'import des points d'entrée (python -X importtime)"
+    )
+    parser.add_argument('--targets', '-t', nargs='+', choices=list(TARGETS), default=list(TARGETS),
+                        help="Points d'entrée à mesurer (défaut: tous)")
+    parser.add_argument('--repeat', '-r', type=int, default=7,
+                        help="Nombre d'imports par point d'entrée, la médiane est retenue (défaut: 7)")
+    parser.add_argument('--output', '-o', default="startup_results.jsonl",
+                        help="Fichier de résultats JSON lines (défaut: startup_results.jsonl)")
+    parser.add_argument('--compare', '-c',
+                        help="Fichier de résultats précédent à comparer (défaut: --output)")
+
+    args = parser.parse_args()
+
+    previous = load_previous(args.compare or args.output)
+    revision = git_revision()
+    ignored = startup_modules()
+
+    print("📊 BANC DE PERFORMANCE - DÉMARRAGE")
+    print("=" * 60)
+    print(f"{'Point d’entrée':<20}{'import ms':>10}{'total ms':>10}{'Δ':>9}  Paquets les plus coûteux")
+
+    with open(args.output, "a", encoding="utf-8") as output:
+        for target in args.targets:
+            result, error = measure(TARGETS[target], args.repeat, ignored)
+            if result is None:
+                print(f"{target:<20}  ❌ échec: {error}")
+                continue
+
+            result.update({
+                "target": target,
+                "timestamp": datetime.now().isoformat(timespec="seconds"),
+                "revision": revision,
+                "repeat": args.repeat,
+                "python": sys.version.split()[0],
+            })
+            output.write(json.dumps(result) + "\n")
+            output.flush()
+
+            before = previous.get(target)
+            delta = ""
+            if before and before.get("import_ms"):
+                delta = f"{(result['import_ms'] / before['import_ms'] - 1) * 100:+.1f}%"
+
+            heaviest = ", ".join(f"{name} {ms:.0f}" for name, ms in result["packages_ms"].items())
+            print(f"{target:<20}{result['import_ms']:>10.1f}{result['wall_ms']:>10.1f}{delta:>9}  {heaviest}")
+
+    print()
+    print(f"✅ Résultats ajoutés à {args.output}")
+
+
+if __name__ == "__main__":
+    main()
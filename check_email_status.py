@@ -67,6 +67,47 @@ def check_task_status(task_id):
         return None
 
 
+def get_bulk_progress(bulk_task_id):
+    """
+    Avancement d'un envoi en masse : compteurs tenus par les workers (une
+    seule lecture Redis), ou à défaut agrégation des résultats des sous-tâches
+    par lots MGET.
+    
+    Returns:
+        dict: total, sent, failed, pending (et skipped), ou None si l'envoi
+              n'est pas encore planifié
+    """
+    from scripts.email_sender.celery_config import celery_app, get_redis_client
+    from scripts.email_sender.progress import aggregate_subtasks, get_bulk_stats
+    
+    client = get_redis_client()
+    stats = get_bulk_stats(client, bulk_task_id)
+    if stats is not None:
+        return stats
+    
+    # Envoi sans compteurs : agréger les résultats des sous-tâches
+    from celery.result import AsyncResult
+    from scripts.email_sender.tasks import unpack_subtasks
+    
+    result = AsyncResult(bulk_task_id, app=celery_app)
+    if result.state != 'SUCCESS' or not isinstance(result.result, dict) or not result.result.get('tasks_key'):
+        return None
+    
+    subtasks = unpack_subtasks(client.get(result.result['tasks_key']))
+    stats = aggregate_subtasks(client, celery_app.backend, subtasks)
+    stats['total'] = result.result.get('total_emails', sum(count for _, count in subtasks))
+    stats['skipped'] = result.result.get('skipped', 0)
+    return stats
+
+
+def _format_progress(stats):
+    """Ligne de résumé de l'avancement"""
+    done = stats['sent'] + stats['failed']
+    percent = done / stats['total'] * 100 if stats['total'] else 100.0
+    return (f"✅ Réussis: {stats['sent']}   ❌ Échoués: {stats['failed']}   "
+            f"⏳ En attente/cours: {stats['pending']}   ({percent:.1f}%)")
+
+
 def check_bulk_status(bulk_task_id):
     """Vérifie le statut d'une tâche d'envoi en masse"""
     print(f"📊 VÉRIFICATION DE L'ENVOI EN MASSE: {bulk_task_id}")
@@ -75,33 +116,75 @@ def check_bulk_status(bulk_task_id):
     result = check_task_status(bulk_task_id)
     
     if result and result.state == 'SUCCESS' and isinstance(result.result, dict):
-        tasks = result.result.get('tasks', [])
+        # Envoi cadencé : les sous-tâches publiées sont rangées dans Redis
+        if result.result.get('dispatch_mode') == 'paced' and result.result.get('tasks_key'):
+            from scripts.email_sender.celery_config import get_redis_client
+            from scripts.email_sender.tasks import unpack_subtasks
+            
+            tasks = unpack_subtasks(get_redis_client().get(result.result['tasks_key']))
+            published = sum(count for _, count in tasks)
+            print(f"\n📤 Publication cadencée: {published}/{result.result.get('total_emails', 0)} destinataires publiés")
         
-        if tasks:
+        stats = get_bulk_progress(bulk_task_id)
+        if stats and stats['total']:
             print(f"\n📧 Détails des envois individuels:")
-            print(f"   Total: {len(tasks)} emails")
-            
-            # Vérifier quelques tâches individuelles
-            from scripts.email_sender.celery_config import celery_app
-            from celery.result import AsyncResult
-            
-            success_count = 0
-            failed_count = 0
-            pending_count = 0
-            
-            for task_info in tasks:
-                task_result = AsyncResult(task_info['task_id'], app=celery_app)
-                
-                if task_result.state == 'SUCCESS':
-                    success_count += 1
-                elif task_result.state == 'FAILURE':
-                    failed_count += 1
-                elif task_result.state in ['PENDING', 'STARTED', 'RETRY']:
-                    pending_count += 1
+            print(f"   Total: {stats['total']} emails")
+            print(f"\n   ✅ Réussis: {stats['sent']}")
+            print(f"   ❌ Échoués: {stats['failed']}")
+            print(f"   ⏳ En attente/cours: {stats['pending']}")
+
+
+def watch_bulk_status(bulk_task_id, interval=1.0):
+    """Affiche l'avancement d'un envoi en masse, rafraîchi toutes les `interval` secondes"""
+    import time
+    
+    print(f"👀 SUIVI DE L'ENVOI EN MASSE: {bulk_task_id}")
+    print("=" * 60)
+    print("(Ctrl+C pour quitter)\n")
+    
+    try:
+        while True:
+            stats = get_bulk_progress(bulk_task_id)
+            if stats is None:
+                line = "⏳ Envoi en cours de planification..."
+            else:
+                line = _format_progress(stats)
+            print(f"\r{line:<90}", end="", flush=True)
             
-            print(f"\n   ✅ Réussis: {success_count}")
-            print(f"   ❌ Échoués: {failed_count}")
-            print(f"   ⏳ En attente/cours: {pending_count}")
+            if stats is not None and stats['pending'] == 0:
+                print("\n\n🏁 Envoi terminé")
+                return stats
+            time.sleep(interval)
+    except KeyboardInterrupt:
+        print("\n\n⏹️  Suivi interrompu (l'envoi continue en arrière-plan)")
+    except Exception as e:
+        print(f"\n❌ Erreur: {str(e)}")
+
+
+def follow_bulk_status(bulk_task_id):
+    """Suit un envoi en masse en direct via les événements publiés par les workers"""
+    try:
+        from scripts.email_sender.celery_config import get_redis_client
+        from scripts.email_sender.progress import follow_progress, format_progress
+        
+        print(f"📡 SUIVI EN DIRECT DE L'ENVOI EN MASSE: {bulk_task_id}")
+        print("=" * 60)
+        print("(Ctrl+C pour quitter)\n")
+        
+        snapshot = None
+        for snapshot in follow_progress(get_redis_client(), bulk_task_id):
+            line = format_progress(snapshot) if snapshot['total'] else "⏳ Envoi en cours de planification..."
+            print(f"\r{line:<100}", end="", flush=True)
+        
+        print("\n\n🏁 Envoi terminé")
+        if snapshot and snapshot['errors']:
+            print(f"⚠️  Dernières erreurs: {', '.join(snapshot['errors'])}")
+        return snapshot
+    
+    except KeyboardInterrupt:
+        print("\n\n⏹️  Suivi interrompu (l'envoi continue en arrière-plan)")
+    except Exception as e:
+        print(f"\n❌ Erreur: {str(e)}")
 
 
 def list_active_tasks():
@@ -176,13 +259,35 @@ def main():
         action='store_true',
         help="Vérifier le statut détaillé d'un envoi en masse"
     )
+    parser.add_argument(
+        '--watch',
+        '-w',
+        action='store_true',
+        help="Suivre l'avancement d'un envoi en masse, rafraîchi en continu"
+    )
+    parser.add_argument(
+        '--follow',
+        '-f',
+        action='store_true',
+        help="Suivre un envoi en masse en direct (débit, temps restant, erreurs)"
+    )
+    parser.add_argument(
+        '--interval',
+        type=float,
+        default=1.0,
+        help="Intervalle de rafraîchissement de --watch en secondes (défaut: 1)"
+    )
     
     args = parser.parse_args()
     
     if args.list:
         list_active_tasks()
     elif args.task_id:
-        if args.bulk:
+        if args.follow:
+            follow_bulk_status(args.task_id)
+        elif args.watch:
+            watch_bulk_status(args.task_id, args.interval)
+        elif args.bulk:
             check_bulk_status(args.task_id)
         else:
             check_task_status(args.task_id)
@@ -192,6 +297,8 @@ def main():
         print("\nUtilisation:")
         print("  python check_email_status.py <task_id>        # Vérifier une tâche")
         print("  python check_email_status.py <task_id> --bulk # Envoi en masse détaillé")
+        print("  python check_email_status.py <task_id> --watch # Suivi en continu d'un envoi en masse")
+        print("  python check_email_status.py <task_id> --follow # Suivi en direct (débit, temps restant)")
         print("  python check_email_status.py --list           # Lister les tâches actives")
         print("\nExemples:")
         print("  python check_email_status.py abc123-def456-...")
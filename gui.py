@@ -4,13 +4,70 @@ from PyQt5.QtWidgets import (
     QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
     QHBoxLayout, QLabel, QLineEdit, QTextEdit, QPushButton, QMessageBox,
     QListWidget, QInputDialog, QTabWidget, QFileDialog, QComboBox,
-    QTableWidget, QTableWidgetItem, QHeaderView
+    QTableView, QHeaderView, QAbstractItemView, QProgressBar
 )
-from PyQt5.QtCore import Qt, QUrl
+from PyQt5.QtCore import Qt, QUrl, QThread, pyqtSignal
 from PyQt5.QtGui import QDesktopServices
 from datetime import datetime
 from scripts.template_mail_generator import EmailTemplateGenerator
+from scripts.template_catalog import get_catalog
+from scripts.recipient_model import RecipientColumns, RecipientTableModel, make_filter_proxy
 from scripts.email_sender.mail import EmailSender
+from scripts.email_sender.progress import EVENT_FAILED, EVENT_SENT, ProgressTracker, format_progress
+from scripts.email_sender.send_control import SendControl
+
+
+class SendThread(QThread):
+    """Envoie les emails hors du thread de l'interface (pause et annulation possibles)"""
+    
+    progress = pyqtSignal(int, int, str, bool, float)
+    finished_send = pyqtSignal(dict)
+    failed = pyqtSignal(str)
+    
+    def __init__(self, template_path, resume=True, parent=None):
+        super().__init__(parent)
+        self.template_path = template_path
+        self.resume = resume
+        self.control = SendControl()
+    
+    def run(self):
+        try:
+            sender = EmailSender(template_path=self.template_path)
+            stats = sender.send_bulk_emails(resume=self.resume, progress_callback=self.progress.emit,
+                                            control=self.control)
+            self.finished_send.emit(stats)
+        except Exception as e:
+            self.failed.emit(str(e))
+
+
+class ProgressFollowThread(QThread):
+    """Suit un envoi en arrière-plan (Celery) via le flux d'événements Redis"""
+    
+    progress = pyqtSignal(dict)
+    finished_follow = pyqtSignal(dict)
+    failed = pyqtSignal(str)
+    
+    def __init__(self, bulk_id, parent=None):
+        super().__init__(parent)
+        self.bulk_id = bulk_id
+        self._stopped = False
+    
+    def stop(self):
+        self._stopped = True
+    
+    def run(self):
+        try:
+            from scripts.email_sender.celery_config import get_redis_client
+            from scripts.email_sender.progress import follow_progress
+            
+            snapshot = None
+            for snapshot in follow_progress(get_redis_client(), self.bulk_id):
+                if self._stopped:
+                    return
+                self.progress.emit(snapshot)
+            self.finished_follow.emit(snapshot or {})
+        except Exception as e:
+            self.failed.emit(str(e))
 
 
 class EmailGeneratorGUI(QMainWindow):
@@ -23,10 +80,14 @@ class EmailGeneratorGUI(QMainWindow):
         self.image_links = []
         self.video_links = []
         self.template_generator = EmailTemplateGenerator()
+        self.progress_thread = None
+        self.send_thread = None
+        self.send_tracker = None
 
         # Initialiser le gestionnaire de destinataires
         from manage_recipients import RecipientManager
         self.recipients_manager = RecipientManager()
+        self.recipient_store = self.recipients_manager.store
         
         # Widget central avec onglets
         central_widget = QWidget()
@@ -60,6 +121,7 @@ class EmailGeneratorGUI(QMainWindow):
         # Zone de texte principal
         content_label = QLabel("📝 Contenu du mail :")
         self.content_text = QTextEdit()
+        self.content_text.setPlaceholderText("Bonjour {{name}}, ...  ({{name}} et {{email}} sont remplacés pour chaque destinataire)")
         left_layout.addWidget(content_label)
         left_layout.addWidget(self.content_text)
         
@@ -127,9 +189,33 @@ class EmailGeneratorGUI(QMainWindow):
         layout.addWidget(preview_btn)
         
         # Bouton d'envoi
-        send_btn = QPushButton("📨 Envoyer les emails")
-        send_btn.clicked.connect(self.send_emails)
-        layout.addWidget(send_btn)
+        self.send_btn = QPushButton("📨 Envoyer les emails")
+        self.send_btn.clicked.connect(self.send_emails)
+        layout.addWidget(self.send_btn)
+        
+        # Envoi en arrière-plan (Celery) avec suivi en direct
+        self.background_btn = QPushButton("📡 Envoyer en arrière-plan (Celery)")
+        self.background_btn.clicked.connect(self.send_emails_background)
+        layout.addWidget(self.background_btn)
+        
+        # Avancement de l'envoi : barre, débit et temps restant
+        self.send_progress = QProgressBar()
+        self.send_progress.setVisible(False)
+        layout.addWidget(self.send_progress)
+        
+        self.progress_label = QLabel("")
+        layout.addWidget(self.progress_label)
+        
+        control_layout = QHBoxLayout()
+        self.pause_btn = QPushButton("⏸️ Pause")
+        self.pause_btn.clicked.connect(self.toggle_pause)
+        self.pause_btn.setEnabled(False)
+        self.cancel_btn = QPushButton("⏹️ Annuler l'envoi")
+        self.cancel_btn.clicked.connect(self.cancel_sending)
+        self.cancel_btn.setEnabled(False)
+        control_layout.addWidget(self.pause_btn)
+        control_layout.addWidget(self.cancel_btn)
+        layout.addLayout(control_layout)
         
         # Initialiser la liste des templates
         self.refresh_templates()
@@ -146,13 +232,35 @@ class EmailGeneratorGUI(QMainWindow):
         title_label.setStyleSheet("font-size: 16px; font-weight: bold; margin: 10px")
         layout.addWidget(title_label)
 
-        # Tableau des destinataires
-        self.recipients_table = QTableWidget()
-        self.recipients_table.setColumnCount(2)
-        self.recipients_table.setHorizontalHeaderLabels(["Nom", "Email"])
+        # Recherche
+        self.recipients_search = QLineEdit()
+        self.recipients_search.setPlaceholderText("🔍 Rechercher un nom ou un email...")
+        layout.addWidget(self.recipients_search)
+        
+        self.recipients_count_label = QLabel("")
+        layout.addWidget(self.recipients_count_label)
+
+        # Tableau des destinataires (modèle/vue : seules les lignes visibles sont affichées)
+        self.recipients_model = RecipientTableModel(RecipientColumns(), self)
+        self.recipients_proxy = make_filter_proxy(self.recipients_model, self)
+        self.recipients_search.textChanged.connect(self.filter_recipients)
+        
+        self.recipients_table = QTableView()
+        self.recipients_table.setModel(self.recipients_proxy)
+        self.recipients_table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.recipients_table.setSelectionMode(QAbstractItemView.SingleSelection)
         self.recipients_table.horizontalHeader().setStretchLastSection(True)
-        self.recipients_table.horizontalHeader().setSectionResizeMode(0, QHeaderView.ResizeToContents)
+        self.recipients_table.horizontalHeader().setSectionResizeMode(0, QHeaderView.Interactive)
+        self.recipients_table.setColumnWidth(0, 300)
+        self.recipients_table.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
+        self.recipients_table.verticalHeader().setDefaultSectionSize(24)
+        self.recipients_table.doubleClicked.connect(self.edit_recipient)
         layout.addWidget(self.recipients_table)
+        
+        self.recipients_model.rowsInserted.connect(self.update_recipients_count)
+        self.recipients_model.rowsRemoved.connect(self.update_recipients_count)
+        self.recipients_model.modelReset.connect(self.update_recipients_count)
+        self.recipients_proxy.layoutChanged.connect(self.update_recipients_count)
 
         # Boutons d'action
         buttons_layout = QHBoxLayout()
@@ -185,13 +293,29 @@ class EmailGeneratorGUI(QMainWindow):
         return tab
     
     def refresh_recipients(self):
-        """Rafraîchit le tableau des destinataires"""
-        recipients = self.recipients_manager.load_recipients()
-        self.recipients_table.setRowCount(len(recipients))
-
-        for i, recipient in enumerate(recipients):
-            self.recipients_table.setItem(i, 0, QTableWidgetItem(recipient['name']))
-            self.recipients_table.setItem(i, 1, QTableWidgetItem(recipient['email']))
+        """Recharge les destinataires depuis la base"""
+        self.recipients_model.beginResetModel()
+        self.recipients_model.store = RecipientColumns.from_rows(self.recipient_store.iter_recipients())
+        self.recipients_model.endResetModel()
+    
+    def filter_recipients(self, text):
+        self.recipients_proxy.setFilterFixedString(text.strip())
+        self.update_recipients_count()
+    
+    def update_recipients_count(self, *args):
+        total = self.recipients_model.rowCount()
+        shown = self.recipients_proxy.rowCount()
+        if shown == total:
+            self.recipients_count_label.setText(f"{total} destinataire(s)")
+        else:
+            self.recipients_count_label.setText(f"{shown} / {total} destinataire(s)")
+    
+    def selected_recipient_row(self):
+        """Ligne (dans le modèle) du destinataire sélectionné, ou -1"""
+        index = self.recipients_table.currentIndex()
+        if not index.isValid():
+            return -1
+        return self.recipients_proxy.mapToSource(index).row()
 
     def add_recipient(self):
         """Ajoute un nouveau destinataire via une boîte de dialogue"""
@@ -203,32 +327,23 @@ class EmailGeneratorGUI(QMainWindow):
         if not ok2 or not email.strip():
             return
         
-        recipients = self.recipients_manager.load_recipients()
-
-        # Vérifier si l'email existe déjà
-        for recipient in recipients:
-            if recipient['email'].lower() == email.lower():
-                QMessageBox.warning(self, "Erreur", "Cet email existe déjà !")
-                return
+        # Vérifier si l'email existe déjà (index unique de la base)
+        if not self.recipient_store.add(name.strip(), email.strip()):
+            QMessageBox.warning(self, "Erreur", "Cet email existe déjà !")
+            return
             
-        recipients.append({'name': name.strip(), 'email': email.strip()})
-        self.recipients_manager.save_recipients(recipients)
-        self.refresh_recipients()
+        self.recipients_model.add_recipients([(name.strip(), email.strip())])
 
         QMessageBox.information(self, "Succès", f"Destinataire ajouté : {name.strip()}")
 
     def edit_recipient(self):
         """Modifie le destinataire sélectionné"""
-        current_row = self.recipients_table.currentRow()
+        current_row = self.selected_recipient_row()
         if current_row < 0:
             QMessageBox.warning(self, "Erreur", "Veuillez sélectionner un destinataire à modifier.")
             return
         
-        recipients = self.recipients_manager.load_recipients()
-        if current_row >= len(recipients):
-            return
-        
-        current_recipient = recipients[current_row]
+        current_recipient = self.recipients_model.recipient(current_row)
 
         name, ok1 = QInputDialog.getText(self, "Modifier un destinataire", "Nom :", text=current_recipient['name'])
         if not ok1:
@@ -240,29 +355,21 @@ class EmailGeneratorGUI(QMainWindow):
             return
         
         # Vérifier si le nouvel email existe déjà (sauf pour le destinataire actuel)
-        for i, recipient in enumerate(recipients):
-            if i != current_row and recipient['email'].lower() == email.lower():
-                QMessageBox.warning(self, "Erreur", "Cet email existe déjà !")
-                return
-            
-        recipients[current_row] = {'name': name.strip(), 'email': email.strip()}
-        self.recipients_manager.save_recipients(recipients)
-        self.refresh_recipients()
+        if not self.recipient_store.update(current_recipient['email'], name.strip(), email.strip()):
+            QMessageBox.warning(self, "Erreur", "Cet email existe déjà !")
+            return
+        self.recipients_model.update_recipient(current_row, name.strip(), email.strip())
 
         QMessageBox.information(self, "Succès", f"Destinataire modifié : {name.strip()}")
 
     def remove_recipient(self):
         """Supprime le destinataire sélectionné"""
-        current_row = self.recipients_table.currentRow()
+        current_row = self.selected_recipient_row()
         if current_row < 0:
             QMessageBox.warning(self, "Erreur", "Veuillez sélectionner un destinataire à supprimer.")
             return
         
-        recipients = self.recipients_manager.load_recipients()
-        if current_row >= len(recipients):
-            return
-        
-        recipient = recipients[current_row]
+        recipient = self.recipients_model.recipient(current_row)
         
         reply = QMessageBox.question(
             self,
@@ -272,53 +379,39 @@ class EmailGeneratorGUI(QMainWindow):
         )
         
         if reply == QMessageBox.Yes:
-            recipients.pop(current_row)
-            self.recipients_manager.save_recipients(recipients)
-            self.refresh_recipients()
+            self.recipient_store.remove(recipient['email'])
+            self.recipients_model.remove_recipient(current_row)
             QMessageBox.information(self, "Succès", "Destinataire supprimé.")
 
     def import_recipients(self):
-        """Importe des destinataires depuis un fichier CSV"""
+        """Importe des destinataires depuis un fichier CSV ou Excel"""
         file_path, _ = QFileDialog.getOpenFileName(
             self,
             "Importer des destinataires",
             "",
-            "Fichiers CSV (*.csv);;Tous les fichiers (*)"
+            "Listes de destinataires (*.csv *.xlsx);;Fichiers CSV (*.csv);;Fichiers Excel (*.xlsx);;Tous les fichiers (*)"
         )
 
         if not file_path:
             return
         
         try:
-            import csv
-            imported_count = 0
-            skipped_count = 0
-            recipients = self.recipients_manager.load_recipients()
-            existing_emails = {r['email'].lower() for r in recipients}
-
-            with open(file_path, 'r', encoding='utf-8') as csvfile:
-                reader = csv.DictReader(csvfile)
-                for row in reader:
-                    if 'email' in row and 'name' in row:
-                        email = row['email'].strip().lower()
-                        if email and '@' in email and email not in existing_emails:
-                            recipients.append({
-                                'name': row['name'].strip(),
-                                'email': email
-                            })
-                            existing_emails.add(email)
-                            imported_count += 1
-                        else:
-                            skipped_count += 1
-
-            self.recipients_manager.save_recipients(recipients)
-            self.refresh_recipients()
-
-            message = f"{imported_count} destinataire(s) importé(s)"
-            if skipped_count > 0:
-                message += f"\n{skipped_count} destinataire(s) ignoré(s) (doublons ou emails invalides)"
-
-            QMessageBox.information(self, "Importation terminée", message)
+            from scripts.email_sender.recipient_import import format_import_stats, import_recipients
+
+            def progress(stats):
+                self.recipients_count_label.setText(
+                    f"📥 {stats['read']} ligne(s) lue(s), {stats['imported']} importée(s) "
+                    f"({stats['rows_per_second']:.0f} lignes/s)")
+                QApplication.processEvents()
+
+            # Import par paquets dans la base, puis ajout des seules nouvelles lignes au tableau
+            last_id = self.recipient_store.last_id()
+            stats = import_recipients(self.recipient_store, file_path, progress_callback=progress)
+            self.recipients_model.add_recipients(
+                (r['name'], r['email']) for r in self.recipient_store.iter_recipients(after_id=last_id))
+            self.update_recipients_count()
+
+            QMessageBox.information(self, "Importation terminée", format_import_stats(stats))
 
         except Exception as e:
             QMessageBox.critical(self, "Erreur", f"Erreur lors de l'importation : \n{str(e)}")
@@ -336,13 +429,7 @@ class EmailGeneratorGUI(QMainWindow):
             return
         
         try:
-            recipients = self.recipients_manager.load_recipients()
-
-            import csv
-            with open(file_path, 'w', newline='', encoding='utf-8') as csvfile:
-                writer = csv.DictWriter(csvfile, fieldnames=['name', 'email'])
-                writer.writeheader()
-                writer.writerows(recipients)
+            self.recipient_store.export_csv(file_path)
 
             QMessageBox.information(self, "Succès", f"Liste exportée vers :\n{file_path}")
 
@@ -382,8 +469,8 @@ class EmailGeneratorGUI(QMainWindow):
         output_dir = os.path.join(os.getcwd(), "output")
         
         if os.path.exists(output_dir):
-            templates = [f for f in os.listdir(output_dir) if f.endswith('.html')]
-            templates.sort(reverse=True)  # Plus récent en premier
+            # Catalogue indexé : plus récent en premier, sans lister le dossier
+            templates = [entry['name'] for entry in get_catalog(output_dir).entries()]
             self.template_combo.addItems(templates)
     
     def preview_template(self):
@@ -393,10 +480,15 @@ class EmailGeneratorGUI(QMainWindow):
             QDesktopServices.openUrl(QUrl.fromLocalFile(template_path))
     
     def send_emails(self):
-        """Envoie les emails avec le template sélectionné"""
+        """Envoie les emails avec le template sélectionné, sans bloquer l'interface"""
         if not self.template_combo.currentText():
             QMessageBox.warning(self, "Attention", "Veuillez sélectionner un template!")
             return
+        
+        if self.send_thread is not None and self.send_thread.isRunning():
+            QMessageBox.warning(self, "Attention", "Un envoi est déjà en cours.")
+            return
+        
             
         try:
             template_path = os.path.join(os.getcwd(), "output", self.template_combo.currentText())
@@ -406,17 +498,171 @@ class EmailGeneratorGUI(QMainWindow):
                 self,
                 "Confirmation",
                 "Êtes-vous sûr de vouloir envoyer les emails à tous les destinataires ?\n\n" +
-                "Assurez-vous que le fichier destinataires.csv est à jour.",
+                "Assurez-vous que la liste des destinataires est à jour.",
                 QMessageBox.Yes | QMessageBox.No
             )
             
             if reply == QMessageBox.Yes:
-                email_sender = EmailSender()
-                email_sender.send_bulk_emails()
-                QMessageBox.information(self, "Succès", "Emails envoyés avec succès à tous les destinataires!")
+                resume = self.ask_resume(template_path)
+                if resume is None:
+                    return
+                self.send_tracker = ProgressTracker()
+                self.send_thread = SendThread(template_path, resume, self)
+                self.send_thread.progress.connect(self.on_send_progress)
+                self.send_thread.finished_send.connect(self.on_send_finished)
+                self.send_thread.failed.connect(self.on_send_failed)
+                
+                self.set_sending(True)
+                self.progress_label.setText("📨 Envoi en cours...")
+                self.send_thread.start()
                 
         except Exception as e:
             QMessageBox.critical(self, "Erreur", f"Erreur lors de l'envoi : {str(e)}")
+    
+    def ask_resume(self, template_path):
+        """
+        Demande quoi faire des destinataires ayant déjà reçu ce template.
+        
+        Le journal d'envoi est propre au template et non à la liste : sans
+        cette question, renvoyer le même template à une liste modifiée
+        ignorerait tous ceux qui l'ont déjà reçu.
+        
+        Returns:
+            True pour les ignorer (reprise), False pour renvoyer à tous, None pour annuler
+        """
+        served = EmailSender(template_path=template_path).served_count()
+        if not served:
+            return True
+        reply = QMessageBox.question(
+            self,
+            "Template déjà envoyé",
+            f"{served} destinataire(s) ont déjà reçu ce template.\n\n" +
+            "Oui : les ignorer (reprise d'un envoi interrompu)\n" +
+            "Non : renvoyer à tous les destinataires (nouvel envoi complet)",
+            QMessageBox.Yes | QMessageBox.No | QMessageBox.Cancel
+        )
+        if reply == QMessageBox.Cancel:
+            return None
+        return reply == QMessageBox.Yes
+    
+    def set_sending(self, sending):
+        """Active les contrôles d'envoi (pause, annulation) pendant un envoi"""
+        self.send_btn.setEnabled(not sending)
+        self.background_btn.setEnabled(not sending)
+        self.pause_btn.setEnabled(sending)
+        self.cancel_btn.setEnabled(sending)
+        self.pause_btn.setText("⏸️ Pause")
+        if sending:
+            self.send_progress.setValue(0)
+            self.send_progress.setVisible(True)
+    
+    def toggle_pause(self):
+        """Met en pause ou reprend l'envoi en cours"""
+        control = self.send_thread.control
+        if control.paused:
+            control.resume()
+            self.pause_btn.setText("⏸️ Pause")
+        else:
+            control.pause()
+            self.pause_btn.setText("▶️ Reprendre")
+            self.progress_label.setText(self.progress_label.text() + "   (en pause)")
+    
+    def cancel_sending(self):
+        """Annule l'envoi en cours (l'email en cours d'envoi est terminé)"""
+        if self.send_thread is not None:
+            self.send_thread.control.cancel()
+            self.cancel_btn.setEnabled(False)
+            self.pause_btn.setEnabled(False)
+            self.progress_label.setText("⏹️ Annulation en cours...")
+    
+    def on_send_progress(self, done, total, email, success, latency):
+        self.send_tracker.total = total
+        self.send_tracker.apply(EVENT_SENT if success else EVENT_FAILED, email, latency)
+        self.send_progress.setMaximum(max(1, total))
+        self.send_progress.setValue(done)
+        if not self.send_thread.control.paused:
+            self.progress_label.setText(format_progress(self.send_tracker.snapshot()))
+    
+    def on_send_finished(self, stats):
+        self.set_sending(False)
+        summary = f"{stats['sent']} email(s) envoyé(s), {stats['failed']} échec(s)"
+        if stats['skipped']:
+            summary += f", {stats['skipped']} déjà servi(s)"
+        if stats['cancelled']:
+            self.progress_label.setText(f"⏹️ Envoi annulé : {summary}")
+            QMessageBox.information(self, "Envoi annulé", summary)
+        else:
+            self.progress_label.setText(f"🏁 Envoi terminé : {summary}")
+            QMessageBox.information(self, "Succès", f"Envoi terminé !\n\n{summary}")
+    
+    def on_send_failed(self, error):
+        self.set_sending(False)
+        self.progress_label.setText("")
+        QMessageBox.critical(self, "Erreur", f"Erreur lors de l'envoi : {error}")
+
+    def send_emails_background(self):
+        """Lance l'envoi avec Celery et suit son avancement en direct"""
+        if not self.template_combo.currentText():
+            QMessageBox.warning(self, "Attention", "Veuillez sélectionner un template!")
+            return
+        
+        reply = QMessageBox.question(
+            self,
+            "Confirmation",
+            "Lancer l'envoi en arrière-plan à tous les destinataires ?\n\n" +
+            "Redis et le worker Celery doivent être démarrés.",
+            QMessageBox.Yes | QMessageBox.No
+        )
+        if reply != QMessageBox.Yes:
+            return
+        
+        try:
+            template_path = os.path.join(os.getcwd(), "output", self.template_combo.currentText())
+            resume = self.ask_resume(template_path)
+            if resume is None:
+                return
+            result = EmailSender(template_path=template_path).send_bulk_emails_async(batch_size=50, resume=resume)
+            if result.get('status') != 'scheduled':
+                QMessageBox.critical(self, "Erreur", result.get('message', "Envoi impossible"))
+                return
+            self.follow_progress(result['task_id'])
+        except Exception as e:
+            QMessageBox.critical(self, "Erreur", f"Erreur lors de l'envoi : {str(e)}")
+    
+    def follow_progress(self, bulk_id):
+        """Affiche l'avancement d'un envoi en arrière-plan"""
+        if self.progress_thread is not None:
+            self.progress_thread.stop()
+        
+        self.progress_label.setText("⏳ Envoi en cours de planification...")
+        self.progress_thread = ProgressFollowThread(bulk_id, self)
+        self.progress_thread.progress.connect(self.on_progress)
+        self.progress_thread.finished_follow.connect(self.on_progress_finished)
+        self.progress_thread.failed.connect(
+            lambda error: self.progress_label.setText(f"❌ Suivi interrompu : {error}")
+        )
+        self.progress_thread.start()
+    
+    def on_progress(self, snapshot):
+        if snapshot['total']:
+            self.send_progress.setVisible(True)
+            self.send_progress.setMaximum(snapshot['total'])
+            self.send_progress.setValue(snapshot['sent'] + snapshot['failed'])
+            self.progress_label.setText(format_progress(snapshot))
+    
+    def on_progress_finished(self, snapshot):
+        self.progress_label.setText(
+            f"🏁 Envoi terminé : {snapshot.get('sent', 0)} envoyé(s), {snapshot.get('failed', 0)} échec(s)"
+        )
+    
+    def closeEvent(self, event):
+        if self.send_thread is not None and self.send_thread.isRunning():
+            self.send_thread.control.cancel()
+            self.send_thread.wait(30000)
+        if self.progress_thread is not None:
+            self.progress_thread.stop()
+            self.progress_thread.wait(2000)
+        super().closeEvent(event)
 
     def generate_template(self):
         title = self.title_input.text().strip()
@@ -444,9 +690,15 @@ class EmailGeneratorGUI(QMainWindow):
             html_content = self.template_generator.generate_html(data)
             
             # Sauvegarde
-            filepath = self.template_generator.save_html(html_content)
+            filepath = self.template_generator.save_html(html_content, title=data['title'])
             
             success_message = f"Template généré avec succès!\n\nFichier : {filepath}"
+            report = self.template_generator.last_report
+            if report:
+                success_message += f"\nTaille : {report['size'] / 1024:.1f} Ko"
+                if report['over_budget']:
+                    success_message += (f"\n\n⚠️ Le template dépasse le budget de "
+                                        f"{report['budget'] / 1024:.0f} Ko.")
             QMessageBox.information(self, "Succès", success_message)
             
             # Rafraîchir la liste des templates
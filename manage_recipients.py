@@ -6,43 +6,23 @@ Arnaud STADLER - Dev Python | 🌍 Association Gamadji Saré
 
 import sys
 import os
-import csv
-from pathlib import Path
 
 # Ajouter le dossier racine au path pour les imports
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
+from scripts.email_sender.recipient_import import format_import_stats, import_recipients
+from scripts.email_sender.recipient_store import RecipientStore
+
+
 class RecipientManager:
-    def __init__(self):
-        self.csv_path = Path("scripts/email_sender/destinataires.csv")
-        self.ensure_csv_exists()
-
-    def ensure_csv_exists(self):
-        """S'assure que le fichier CSV existe avec les en-têtes appropriés"""
-        if not self.csv_path.exists():
-            self.csv_path.parent.mkdir(parents=True, exist_ok=True)
-            with open(self.csv_path, 'w', newline='', encoding='utf-8') as csvfile:
-                writer = csv.writer(csvfile)
-                writer.writerow(['name', 'email'])
+    def __init__(self, db_path=None):
+        # Base SQLite des destinataires (destinataires.csv y est importé à sa création)
+        self.store = RecipientStore(db_path)
+        self.csv_path = self.store.csv_path
 
     def load_recipients(self):
-        """Charge la liste des destinataires depuis le fichier CSV"""
-        recipients = []
-        try:
-            with open(self.csv_path, 'r', encoding='utf-8') as csvfile:
-                reader = csv.DictReader(csvfile)
-                for row in reader:
-                    recipients.append(row)
-        except FileNotFoundError:
-            print("Fichier destinataires.csv non trouvé")
-        return recipients
-    
-    def save_recipients(self, recipients):
-        """Sauvegarde la liste des destinataires dans le fichier CSV"""
-        with open(self.csv_path, 'w', newline='', encoding='utf-8') as csvfile:
-            writer = csv.DictWriter(csvfile, fieldnames=['name', 'email'])
-            writer.writeheader()
-            writer.writerows(recipients)
+        """Charge la liste des destinataires depuis la base"""
+        return list(self.store.iter_recipients())
 
     def display_recipients(self):
         """Affiche la liste actuelle des destinataires"""
@@ -71,16 +51,10 @@ class RecipientManager:
         while not email or "@" not in email:
             email = input("Veuillez saisir une adresse email valide : ").strip()
 
-        recipients = self.load_recipients()
-
-        # Vérifier si l'email existe déjà
-        for recipient in recipients:
-            if recipient['email'].lower() == email.lower():
-                print("L'email {email} existe déjà dans la liste")
-                return
-            
-        recipients.append({'name': name, 'email': email})
-        self.save_recipients(recipients)
+        # L'index unique de la base refuse les doublons
+        if not self.store.add(name, email):
+            print(f"L'email {email} existe déjà dans la liste")
+            return
 
         print(f"Destinataire ajouté : {name} <{email}>")
 
@@ -97,8 +71,8 @@ class RecipientManager:
         try:
             index = int(input("Numéro du destinataire à supprimer : ")) - 1
             if 0 <= index < len(recipients):
-                removed = recipients.pop(index)
-                self.save_recipients(recipients)
+                removed = recipients[index]
+                self.store.remove(removed['email'])
                 print(f"Destinataire supprimé : {removed['name']} <{removed['email']}>")
             else:
                 print("Numéro invalide")
@@ -122,64 +96,54 @@ class RecipientManager:
                 print(f"\nModification de : {recipient['name']} <{recipient['email']}>")
 
                 new_name = input(f"Nouveau nom (actuel: {recipient['name']}) : ").strip()
-                if new_name:
-                    recipient['name'] = new_name
 
                 new_email = input(f"Nouvelle adresse email (actuelle : {recipient['email']}) : ").strip()
-                if new_email and '@' in new_email:
-                    # Vérifier si le nouvel email existe déjà
-                    for i, other in enumerate(recipients):
-                        if i != index and other['email'].lower() == new_email.lower():
-                            print(f"L'email {new_email} existe déjà dans la liste")
-                            return
-                    recipient['email'] = new_email
-                elif new_email:
+                if new_email and '@' not in new_email:
                     print("Adresse email invalide, modification annulée")
                     return
-                
-                self.save_recipients(recipients)
-                print(f"Destinataire modifié : {recipient['name']} <{recipient['email']}>")
+
+                # Vérifier si le nouvel email existe déjà
+                if not self.store.update(recipient['email'], new_name or recipient['name'], new_email or None):
+                    print(f"L'email {new_email} existe déjà dans la liste")
+                    return
+                print(f"Destinataire modifié : {new_name or recipient['name']} <{new_email or recipient['email']}>")
             else:
                 print("Numéro invalide")
         except ValueError:
             print("Veuillez saisir un numéro valide")
     
-    def import_from_file(self):
-        """Importe des destinataires depuis un autre fichier CSV"""
-        file_path = input("Chemin du fichier CSV à importer : ").strip()
+    def import_from_file(self, file_path=None, allow_role_accounts=False):
+        """Importe des destinataires depuis un fichier CSV ou Excel (.xlsx)"""
+        if file_path is None:
+            file_path = input("Chemin du fichier CSV ou Excel à importer : ").strip()
 
         if not os.path.exists(file_path):
             print("Fichier non trouvé")
             return
         
+        def progress(stats):
+            print(f"\r📥 {stats['read']} ligne(s) lue(s), {stats['imported']} importée(s) "
+                  f"({stats['rows_per_second']:.0f} lignes/s)", end="", flush=True)
+
         try:
-            imported_count = 0
-            skipped_count = 0
-            recipients = self.load_recipients()
-            existing_emails = {r['email'].lower() for r in recipients}
-
-            with open(file_path, 'r', encoding='utf-8') as csvfile:
-                reader = csv.DictReader(csvfile)
-                for row in reader:
-                    if 'email' in row and 'name' in row:
-                        email = row['email'].strip().lower()
-                        if email and '@' in email and email not in existing_emails:
-                            recipients.append({
-                                'name': row['name'].strip(),
-                                'email': email
-                            })
-                            existing_emails.add(email)
-                            imported_count += 1
-                        else:
-                            skipped_count += 1
-            
-            self.save_recipients(recipients)
-            print(f"{imported_count} destinataire(s) importé(s)")
-            if skipped_count > 0:
-                print(f"{skipped_count} destinataire(s) ignoré(s) (doublons ou emails invalides)")
+            stats = import_recipients(self.store, file_path, allow_role_accounts=allow_role_accounts,
+                                      progress_callback=progress)
+            print()
+            print(format_import_stats(stats))
         
         except Exception as e:
-            print(f"Erreur lors de l'importation : {e}")
+            print(f"\nErreur lors de l'importation : {e}")
+
+    def export_to_file(self, file_path=None):
+        """Exporte les destinataires vers un fichier CSV"""
+        if file_path is None:
+            file_path = input(f"Chemin du fichier CSV (défaut: {self.csv_path}) : ").strip() or self.csv_path
+
+        try:
+            count = self.store.export_csv(file_path)
+            print(f"{count} destinataire(s) exporté(s) vers {file_path}")
+        except Exception as e:
+            print(f"Erreur lors de l'exportation : {e}")
 
     def run_menu(self):
         """Lance le menu interactif de gestion des destinataires"""
@@ -194,11 +158,12 @@ class RecipientManager:
             print("1. Ajouter un destinataire")
             print("2. Modifier un destinataire")
             print("3. Supprimer un destinataire")
-            print("4. Importer depuis un fichier CSV")
-            print("5. Quitter")
+            print("4. Importer depuis un fichier CSV ou Excel")
+            print("5. Exporter vers un fichier CSV")
+            print("6. Quitter")
             print()
 
-            choice = input("Choix (1 - 5) : ").strip()
+            choice = input("Choix (1 - 6) : ").strip()
 
             if choice == '1':
                 self.add_recipient()
@@ -209,13 +174,31 @@ class RecipientManager:
             elif choice == '4':
                 self.import_from_file()
             elif choice == '5':
+                self.export_to_file()
+            elif choice == '6':
                 print("Au revoir!")
                 break
             else:
                 print("Choix invalide, veuillez recommencer")
 
 if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Gestionnaire de destinataires")
+    parser.add_argument('--import', dest='import_path', metavar='FICHIER',
+                        help="Importer un fichier CSV ou Excel (.xlsx) (name, email) puis quitter")
+    parser.add_argument('--keep-role-accounts', action='store_true',
+                        help="Importer aussi les adresses génériques (contact@, info@...)")
+    parser.add_argument('--export', dest='export_path', metavar='FICHIER',
+                        help="Exporter les destinataires vers un fichier CSV puis quitter")
+    args = parser.parse_args()
+
     manager = RecipientManager()
-    manager.run_menu()
+    if args.import_path:
+        manager.import_from_file(args.import_path, allow_role_accounts=args.keep_role_accounts)
+    if args.export_path:
+        manager.export_to_file(args.export_path)
+    if not (args.import_path or args.export_path):
+        manager.run_menu()
 
 
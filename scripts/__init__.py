@@ -16,15 +16,32 @@ Modules disponibles :
 __version__ = "1.1.0"
 __author__ = "Association Gamadji"
 
-# Imports principaux pour faciliter l'utilisation
-from .template_mail_generator import EmailTemplateGenerator
-from .utils import GoogleDriveUtils
-from .template_html import EmailTemplate
-from .test_links import GoogleDriveTester
+# Imports principaux pour faciliter l'utilisation. Ils sont chargés à la
+# première utilisation (PEP 562) : importer un sous-module (scripts.email_sender,
+# scripts.template_html...) ne charge pas le générateur et ses dépendances.
+_EXPORTS = {
+    'EmailTemplateGenerator': '.template_mail_generator',
+    'GoogleDriveUtils': '.utils',
+    'EmailTemplate': '.template_html',
+    'GoogleDriveTester': '.test_links',
+}
 
 __all__ = [
     'EmailTemplateGenerator',
     'GoogleDriveUtils', 
     'EmailTemplate',
     'GoogleDriveTester'
-]
\ No newline at end of file
+]
+
+
+def __getattr__(name):
+    if name in _EXPORTS:
+        from importlib import import_module
+        value = getattr(import_module(_EXPORTS[name], __name__), name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -0,0 +1,345 @@
+"""
+Intégration des styles CSS dans les balises (attribut style)
+Association Gamadji Saré
+
+Beaucoup de clients mail ignorent les blocs <style> : les règles qui le
+permettent sont recopiées dans l'attribut style de chaque élément.
+
+La feuille de style est compilée une seule fois (mémoïsée d'un rendu à
+l'autre) en une table sélecteur → déclarations, indexée par identifiant,
+classe et balise du dernier élément de chaque sélecteur. Le document est
+ensuite parcouru en un seul passage par un tokenizer HTML en flux : chaque
+balise ouvrante reçoit les déclarations des règles qui la ciblent, calculées
+une seule fois par chemin d'éléments (les photos d'un template partagent le
+même calcul). Les règles qui ne peuvent pas être recopiées (media queries,
+:hover, ::before...) restent dans le bloc <style> ; comme un style en ligne
+l'emporte sur toute règle de feuille non !important, leurs déclarations
+portant sur une propriété recopiée dans les balises reçoivent !important
+(sinon les adaptations mobiles et les effets :hover ne s'appliqueraient plus).
+"""
+
+import re
+from functools import lru_cache
+from html.parser import HTMLParser
+from typing import Dict, FrozenSet, List, Optional, Tuple
+
+from .template_optimizer import VOID_TAGS, format_attribute, parse_css, parse_declarations, serialize_css
+
+# Élément tel que vu par les sélecteurs : (balise, classes, identifiant)
+Element = Tuple[str, FrozenSet[str], Optional[str]]
+
+# Éléments jamais stylés (en-tête du document, éléments non affichés)
+UNSTYLED_TAGS = frozenset({"html", "head", "title", "meta", "link", "style", "script", "base", "br"})
+
+# Nombre maximum de chemins d'éléments mémorisés par feuille de style
+MEMO_SIZE = 10000
+
+_COMBINATOR = re.compile(r"\s*(>)\s*|\s+")
+_COMPOUND = re.compile(r"(\*|[a-zA-Z][\w-]*)?((?:[.#]-?[_a-zA-Z][\w-]*)*)")
+_SIMPLE = re.compile(r"([.#])(-?[_a-zA-Z][\w-]*)")
+# Pseudo-élément : jamais concerné par l'attribut style de l'élément
+_PSEUDO_ELEMENT = re.compile(r"::|:(?:before|after|first-line|first-letter)\b", re.I)
+
+
+def _compile_compound(text: str):
+    """(balise, classes, identifiant) d'un sélecteur simple, ou None s'il n'est pas recopiable"""
+    match = _COMPOUND.fullmatch(text)
+    if not text or not match:
+        return None
+    classes, ids = set(), []
+    for kind, name in _SIMPLE.findall(match.group(2)):
+        if kind == ".":
+            classes.add(name)
+        else:
+            ids.append(name)
+    if len(ids) > 1:
+        return None
+    tag = match.group(1)
+    return (None if tag in (None, "*") else tag.lower()), frozenset(classes), (ids[0] if ids else None)
+
+
+def _compile_selector(selector: str):
+    """
+    Sélecteur compilé de droite à gauche : [(None, sujet), (combinateur,
+    ancêtre), ...], où le combinateur (' ' ou '>') relie l'ancêtre à
+    l'élément précédent de la liste. None si le sélecteur n'est pas
+    recopiable (pseudo-classes, attributs, combinateurs + et ~).
+    """
+    parts = _COMBINATOR.split(selector.strip())
+    # split() intercale le groupe capturé : sélecteur, '>' ou None, sélecteur...
+    compounds = [_compile_compound(text) for text in parts[0::2]]
+    combinators = parts[1::2]
+    if any(compound is None for compound in compounds):
+        return None
+    chain = [(None, compounds[-1])]
+    for i in range(len(compounds) - 2, -1, -1):
+        chain.append((">" if combinators[i] else " ", compounds[i]))
+    return chain
+
+
+def _specificity(chain) -> Tuple[int, int, int]:
+    return (sum(1 for _, (_, _, id_) in chain if id_),
+            sum(len(classes) for _, (_, classes, _) in chain),
+            sum(1 for _, (tag, _, _) in chain if tag))
+
+
+def _family(prop: str) -> str:
+    """Famille d'une propriété : padding pour padding-left, background pour background-color..."""
+    return prop.split("-", 1)[0] if not prop.startswith("-") else prop
+
+
+def _is_important(value: str) -> bool:
+    return value.endswith("!important")
+
+
+def _with_important(items: List[Tuple], families: FrozenSet[str]) -> List[Tuple]:
+    """Ajoute !important aux déclarations des règles restantes dont la propriété est recopiée"""
+    out = []
+    for item in items:
+        if item[0] == 'rule' and not all(_PSEUDO_ELEMENT.search(s) for s in item[1].split(",")):
+            declarations = ";".join(
+                f"{prop}:{value}" if _is_important(value) or _family(prop) not in families
+                else f"{prop}:{value}!important"
+                for prop, value in parse_declarations(item[2]))
+            out.append(('rule', item[1], declarations))
+        elif item[0] == 'group':
+            out.append(('group', item[1], _with_important(item[2], families)))
+        else:
+            out.append(item)
+    return out
+
+
+def _matches(compound, element: Element) -> bool:
+    tag, classes, id_ = compound
+    return ((tag is None or tag == element[0]) and classes <= element[1]
+            and (id_ is None or id_ == element[2]))
+
+
+def _matches_ancestors(chain, i: int, ancestors: Tuple[Element, ...], end: int) -> bool:
+    """Vérifie chain[i:] sur les ancêtres ancestors[:end] (le plus proche en dernier)"""
+    if i == len(chain):
+        return True
+    combinator, compound = chain[i]
+    if combinator == ">":
+        return (end > 0 and _matches(compound, ancestors[end - 1])
+                and _matches_ancestors(chain, i + 1, ancestors, end - 1))
+    return any(_matches(compound, ancestors[j]) and _matches_ancestors(chain, i + 1, ancestors, j)
+               for j in range(end - 1, -1, -1))
+
+
+class CompiledStylesheet:
+    """
+    Feuille de style prête à être recopiée dans les balises.
+
+    Args:
+        css: Contenu d'un bloc <style>
+    """
+
+    def __init__(self, css: str):
+        self._index: Dict[str, List[Tuple]] = {}  # '#id', '.classe', 'balise' ou '*' -> règles
+        self._memo: Dict[Tuple, str] = {}
+        self._residuals: Dict[FrozenSet[str], str] = {}
+        residual = []
+        families = set()
+        order = 0
+
+        for item in parse_css(css):
+            if item[0] != 'rule':
+                residual.append(item)
+                continue
+            declarations = tuple(parse_declarations(item[2]))
+            inlined = False
+            kept = []
+            for selector in item[1].split(","):
+                chain = _compile_selector(selector)
+                if chain is None:
+                    kept.append(selector.strip())
+                    continue
+                tag, classes, id_ = chain[0][1]
+                key = f"#{id_}" if id_ else f".{min(classes)}" if classes else tag or "*"
+                self._index.setdefault(key, []).append((_specificity(chain), order, chain, declarations))
+                order += 1
+                inlined = True
+            if inlined:
+                families.update(_family(prop) for prop, _ in declarations)
+            if kept:
+                residual.append(('rule', ",".join(kept), item[2]))
+
+        # Familles de propriétés recopiées dans les balises
+        self.inlined = frozenset(families)
+        # Règles restant dans le bloc <style> (media queries, pseudo-classes...)
+        self._residual_items = residual
+        self.residual = self.residual_for(self.inlined)
+
+    def __bool__(self) -> bool:
+        return bool(self._index)
+
+    def residual_for(self, inlined: FrozenSet[str]) -> str:
+        """
+        Règles restantes, avec !important sur les propriétés dont une famille
+        figure dans inlined (propriétés recopiées dans les balises)
+        """
+        residual = self._residuals.get(inlined)
+        if residual is None:
+            residual = self._residuals[inlined] = serialize_css(_with_important(self._residual_items, inlined))
+        return residual
+
+    def style_for(self, ancestors: Tuple[Element, ...], element: Element) -> str:
+        """Déclarations (minifiées) s'appliquant à un élément, selon ses ancêtres"""
+        key = (ancestors, element)
+        style = self._memo.get(key)
+        if style is not None:
+            return style
+
+        tag, classes, id_ = element
+        index = self._index
+        candidates = index.get("*", []) + index.get(tag, [])
+        for name in classes:
+            candidates += index.get(f".{name}", [])
+        if id_:
+            candidates += index.get(f"#{id_}", [])
+
+        # Cascade : !important, puis spécificité, puis ordre d'apparition ;
+        # la dernière valeur l'emporte
+        merged, important = {}, {}
+        for _, _, chain, declarations in sorted(candidates, key=lambda rule: rule[:2]):
+            if _matches(chain[0][1], element) and _matches_ancestors(chain, 1, ancestors, len(ancestors)):
+                for prop, value in declarations:
+                    target = important if _is_important(value) else merged
+                    target.pop(prop, None)
+                    target[prop] = value
+        for prop, value in important.items():
+            merged.pop(prop, None)
+            merged[prop] = value
+        style = ";".join(f"{prop}:{value}" for prop, value in merged.items())
+
+        if len(self._memo) >= MEMO_SIZE:
+            self._memo.clear()
+        self._memo[key] = style
+        return style
+
+
+@lru_cache(maxsize=8)
+def compile_stylesheet(css: str) -> CompiledStylesheet:
+    """Feuille de style compilée, mémoïsée tant que son texte ne change pas"""
+    return CompiledStylesheet(css)
+
+
+@lru_cache(maxsize=1024)
+def _merge_styles(inherited: str, own: Optional[str]) -> str:
+    """
+    Ajoute le style propre d'un élément (prioritaire, sauf sur une
+    déclaration !important de la feuille) aux déclarations de la feuille
+    """
+    if not own:
+        return inherited
+    merged = dict(parse_declarations(inherited))
+    for prop, value in parse_declarations(own):
+        if _is_important(merged.get(prop, "")) and not _is_important(value):
+            continue
+        merged.pop(prop, None)
+        merged[prop] = value
+    return ";".join(f"{prop}:{value}" for prop, value in merged.items())
+
+
+class _InlineWriter(HTMLParser):
+    """Recopie le document en un passage, en ajoutant les styles aux balises ouvrantes"""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=False)
+        self.out: List[str] = []
+        self._stack: List[Element] = []
+        self._css: List[str] = []
+        self._sheet: Optional[CompiledStylesheet] = None
+        self._style_tag: Optional[str] = None  # balise <style> en attente de son contenu
+        self._style_css = ""
+
+    def _start(self, tag, attrs, closed):
+        if tag == "style" and not closed:
+            self._style_tag = self.get_starttag_text()
+            self._style_css = ""
+            return
+
+        classes = frozenset()
+        id_ = None
+        for name, value in attrs:
+            if name == "class" and value:
+                classes = frozenset(value.split())
+            elif name == "id":
+                id_ = value
+        element = (tag, classes, id_)
+
+        style = ""
+        if self._sheet and tag not in UNSTYLED_TAGS:
+            style = self._sheet.style_for(tuple(self._stack), element)
+        if style:
+            own = next((value for name, value in attrs if name == "style"), None)
+            attrs = [(name, value) for name, value in attrs if name != "style"]
+            attrs.append(("style", _merge_styles(style, own)))
+            closing = " /" if closed and tag not in VOID_TAGS else ""
+            self.out.append(f"<{tag}{''.join(format_attribute(n, v, minify=False) for n, v in attrs)}{closing}>")
+        else:
+            self.out.append(self.get_starttag_text())
+
+        if not closed and tag not in VOID_TAGS:
+            self._stack.append(element)
+
+    def handle_starttag(self, tag, attrs):
+        self._start(tag, attrs, False)
+
+    def handle_startendtag(self, tag, attrs):
+        self._start(tag, attrs, True)
+
+    def handle_endtag(self, tag):
+        if tag == "style" and self._style_tag is not None:
+            # Feuille de style complète : compilée (ou reprise du cache) ; seul
+            # ce qui ne peut pas être recopié reste dans le bloc
+            self._css.append(self._style_css)
+            self._sheet = compile_stylesheet("\n".join(self._css))
+            residual = compile_stylesheet(self._style_css).residual_for(self._sheet.inlined)
+            if residual:
+                self.out.append(f"{self._style_tag}{residual}</style>")
+            self._style_tag = None
+            return
+        # Fermer l'élément et ceux restés ouverts à l'intérieur
+        for i in range(len(self._stack) - 1, -1, -1):
+            if self._stack[i][0] == tag:
+                del self._stack[i:]
+                break
+        self.out.append(f"</{tag}>")
+
+    def handle_data(self, data):
+        if self._style_tag is not None:
+            self._style_css += data
+        else:
+            self.out.append(data)
+
+    def handle_entityref(self, name):
+        self.out.append(f"&{name};")
+
+    def handle_charref(self, name):
+        self.out.append(f"&#{name};")
+
+    def handle_comment(self, data):
+        self.out.append(f"<!--{data}-->")
+
+    def handle_decl(self, decl):
+        self.out.append(f"<!{decl}>")
+
+    def handle_pi(self, data):
+        self.out.append(f"<?{data}>")
+
+    def unknown_decl(self, data):
+        self.out.append(f"<![{data}]>")
+
+
+def inline_css(html_content: str) -> str:
+    """
+    Recopie les règles des blocs <style> du document dans l'attribut style
+    des éléments qu'elles ciblent ; le style propre d'un élément reste
+    prioritaire.
+    """
+    writer = _InlineWriter()
+    writer.feed(html_content)
+    writer.close()
+    return "".join(writer.out)
@@ -55,7 +55,7 @@ L'équipe de l'Association Gamadji''',
     
     # Sauvegarde
     filename = f"demo_email_template_{datetime.now().strftime('%Y%m%d_%H%M%S')}.html"
-    filepath = generator.save_html(html_content, filename)
+    filepath = generator.save_html(html_content, filename, title=demo_data['title'])
     
     print()
     print("✅ DÉMONSTRATION TERMINÉE !")
@@ -0,0 +1,203 @@
+"""
+Moteur d'envoi asynchrone (asyncio)
+Association Gamadji Saré
+
+Envoie les emails depuis un seul processus avec K sessions SMTP
+concurrentes (aiosmtplib), alimentées par une file asyncio lue depuis
+la base des destinataires. Un limiteur de débit global borne le nombre d'emails
+par minute, et chaque session est recyclée après un nombre maximum de
+messages. Ne nécessite ni Redis ni worker Celery.
+"""
+
+import asyncio
+import time
+from pathlib import Path
+from typing import Dict, Optional
+
+from .message_cache import message_cache
+from .recipient_store import iter_recipients
+
+
+class AsyncRateLimiter:
+    """Seau à jetons asyncio partagé par toutes les sessions"""
+
+    def __init__(self, rate_per_minute: float, burst: int = 1):
+        self.interval = 60.0 / rate_per_minute if rate_per_minute else 0.0
+        self.capacity = max(1, burst)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        """Attend qu'un jeton soit disponible puis le consomme"""
+        if not self.interval:
+            return
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) / self.interval)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) * self.interval)
+
+
+class AsyncEmailSender:
+    """
+    Envoi en masse concurrent basé sur asyncio et aiosmtplib.
+
+    Args:
+        sender: EmailSender déjà configuré (paramètres SMTP, template, titre)
+        concurrency: Nombre de sessions SMTP simultanées (K)
+        rate_per_minute: Nombre maximum d'emails par minute, toutes sessions confondues (0 = illimité)
+        max_messages_per_session: Nombre de messages avant de recycler une session
+    """
+
+    def __init__(self, sender, concurrency: int = 4, rate_per_minute: float = 60,
+                 max_messages_per_session: int = 100):
+        self.sender = sender
+        self.concurrency = max(1, concurrency)
+        self.rate_per_minute = rate_per_minute
+        self.max_messages_per_session = max(1, max_messages_per_session)
+
+    async def _connect(self):
+        """Ouvre et authentifie une session SMTP asynchrone"""
+        import aiosmtplib
+
+        smtp = aiosmtplib.SMTP(
+            hostname=self.sender.SMTP_SERVER,
+            port=self.sender.SMTP_PORT,
+            username=self.sender.EMAIL_SENDER,
+            password=self.sender.EMAIL_PASSWORD,
+            start_tls=self.sender.SMTP_USE_TLS,
+            timeout=30,
+        )
+        await smtp.connect()
+        return smtp
+
+    async def _close(self, smtp):
+        """Ferme proprement une session (QUIT), ou le socket à défaut"""
+        try:
+            await smtp.quit()
+        except Exception:
+            smtp.close()
+
+    async def _produce(self, queue: asyncio.Queue, csv_path: Path, limit: Optional[int]):
+        """Parcourt les destinataires et alimente la file, puis envoie un signal de fin à chaque session"""
+        for row in iter_recipients(csv_path, limit):
+            await queue.put((row["email"], row["name"]))
+        for _ in range(self.concurrency):
+            await queue.put(None)
+
+    async def _session(self, queue: asyncio.Queue, limiter: AsyncRateLimiter,
+                       subject: str, html_content: str, stats: Dict, abort: asyncio.Event):
+        """
+        Consomme la file avec une session SMTP, recyclée après N messages.
+        S'arrête dès que abort est positionné (échec d'une autre tâche).
+        """
+        import aiosmtplib
+
+        message = message_cache.get(html_content, subject, self.sender.EMAIL_SENDER, self.sender.INLINE_LOGO)
+        smtp = None
+        sent_on_session = 0
+
+        try:
+            # aiosmtplib peut absorber une annulation reçue pendant un envoi :
+            # abort est donc aussi vérifié entre deux messages
+            while not abort.is_set():
+                item = await queue.get()
+                if item is None:
+                    break
+                email, name = item
+
+                await limiter.acquire()
+                started = time.perf_counter()
+
+                for attempt in range(2):
+                    try:
+                        if smtp is None or sent_on_session >= self.max_messages_per_session:
+                            if smtp is not None:
+                                await self._close(smtp)
+                            smtp = await self._connect()
+                            sent_on_session = 0
+                        await smtp.sendmail(self.sender.EMAIL_SENDER, [email], message.render(email, name))
+                        sent_on_session += 1
+                        stats["sent"] += 1
+                        stats["latencies"].append(time.perf_counter() - started)
+                        print(f"Email envoyé à {email}")
+                        break
+                    except (aiosmtplib.SMTPException, OSError) as e:
+                        if abort.is_set():
+                            # Annulation : aiosmtplib la signale comme une déconnexion
+                            raise
+                        # Session perdue (déconnexion, erreur réseau ou 421) : on reconnecte
+                        # et on réessaie une fois. Les autres erreurs (adresse refusée...)
+                        # ne concernent que ce destinataire : la session continue.
+                        if isinstance(e, aiosmtplib.SMTPResponseException):
+                            lost = e.code == 421
+                        else:
+                            lost = isinstance(e, OSError)
+                        if lost:
+                            if smtp is not None:
+                                smtp.close()
+                            smtp = None
+                        if attempt or not lost:
+                            stats["failed"].append(email)
+                            print(f"ERREUR: Impossible d'envoyer l'email à {email}. Erreur: {str(e)}")
+                            break
+        except BaseException:
+            # Envoi interrompu (annulation, erreur inattendue) : fermer le socket sans attendre
+            if smtp is not None:
+                smtp.close()
+            raise
+
+        if smtp is not None:
+            if abort.is_set():
+                smtp.close()
+            else:
+                await self._close(smtp)
+
+    async def run(self, csv_path: Optional[Path] = None, limit: Optional[int] = None,
+                  subject: Optional[str] = None, html_content: Optional[str] = None) -> Dict:
+        """
+        Envoie le template à tous les destinataires (base ou fichier CSV csv_path).
+
+        Returns:
+            dict: Statistiques d'envoi (envoyés, échecs, durée, débit)
+        """
+        csv_path = Path(csv_path or self.sender.destinataires_path)
+        subject = subject or self.sender.email_title
+        html_content = html_content or self.sender.html_template
+
+        queue = asyncio.Queue(maxsize=self.concurrency * 2)
+        limiter = AsyncRateLimiter(self.rate_per_minute, burst=self.concurrency)
+        stats = {"sent": 0, "failed": [], "latencies": []}
+        abort = asyncio.Event()
+
+        started = time.perf_counter()
+        tasks = [asyncio.ensure_future(self._produce(queue, csv_path, limit))]
+        tasks += [asyncio.ensure_future(self._session(queue, limiter, subject, html_content, stats, abort))
+                  for _ in range(self.concurrency)]
+        try:
+            await asyncio.gather(*tasks)
+        except BaseException:
+            # Une tâche a échoué : arrêter les autres sessions (et fermer leurs connexions)
+            abort.set()
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+        elapsed = time.perf_counter() - started
+
+        return {
+            "sent": stats["sent"],
+            "failed": stats["failed"],
+            "elapsed": elapsed,
+            "rate_per_second": stats["sent"] / elapsed if elapsed else 0.0,
+            "latencies": stats["latencies"],
+        }
+
+    def send_bulk_emails(self, csv_path: Optional[Path] = None, limit: Optional[int] = None) -> Dict:
+        """Point d'entrée synchrone : exécute run() dans une boucle asyncio"""
+        return asyncio.run(self.run(csv_path=csv_path, limit=limit))
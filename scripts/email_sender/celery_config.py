@@ -6,6 +6,7 @@ Ce module configure Celery avec Redis comme broker et backend de résultats.
 """
 
 from celery import Celery
+from celery.signals import worker_process_init, worker_process_shutdown
 import os
 from pathlib import Path
 
@@ -33,6 +34,19 @@ REDIS_PORT = env_vars.get("REDIS_PORT", "6379")
 REDIS_DB = env_vars.get("REDIS_DB", "0")
 REDIS_URL = f"redis://{REDIS_HOST}:{REDIS_PORT}/{REDIS_DB}"
 
+# Profil de sérialisation des tâches et résultats : 'compact' (msgpack
+# compressé, voir serialization.py) ou 'json'
+SERIALIZATION = env_vars.get("CELERY_SERIALIZATION", "compact").lower()
+if SERIALIZATION == "compact":
+    from .serialization import SERIALIZER_NAME, register_compact_serializer
+    if register_compact_serializer():
+        SERIALIZER = SERIALIZER_NAME
+    else:
+        print("⚠️  msgpack n'est pas installé : sérialisation JSON utilisée")
+        SERIALIZER = "json"
+else:
+    SERIALIZER = "json"
+
 # Créer l'instance Celery
 celery_app = Celery(
     'email_sender',
@@ -47,17 +61,18 @@ celery_app.conf.update(
     timezone='Europe/Paris',
     enable_utc=True,
     
-    # Sérialisation
-    task_serializer='json',
-    result_serializer='json',
-    accept_content=['json'],
+    # Sérialisation (JSON toujours accepté pour relire les anciens messages)
+    task_serializer=SERIALIZER,
+    result_serializer=SERIALIZER,
+    accept_content=sorted({'json', SERIALIZER}),
+    result_accept_content=sorted({'json', SERIALIZER}),
     
     # Résultats
     result_expires=3600,  # Les résultats expirent après 1 heure
     result_persistent=True,
     
-    # Rate limiting pour éviter le spam
-    task_default_rate_limit='10/m',  # Maximum 10 tâches par minute
+    # Rate limiting : assuré globalement par le seau à jetons Redis
+    # (voir rate_limit.py) et non plus par worker
     
     # Retry policy
     task_acks_late=True,
@@ -78,8 +93,37 @@ celery_app.conf.update(
 # Routes des tâches (optionnel, pour organisation future)
 celery_app.conf.task_routes = {
     'scripts.email_sender.tasks.send_email_task': {'queue': 'email_queue'},
+    'scripts.email_sender.tasks.send_batch_task': {'queue': 'email_queue'},
     'scripts.email_sender.tasks.send_bulk_emails_task': {'queue': 'bulk_email_queue'},
+    'scripts.email_sender.tasks.dispatch_window_task': {'queue': 'bulk_email_queue'},
 }
 
+
+_redis_client = None
+
+
+def get_redis_client():
+    """Retourne le client Redis du processus (même instance que le broker)"""
+    global _redis_client
+    if _redis_client is None:
+        import redis
+        _redis_client = redis.Redis.from_url(REDIS_URL)
+    return _redis_client
+
+
+@worker_process_init.connect
+def init_worker_process(**kwargs):
+    """Prépare l'expéditeur une fois par processus worker, et non à chaque tâche"""
+    from .worker_state import init_worker_sender
+    init_worker_sender()
+
+
+@worker_process_shutdown.connect
+def shutdown_worker_process(**kwargs):
+    """Synchronise sur disque les journaux d'envoi avant l'arrêt du processus worker"""
+    from .journal import close_all_journals
+    close_all_journals()
+
+
 if __name__ == '__main__':
     celery_app.start()
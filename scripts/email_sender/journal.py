@@ -0,0 +1,183 @@
+"""
+Journal d'envoi pour reprise après incident
+Association Gamadji Saré
+
+Chaque campagne possède un journal en ajout seul (logs/journal/<id>.log)
+où chaque envoi est consigné avec l'empreinte du template, le destinataire
+et le résultat. Au redémarrage, les destinataires déjà servis sont chargés
+dans un ensemble et ignorés en O(1).
+
+Les écritures sont synchronisées sur disque (fsync) par paquets : après un
+arrêt brutal, au plus les derniers enregistrements d'un paquet peuvent être
+perdus, et seuls ces destinataires recevraient l'email une seconde fois.
+"""
+
+import atexit
+import hashlib
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Optional, Set
+
+JOURNAL_DIR = Path(__file__).parent.parent.parent / "logs" / "journal"
+
+STATUS_SENT = "sent"
+STATUS_FAILED = "failed"
+
+
+def template_hash(html_content: str) -> str:
+    """Empreinte SHA-256 du contenu d'un template"""
+    return hashlib.sha256(html_content.encode("utf-8")).hexdigest()
+
+
+def campaign_id_for(template_digest: str) -> str:
+    """Identifiant de campagne par défaut : dérivé de l'empreinte du template"""
+    return template_digest[:16]
+
+
+class SendJournal:
+    """
+    Journal en ajout seul d'une campagne.
+
+    Args:
+        campaign_id: Identifiant de la campagne (nom du fichier journal)
+        template_digest: Empreinte du template envoyé
+        directory: Dossier des journaux (défaut: logs/journal/)
+        fsync_every: Nombre d'enregistrements entre deux fsync
+        fsync_interval: Délai maximum (secondes) entre deux fsync
+        load: Si True, charge les destinataires déjà servis (inutile pour un simple écrivain)
+    """
+
+    def __init__(self, campaign_id: str, template_digest: str,
+                 directory: Optional[Path] = None,
+                 fsync_every: int = 50, fsync_interval: float = 1.0,
+                 load: bool = True):
+        self.campaign_id = campaign_id
+        self.template_digest = template_digest
+        self.path = Path(directory or JOURNAL_DIR) / f"{campaign_id}.log"
+        self.fsync_every = max(1, fsync_every)
+        self.fsync_interval = fsync_interval
+
+        self.sent: Set[str] = set()
+        self._pending = 0
+        self._last_sync = time.monotonic()
+        self._lock = threading.Lock()
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        if load:
+            self._load()
+        self._fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+
+    def _load(self):
+        """Charge les destinataires déjà servis avec ce template"""
+        if not self.path.exists():
+            return
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                parts = line.rstrip("\n").split("\t")
+                # Une ligne tronquée par un arrêt brutal est ignorée
+                if len(parts) != 4:
+                    continue
+                _, digest, recipient, status = parts
+                if digest == self.template_digest and status == STATUS_SENT:
+                    self.sent.add(recipient.lower())
+
+    def is_sent(self, recipient: str) -> bool:
+        """Indique si ce destinataire a déjà reçu le template"""
+        return recipient.lower() in self.sent
+
+    def record(self, recipient: str, status: str):
+        """Consigne le résultat d'un envoi (une seule écriture atomique par ligne)"""
+        line = f"{time.time():.3f}\t{self.template_digest}\t{recipient}\t{status}\n"
+        with self._lock:
+            os.write(self._fd, line.encode("utf-8"))
+            if status == STATUS_SENT:
+                self.sent.add(recipient.lower())
+            self._pending += 1
+            if (self._pending >= self.fsync_every
+                    or time.monotonic() - self._last_sync >= self.fsync_interval):
+                self._sync()
+
+    def _sync(self):
+        os.fsync(self._fd)
+        self._pending = 0
+        self._last_sync = time.monotonic()
+
+    def flush(self):
+        """Force l'écriture sur disque des enregistrements en attente"""
+        with self._lock:
+            if self._pending and self._fd is not None:
+                self._sync()
+
+    def close(self):
+        """Synchronise et ferme le journal"""
+        with self._lock:
+            if self._fd is None:
+                return
+            if self._pending:
+                self._sync()
+            os.close(self._fd)
+            self._fd = None
+
+    def is_stale(self) -> bool:
+        """
+        Indique si le fichier ouvert n'est plus celui de self.path (journal mis
+        de côté par archive() dans un autre processus, ou supprimé)
+        """
+        if self._fd is None:
+            return True
+        try:
+            current = os.stat(self.path)
+        except FileNotFoundError:
+            return True
+        opened = os.fstat(self._fd)
+        return (opened.st_ino, opened.st_dev) != (current.st_ino, current.st_dev)
+
+    def archive(self):
+        """Met de côté le journal existant pour repartir de zéro (nouvel envoi complet)"""
+        self.close()
+        if self.path.exists():
+            self.path.rename(self.path.with_suffix(f".{int(time.time())}.log"))
+        self.sent.clear()
+        self._fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# Journaux ouverts par le processus (workers Celery), indexés par campagne
+_journals: Dict[str, SendJournal] = {}
+_journals_lock = threading.Lock()
+
+
+def get_journal(campaign_id: str, template_digest: str) -> SendJournal:
+    """
+    Retourne le journal de la campagne, ouvert une seule fois par processus.
+    Il est rouvert si son fichier a été mis de côté entre-temps (nouvel envoi
+    complet avec resume=False) : les écritures vont toujours au journal courant.
+    """
+    with _journals_lock:
+        journal = _journals.get(campaign_id)
+        if journal is not None and journal.is_stale():
+            journal.close()
+            journal = None
+        if journal is None:
+            journal = SendJournal(campaign_id, template_digest, load=False)
+            _journals[campaign_id] = journal
+        return journal
+
+
+def close_all_journals(**kwargs):
+    """Synchronise et ferme tous les journaux ouverts par le processus"""
+    with _journals_lock:
+        journals = list(_journals.values())
+        _journals.clear()
+    for journal in journals:
+        journal.close()
+
+
+atexit.register(close_all_journals)
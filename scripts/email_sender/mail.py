@@ -1,71 +1,83 @@
-import csv
 import time
 import sys
-import glob
 import os
-import smtplib
-from email.mime.multipart import MIMEMultipart
-from email.mime.text import MIMEText
 from pathlib import Path
-from bs4 import BeautifulSoup
+
+from ..template_catalog import get_catalog
+from ..template_metadata import extract_title, template_title
+from .journal import STATUS_FAILED, STATUS_SENT, SendJournal, campaign_id_for, template_hash
+from .message_cache import message_cache
+from .recipient_store import DB_PATH, iter_recipients
+from .smtp_pool import get_smtp_pool
 
 
 class EmailSender:
-    def __init__(self):
-        # Charger les variables d'environnement
-        self.env_vars = self.load_env_file()
+    def __init__(self, template_path=None, env_vars=None, load_template=True):
+        # Charger les variables d'environnement (ou utiliser celles fournies)
+        self.env_vars = env_vars if env_vars is not None else self.load_env_file()
 
         # Ajouter le répertoire parent au path pour pouvoir importer les modules du projet
         self.project_root = Path(__file__).parent.parent.parent
-        sys.path.append(str(self.project_root))
-
-        # Trouver le fichier de template HTML le plus récent
-        template_pattern = str(self.project_root / "output" / "email_template_*.html")
-        template_files = glob.glob(template_pattern)
-
-        if not template_files:
-            raise FileNotFoundError("Aucun fichier de template trouvé dans le dossier output/")
-
-        # Prendre le fichier le plus récent
-        latest_template = max(template_files, key=os.path.getctime)
-
-        # Lire le template HTML
-        with open(latest_template, "r", encoding="utf-8") as file:
-            self.html_template = file.read()
+        if str(self.project_root) not in sys.path:
+            sys.path.append(str(self.project_root))
 
-        # Extraire le titre h1 du template HTML
-        soup = BeautifulSoup(self.html_template, 'html.parser')
-        header_div = soup.select_one('.header')
-        self.email_title = ""
-        if header_div:
-            h1_tag = header_div.find('h1')
-            if h1_tag:
-                self.email_title = h1_tag.text.strip()
-
-        # Si pas trouvé dans le h1, essayer le titre du document
-        if not self.email_title:
-            title_tag = soup.find('title')
-            if title_tag:
-                self.email_title = title_tag.text.strip()
-            else:
-                # Fallback sur le titre généré
-                self.email_title = "Association Gamadji - Informations"
-
-        print(f"Titre extrait du template : {self.email_title}")
+        # Charger le template demandé, ou à défaut le plus récent ; sans
+        # load_template (workers), seuls les paramètres SMTP sont nécessaires
+        # et les templates sont lus dans le magasin de templates
+        self.template_path = self.html_template = self.email_title = None
+        if template_path or load_template:
+            self.load_template(template_path or self.find_latest_template())
 
         # Paramètres du serveur SMTP Gmail
         self.SMTP_SERVER = self.env_vars.get("SMTP_SERVER", "smtp.gmail.com")
         self.SMTP_PORT = int(self.env_vars.get("SMTP_PORT", "587"))
         self.EMAIL_SENDER = self.env_vars.get("EMAIL_SENDER", "")
         self.EMAIL_PASSWORD = self.env_vars.get("EMAIL_PASSWORD", "")  # Mot de passe d'application
+        self.SMTP_USE_TLS = self.env_vars.get("SMTP_USE_TLS", "true").lower() not in ("0", "false", "no", "non")
+        # Logo joint une seule fois en partie inline (cid:) plutôt qu'en base64 dans le HTML
+        self.INLINE_LOGO = self.env_vars.get("EMAIL_LOGO_MODE", "cid").lower() == "cid"
 
         # Vérifier que les variables obligatoires sont définies
         if not self.EMAIL_SENDER or not self.EMAIL_PASSWORD:
             raise ValueError("EMAIL_SENDER et EMAIL_PASSWORD doivent être définis dans le fichier .env")
+
+        # Pool de connexions SMTP partagé par le processus (réutilise les sessions authentifiées)
+        self.pool = get_smtp_pool(
+            self.SMTP_SERVER,
+            self.SMTP_PORT,
+            self.EMAIL_SENDER,
+            self.EMAIL_PASSWORD,
+            max_connections=int(self.env_vars.get("SMTP_POOL_SIZE", "2")),
+            max_messages_per_connection=int(self.env_vars.get("SMTP_MAX_MESSAGES_PER_CONNECTION", "100")),
+            use_tls=self.SMTP_USE_TLS,
+        )
             
-        # Chemin vers le fichier CSV des destinataires
-        self.destinataires_path = Path(__file__).parent / "destinataires.csv"
+        # Base des destinataires (un fichier CSV est aussi accepté)
+        self.destinataires_path = DB_PATH
     
+    def find_latest_template(self):
+        """Retourne le chemin du fichier de template HTML le plus récent"""
+        template_path = get_catalog(self.project_root / "output").latest()
+        if not template_path:
+            raise FileNotFoundError("Aucun fichier de template trouvé dans le dossier output/")
+        return template_path
+
+    def load_template(self, template_path):
+        """Charge un template HTML et en extrait le titre de l'email"""
+        self.template_path = str(template_path)
+
+        # Lire le template HTML
+        with open(self.template_path, "r", encoding="utf-8") as file:
+            self.html_template = file.read()
+
+        self.email_title = template_title(self.template_path, self.html_template)
+        print(f"Titre extrait du template : {self.email_title}")
+
+    @staticmethod
+    def extract_title(html_template):
+        """Extrait le titre h1 de l'en-tête du template (ou le <title> à défaut)"""
+        return extract_title(html_template)
+
     # Fonction pour charger les variables d'environnement depuis le fichier .env
     def load_env_file(self):
         env_vars = {}
@@ -82,64 +94,153 @@ class EmailSender:
         return env_vars
 
     # Fonction pour envoyer un email HTML
-    def send_html_email(self, recipient, subject=None, html_content=None):
+    def send_html_email(self, recipient, subject=None, html_content=None, name=""):
         if subject is None:
             subject = self.email_title
         
         if html_content is None:
             html_content = self.html_template
             
-        # Création du message
-        msg = MIMEMultipart("alternative")
-        msg["Subject"] = subject
-        msg["From"] = self.EMAIL_SENDER
-        # Ajouter uniquement le destinataire en Cci (Bcc)
-        msg["Bcc"] = recipient
-        
-        # Créer la version texte et HTML du message
-        text_part = MIMEText(
-            "Ce message contient du contenu HTML. Si vous ne le voyez pas correctement, "
-            "veuillez utiliser un client mail compatible HTML.", 
-            "plain"
-        )
-        html_part = MIMEText(html_content, "html")
-        
-        # Attacher les deux versions
-        msg.attach(text_part)
-        msg.attach(html_part)
+        # Message sérialisé une seule fois par template, seuls les en-têtes
+        # propres au destinataire (Bcc, Message-ID) et ses champs de fusion
+        # ({{name}}, {{email}}) sont ajoutés
+        message = message_cache.get(html_content, subject, self.EMAIL_SENDER, self.INLINE_LOGO)
         
-        # Connexion au serveur SMTP et envoi
+        # Envoi via une session SMTP du pool (connexion réutilisée)
         try:
-            server = smtplib.SMTP(self.SMTP_SERVER, self.SMTP_PORT)
-            server.ehlo()
-            server.starttls()
-            server.login(self.EMAIL_SENDER, self.EMAIL_PASSWORD)
             # Pour sendmail, nous avons besoin d'un destinataire réel
             # même si dans les en-têtes du message il n'apparaît qu'en Bcc
-            server.sendmail(self.EMAIL_SENDER, [recipient], msg.as_string())
-            server.close()
+            self.pool.sendmail(self.EMAIL_SENDER, [recipient], message.render(recipient, name))
             print(f"Email envoyé à {recipient}")
             return True
         except Exception as e:
             print(f"ERREUR: Impossible d'envoyer l'email à {recipient}. Erreur: {str(e)}")
             return False
     
-    # Méthode pour envoyer des emails à tous les destinataires du fichier CSV
-    def send_bulk_emails(self):
-        # lire le CSV et envoyer les emails
-        with open(self.destinataires_path, "r", encoding="utf-8") as csvfile:
-            reader = csv.DictReader(csvfile)
-            for row in reader:
+    def served_count(self):
+        """Nombre de destinataires ayant déjà reçu ce template d'après le journal (ignorés si resume=True)"""
+        digest = template_hash(self.html_template)
+        with SendJournal(campaign_id_for(digest), digest) as journal:
+            return len(journal.sent)
+    
+    # Méthode pour envoyer des emails à tous les destinataires de la base
+    def send_bulk_emails(self, resume=True, delay_between_emails=5, progress_callback=None, control=None):
+        """
+        Envoie le template à tous les destinataires, un par un.
+        
+        La campagne est identifiée par l'empreinte du template seule : avec
+        resume=True (défaut), renvoyer le même template, même à une liste
+        modifiée, ignore sans autre avertissement tous les destinataires qui
+        l'ont déjà reçu. Pour un nouvel envoi complet, passer resume=False
+        (l'ancien journal est mis de côté).
+        
+        Args:
+            resume: Si True, ignore les destinataires déjà servis avec ce template
+            delay_between_emails: Pause en secondes entre deux emails (défaut: 5)
+            progress_callback: Fonction appelée après chaque email avec
+                               (traités, total, email, succès, latence en secondes)
+            control: SendControl permettant de mettre en pause ou d'annuler l'envoi
+        
+        Returns:
+            dict: Nombre d'emails envoyés, en échec, ignorés, et si l'envoi a été annulé
+        """
+        # Journal de la campagne : les destinataires déjà servis avec ce
+        # template sont ignorés (resume=False repart de zéro)
+        digest = template_hash(self.html_template)
+        journal = SendJournal(campaign_id_for(digest), digest)
+        if not resume:
+            journal.archive()
+        elif journal.sent:
+            print(f"♻️  Reprise: {len(journal.sent)} destinataire(s) déjà servi(s) seront ignoré(s)")
+        
+        stats = {'sent': 0, 'failed': 0, 'skipped': 0, 'cancelled': False}
+        
+        # parcourir les destinataires (curseur sur la base) et envoyer les emails
+        try:
+            total = 0
+            if progress_callback:
+                # Nombre d'emails à envoyer, pour le calcul de l'avancement
+                total = sum(1 for row in iter_recipients(self.destinataires_path)
+                            if not journal.is_sent(row["email"]))
+            
+            for row in iter_recipients(self.destinataires_path):
                 email = row["email"]
                 nom = row["name"]
                 
+                if journal.is_sent(email):
+                    stats['skipped'] += 1
+                    continue
+                
+                if control and not control.checkpoint():
+                    stats['cancelled'] = True
+                    break
+                
                 # Envoyer l'email en utilisant le titre extrait du template
-                self.send_html_email(email)
+                started = time.perf_counter()
+                success = self.send_html_email(email, name=nom)
+                journal.record(email, STATUS_SENT if success else STATUS_FAILED)
+                stats['sent' if success else 'failed'] += 1
+                
+                if progress_callback:
+                    progress_callback(stats['sent'] + stats['failed'], total, email, success,
+                                      time.perf_counter() - started)
                 
                 # Pause pour éviter d'être considéré comme spammeur
-                time.sleep(5)
+                if delay_between_emails:
+                    if control:
+                        if not control.sleep(delay_between_emails):
+                            stats['cancelled'] = True
+                            break
+                    else:
+                        time.sleep(delay_between_emails)
+        finally:
+            journal.close()
+            # Fermer les sessions SMTP restées ouvertes (QUIT)
+            self.pool.close_all()
+        
+        return stats
+    
+    def send_bulk_emails_asyncio(self, concurrency=None, rate_per_minute=None, limit=None):
+        """
+        Envoie les emails depuis ce processus avec plusieurs sessions SMTP
+        concurrentes (asyncio + aiosmtplib). Bloquant, mais sans Redis ni Celery.
+        
+        Args:
+            concurrency: Nombre de sessions SMTP simultanées (défaut: ASYNC_SMTP_CONCURRENCY ou 4)
+            rate_per_minute: Débit maximum global en emails/minute (défaut: ASYNC_RATE_PER_MINUTE ou 60)
+            limit: Limite le nombre de destinataires (pour les tests, optionnel)
+        
+        Returns:
+            dict: Statistiques d'envoi (envoyés, échecs, durée, débit)
+        """
+        try:
+            from .async_sender import AsyncEmailSender
+            import aiosmtplib  # noqa: F401
+        except ImportError:
+            print("❌ aiosmtplib n'est pas installé.")
+            print("💡 Installez les dépendances: pip install -r requirements.txt")
+            return {
+                'status': 'error',
+                'message': 'aiosmtplib non disponible, utilisez send_bulk_emails() à la place'
+            }
+        
+        if concurrency is None:
+            concurrency = int(self.env_vars.get("ASYNC_SMTP_CONCURRENCY", "4"))
+        if rate_per_minute is None:
+            rate_per_minute = float(self.env_vars.get("ASYNC_RATE_PER_MINUTE", "60"))
+        
+        engine = AsyncEmailSender(
+            self,
+            concurrency=concurrency,
+            rate_per_minute=rate_per_minute,
+            max_messages_per_session=int(self.env_vars.get("SMTP_MAX_MESSAGES_PER_CONNECTION", "100"))
+        )
+        stats = engine.send_bulk_emails(limit=limit)
+        stats['status'] = 'completed'
+        return stats
     
-    def send_bulk_emails_async(self, delay_between_emails=5, dry_run=False, limit=None):
+    def send_bulk_emails_async(self, delay_between_emails=5, dry_run=False, limit=None, batch_size=None,
+                               dispatch_mode='paced', resume=True):
         """
         Lance l'envoi en masse d'emails de manière asynchrone avec Celery.
         Cette méthode ne bloque pas et retourne immédiatement.
@@ -148,6 +249,13 @@ class EmailSender:
             delay_between_emails: Délai en secondes entre chaque email (défaut: 5)
             dry_run: Si True, simule l'envoi sans envoyer réellement (défaut: False)
             limit: Limite le nombre de destinataires (pour les tests, optionnel)
+            batch_size: Nombre de destinataires envoyés par tâche et par session SMTP
+                        (None = une tâche par destinataire)
+            dispatch_mode: 'paced' pour publier les tâches juste à temps, fenêtre par
+                           fenêtre (défaut), ou 'countdown' pour tout planifier d'un coup
+            resume: Si True, ignore les destinataires déjà servis avec ce template
+                    (journal de campagne, identifié par l'empreinte du template
+                    seule, même si la liste a changé) ; si False, renvoie à tous
         
         Returns:
             dict: Informations sur la tâche lancée (task_id, nombre d'emails, etc.)
@@ -163,20 +271,25 @@ class EmailSender:
                 print("💡 Les emails seront envoyés en arrière-plan.")
             print("⏳ Vous pouvez continuer à utiliser l'application.")
             
-            # Obtenir le chemin du dernier template
-            latest_template = max(
-                glob.glob(str(self.project_root / "output" / "email_template_*.html")),
-                key=os.path.getctime
-            )
+            from .template_store import get_template_store
+            
+            # Publier le template chargé par cette instance : les workers le
+            # lisent par son empreinte, sans accès au fichier
+            latest_template = self.template_path
+            template_digest = get_template_store().publish(self.html_template, self.email_title)
             
             # Lancer la tâche asynchrone
             result = send_bulk_emails_task.apply_async(
                 kwargs={
-                    'csv_path': str(self.destinataires_path),
+                    'recipients_path': str(self.destinataires_path),
                     'template_path': latest_template,
                     'delay_between_emails': delay_between_emails,
                     'dry_run': dry_run,
-                    'limit': limit
+                    'limit': limit,
+                    'batch_size': batch_size,
+                    'dispatch_mode': dispatch_mode,
+                    'resume': resume,
+                    'template_digest': template_digest
                 }
             )
             
@@ -185,6 +298,8 @@ class EmailSender:
             print(f"🆔 ID de la tâche: {result.id}")
             if limit:
                 print(f"📊 Limitation: {limit} destinataires")
+            if batch_size:
+                print(f"📦 Envoi par lots de {batch_size} destinataires")
             print(f"📊 Utilisez 'python check_email_status.py {result.id}' pour suivre l'avancement")
             
             return {
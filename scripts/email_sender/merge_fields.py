@@ -0,0 +1,106 @@
+"""
+Champs de fusion des templates ({{name}}, {{email}})
+Association Gamadji Saré
+
+Un template peut contenir des champs remplacés pour chaque destinataire :
+{{name}} (ou {{nom}}) et {{email}} (ou {{courriel}}). Le template n'est
+analysé qu'une fois : ses lignes sans champ sont encodées d'avance en
+quoted-printable (encodage ligne par ligne), et les lignes qui contiennent
+des champs sont compilées en segments et emplacements (CompiledTemplate).
+Pour un destinataire, seules ces quelques lignes sont remplies puis
+réencodées ; le reste du corps MIME est réutilisé tel quel.
+"""
+
+import re
+from email import quoprimime
+from html import escape
+from typing import Dict, List, Union
+
+from ..template_html import CompiledTemplate
+
+# {{ name }}, {{nom}}, {{email}}, {{courriel}} (espaces tolérés)
+FIELD_PATTERN = re.compile(r"\{\{\s*(name|nom|email|courriel)\s*\}\}")
+
+# Longueur maximale d'une ligne quoted-printable (RFC 2045)
+QP_LINE_LENGTH = 76
+
+CRLF = "\r\n"
+
+# Octets laissés tels quels par le quoted-printable (ASCII imprimable sauf '=', et tabulation)
+_QP_LITERAL = bytes([9] + [c for c in range(32, 127) if c != ord("=")])
+
+
+def has_merge_fields(text: str) -> bool:
+    """Indique si le texte contient au moins un champ de fusion"""
+    return FIELD_PATTERN.search(text) is not None
+
+
+def merge_values(name: str, email: str, html: bool = True) -> Dict[str, bytes]:
+    """Valeurs des champs (UTF-8) pour un destinataire, échappées pour le HTML si html=True"""
+    name, email = name or "", email or ""
+    if html:
+        name, email = escape(name), escape(email)
+    name, email = name.encode("utf-8"), email.encode("utf-8")
+    return {'name': name, 'nom': name, 'email': email, 'courriel': email}
+
+
+def compile_text(source: str) -> CompiledTemplate:
+    """Compile un texte court (l'objet du mail, par exemple) contenant des champs"""
+    return CompiledTemplate.from_source(source, FIELD_PATTERN)
+
+
+def _qp_encode(line: bytes) -> bytes:
+    """Encode une ligne (sans fin de ligne) en quoted-printable"""
+    if (len(line) <= QP_LINE_LENGTH and not line.translate(None, _QP_LITERAL)
+            and not line.endswith((b" ", b"\t"))):
+        return line  # ligne courte et sans caractère à encoder : inchangée
+    # quoprimime travaille sur une chaîne dont chaque caractère est un octet
+    return quoprimime.body_encode(line.decode("latin-1"), QP_LINE_LENGTH, CRLF).encode("ascii")
+
+
+class MergePlan:
+    """
+    Corps HTML encodé en quoted-printable, prêt à être personnalisé.
+
+    Args:
+        html_content: Template HTML contenant des champs de fusion
+    """
+
+    __slots__ = ("_pieces",)
+
+    def __init__(self, html_content: str):
+        lines = html_content.split("\n")
+        pieces: List[Union[bytes, CompiledTemplate]] = []
+        for i, line in enumerate(lines):
+            eol = CRLF if i < len(lines) - 1 else ""
+            line = line.rstrip("\r")
+            if FIELD_PATTERN.search(line):
+                pieces.append(CompiledTemplate.from_source(line, FIELD_PATTERN))
+                if eol:
+                    pieces.append(eol.encode("ascii"))
+            else:
+                pieces.append(_qp_encode(line.encode("utf-8")) + eol.encode("ascii"))
+
+        # Fusionner les segments encodés voisins : un rendu ne joint que
+        # quelques morceaux, quelle que soit la longueur du template
+        self._pieces = []
+        for piece in pieces:
+            if isinstance(piece, bytes) and self._pieces and isinstance(self._pieces[-1], bytes):
+                self._pieces[-1] += piece
+            else:
+                self._pieces.append(piece)
+        self._pieces = tuple(self._pieces)
+
+    @property
+    def dynamic_lines(self) -> int:
+        """Nombre de lignes réencodées pour chaque destinataire"""
+        return sum(1 for piece in self._pieces if not isinstance(piece, bytes))
+
+    def parts(self, values: Dict[str, bytes]) -> List[bytes]:
+        """Morceaux du corps pour les valeurs données (voir merge_values), à joindre"""
+        return [piece if isinstance(piece, bytes) else _qp_encode(piece.render(**values))
+                for piece in self._pieces]
+
+    def render(self, values: Dict[str, bytes]) -> bytes:
+        """Corps quoted-printable (fins de ligne CRLF) pour les valeurs données"""
+        return b"".join(self.parts(values))
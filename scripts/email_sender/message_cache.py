@@ -0,0 +1,185 @@
+"""
+Cache de messages MIME pré-sérialisés
+Association Gamadji Saré
+
+Le corps MIME (parties texte et HTML encodées) est construit et sérialisé
+une seule fois par template. Pour chaque destinataire, seuls les en-têtes
+qui changent (Bcc, Message-ID) sont ajoutés, directement en octets.
+
+Un template contenant des champs de fusion ({{name}}, {{email}}) est
+envoyé en quoted-printable : le corps MIME est sérialisé une fois autour
+de la partie HTML, dont seules les lignes contenant des champs sont
+réencodées pour chaque destinataire (voir merge_fields).
+
+Le logo de l'association, intégré en base64 (data URI) dans les templates,
+est remplacé par une référence cid: vers une unique partie image/png
+(multipart/related), encodée une seule fois pour tous les messages.
+"""
+
+import base64
+import threading
+from collections import OrderedDict
+from email.generator import BytesGenerator
+from email.mime.image import MIMEImage
+from email.mime.multipart import MIMEMultipart
+from email.mime.nonmultipart import MIMENonMultipart
+from email.mime.text import MIMEText
+from email.policy import SMTP
+from email.utils import make_msgid
+from functools import lru_cache
+from io import BytesIO
+from typing import Optional
+
+from .merge_fields import MergePlan, compile_text, has_merge_fields, merge_values
+
+TEXT_FALLBACK = (
+    "Ce message contient du contenu HTML. Si vous ne le voyez pas correctement, "
+    "veuillez utiliser un client mail compatible HTML."
+)
+
+CRLF = b"\r\n"
+
+# Contenu provisoire de la partie HTML personnalisée, remplacé à chaque rendu
+HTML_MARKER = "{{corps-html}}"
+
+
+@lru_cache(maxsize=1)
+def _logo_part() -> Optional[MIMEImage]:
+    """Partie image du logo, encodée une seule fois pour tout le processus (None sans logo)"""
+    from ..template_html import LOGO_CID, logo_src
+
+    header, _, data = logo_src().partition(",")
+    if not data:
+        return None
+    subtype = header[len("data:image/"):].split(";")[0] or "png"
+    part = MIMEImage(base64.b64decode(data), _subtype=subtype)
+    part["Content-ID"] = f"<{LOGO_CID}>"
+    part["Content-Disposition"] = "inline"
+    return part
+
+
+def _with_inline_logo(html_content: str):
+    """Remplace le logo en data URI par sa référence cid: et retourne (HTML, partie logo)"""
+    from ..template_html import LOGO_CID, logo_src
+
+    logo = logo_src()
+    cid_src = f"cid:{LOGO_CID}"
+    if logo and logo in html_content:
+        return html_content.replace(logo, cid_src), _logo_part()
+    if cid_src in html_content:
+        return html_content, _logo_part()
+    return html_content, None
+
+
+class PreparedMessage:
+    """Message MIME sérialisé une fois, personnalisé par en-têtes et champs de fusion"""
+
+    def __init__(self, html_content: str, subject: str, sender: str, inline_logo: bool = True):
+        self.sender = sender
+        self.msgid_domain = sender.rpartition("@")[2] or None
+
+        logo_part = None
+        if inline_logo:
+            html_content, logo_part = _with_inline_logo(html_content)
+
+        # Champs de fusion compilés une fois (None si le template n'en contient pas)
+        self.merge_plan = MergePlan(html_content) if has_merge_fields(html_content) else None
+        self.subject_plan = compile_text(subject) if has_merge_fields(subject) else None
+
+        if self.merge_plan is None:
+            html_part = MIMEText(html_content, "html")
+        else:
+            html_part = MIMENonMultipart("text", "html", charset="utf-8")
+            html_part["Content-Transfer-Encoding"] = "quoted-printable"
+            html_part.set_payload(HTML_MARKER)
+
+        # Création du message (une seule fois par template)
+        msg = MIMEMultipart("alternative")
+        if self.subject_plan is None:
+            msg["Subject"] = subject
+        msg["From"] = sender
+        msg.attach(MIMEText(TEXT_FALLBACK, "plain"))
+        if logo_part is None:
+            msg.attach(html_part)
+        else:
+            # HTML et logo regroupés : le HTML référence l'image par cid:
+            related = MIMEMultipart("related")
+            related.attach(html_part)
+            related.attach(logo_part)
+            msg.attach(related)
+
+        # Sérialisation avec fins de ligne CRLF, prête pour la commande DATA
+        buffer = BytesIO()
+        BytesGenerator(buffer, policy=msg.policy.clone(linesep="\r\n")).flatten(msg)
+        raw = buffer.getvalue()
+
+        # Séparer les en-têtes communs du corps encodé
+        separator = raw.index(CRLF + CRLF) + len(CRLF)
+        self.headers = raw[:separator]
+        self.body = raw[separator:]
+
+        # Corps découpé autour de la partie HTML personnalisée
+        if self.merge_plan is not None:
+            self._body_head, _, self._body_tail = self.body.partition(HTML_MARKER.encode("ascii"))
+
+    @property
+    def personalized(self) -> bool:
+        """Indique si le message dépend du nom ou de l'email du destinataire"""
+        return self.merge_plan is not None or self.subject_plan is not None
+
+    def render(self, recipient: str, name: str = "") -> bytes:
+        """Retourne le message complet pour un destinataire (name : valeur de {{name}})"""
+        personal = (
+            SMTP.fold_binary("Bcc", recipient)
+            + SMTP.fold_binary("Message-ID", make_msgid(domain=self.msgid_domain))
+        )
+        if self.subject_plan is not None:
+            subject = self.subject_plan.render(**merge_values(name, recipient, html=False))
+            # Objet encodé selon la RFC 2047 s'il contient des caractères non ASCII
+            personal += SMTP.fold_binary(*SMTP.header_store_parse("Subject", subject.decode("utf-8")))
+        if self.merge_plan is None:
+            return b"".join((self.headers, personal, self.body))
+        return b"".join((self.headers, personal, self._body_head,
+                         *self.merge_plan.parts(merge_values(name, recipient)), self._body_tail))
+
+    @property
+    def size(self) -> int:
+        """Taille approximative du message sérialisé (octets)"""
+        return len(self.headers) + len(self.body)
+
+
+class MessageCache:
+    """Cache LRU des messages préparés, indexé par (sujet, expéditeur, mode du logo, HTML)"""
+
+    def __init__(self, max_entries: int = 8):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, html_content: str, subject: str, sender: str,
+            inline_logo: bool = True) -> PreparedMessage:
+        """Retourne le message préparé pour ce template, en le construisant au besoin"""
+        # Le hash d'une chaîne est mis en cache par Python : la clé reste
+        # bon marché tant que le même objet HTML est réutilisé
+        key = (subject, sender, inline_logo, html_content)
+        with self._lock:
+            message = self._entries.get(key)
+            if message is not None:
+                self._entries.move_to_end(key)
+                return message
+
+        message = PreparedMessage(html_content, subject, sender, inline_logo)
+        with self._lock:
+            self._entries[key] = message
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return message
+
+    def clear(self):
+        """Vide le cache"""
+        with self._lock:
+            self._entries.clear()
+
+
+# Cache partagé par toutes les instances d'EmailSender du processus
+message_cache = MessageCache()
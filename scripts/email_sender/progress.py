@@ -0,0 +1,278 @@
+"""
+Suivi de l'avancement des envois en masse
+Association Gamadji Saré
+
+Chaque envoi en masse tient dans Redis un petit hash de compteurs
+(bulk:<id>:stats : total, sent, failed) que les workers incrémentent de
+manière atomique à chaque résultat définitif. Consulter l'avancement ne
+coûte donc qu'une lecture, quel que soit le nombre de destinataires.
+
+Les workers publient en plus un événement compact par envoi (envoyé, échec
+ou nouvelle tentative, avec sa latence) sur le canal Redis progress:<id>.
+follow_progress() s'y abonne pour suivre l'envoi en direct (débit, temps
+restant, erreurs) sans interroger Redis en boucle.
+"""
+
+import json
+import time
+from collections import deque
+from typing import Dict, Iterable, Iterator, Optional, Sequence, Tuple
+
+# Durée de conservation des compteurs (7 jours, comme les autres données d'envoi)
+STATS_TTL = 7 * 24 * 3600
+
+# Nombre de résultats de sous-tâches lus par commande MGET
+MGET_BATCH_SIZE = 1000
+
+# Types d'événements publiés par les workers
+EVENT_SENT = "sent"
+EVENT_FAILED = "failed"
+EVENT_RETRY = "retry"
+
+# Fenêtre (secondes) sur laquelle le débit instantané est calculé
+RATE_WINDOW = 30.0
+
+
+def stats_key(bulk_id: str) -> str:
+    """Clé Redis des compteurs d'un envoi en masse"""
+    return f"bulk:{bulk_id}:stats"
+
+
+def progress_channel(bulk_id: str) -> str:
+    """Canal Redis des événements d'un envoi en masse"""
+    return f"progress:{bulk_id}"
+
+
+def encode_event(event: str, recipient: str, latency: float = 0.0) -> str:
+    """Événement compact : [type, destinataire, latence en ms]"""
+    return json.dumps([event, recipient, round(latency * 1000, 1)], separators=(",", ":"))
+
+
+def decode_event(payload) -> Tuple[str, str, float]:
+    """Décode un événement produit par encode_event() (latence en secondes)"""
+    event, recipient, latency_ms = json.loads(payload)
+    return event, recipient, latency_ms / 1000
+
+
+def init_bulk_stats(client, bulk_id: str, total: int, skipped: int = 0):
+    """Initialise les compteurs d'un envoi en masse (appelé par la tâche d'orchestration)"""
+    key = stats_key(bulk_id)
+    pipe = client.pipeline()
+    pipe.hset(key, mapping={'total': total, 'skipped': skipped, 'sent': 0, 'failed': 0})
+    pipe.expire(key, STATS_TTL)
+    pipe.execute()
+
+
+def record_outcome(bulk_id: Optional[str], sent: int = 0, failed: int = 0,
+                   events: Sequence[Tuple[str, str, float]] = ()):
+    """
+    Ajoute des résultats définitifs aux compteurs d'un envoi en masse et
+    publie les événements correspondants (type, destinataire, latence),
+    en un seul aller-retour Redis.
+
+    Une erreur Redis est signalée mais n'interrompt jamais l'envoi.
+    """
+    if not bulk_id or not (sent or failed or events):
+        return
+    try:
+        from .celery_config import get_redis_client
+
+        pipe = get_redis_client().pipeline(transaction=False)
+        if sent:
+            pipe.hincrby(stats_key(bulk_id), 'sent', sent)
+        if failed:
+            pipe.hincrby(stats_key(bulk_id), 'failed', failed)
+        channel = progress_channel(bulk_id)
+        for event in events:
+            pipe.publish(channel, encode_event(*event))
+        pipe.execute()
+    except Exception as e:
+        print(f"⚠️  Compteurs d'avancement non mis à jour: {str(e)}")
+
+
+def get_bulk_stats(client, bulk_id: str) -> Optional[Dict[str, int]]:
+    """
+    Lit les compteurs d'un envoi en masse (une seule commande Redis).
+
+    Returns:
+        dict: total, skipped, sent, failed et pending ; None si l'envoi n'a pas de compteurs
+    """
+    raw = client.hgetall(stats_key(bulk_id))
+    if not raw:
+        return None
+    stats = {key.decode() if isinstance(key, bytes) else key: int(value) for key, value in raw.items()}
+    stats['pending'] = max(0, stats.get('total', 0) - stats.get('sent', 0) - stats.get('failed', 0))
+    return stats
+
+
+def aggregate_subtasks(client, backend, subtasks: Iterable) -> Dict[str, int]:
+    """
+    Agrège les résultats des sous-tâches en lisant leurs métadonnées par
+    lots (MGET), pour les envois sans compteurs.
+
+    Args:
+        client: Client Redis du backend de résultats
+        backend: Backend de résultats Celery (pour décoder les métadonnées)
+        subtasks: (ID de sous-tâche, nombre de destinataires)
+
+    Returns:
+        dict: sent, failed et pending
+    """
+    stats = {'sent': 0, 'failed': 0, 'pending': 0}
+    subtasks = list(subtasks)
+
+    for start in range(0, len(subtasks), MGET_BATCH_SIZE):
+        chunk = subtasks[start:start + MGET_BATCH_SIZE]
+        keys = [backend.get_key_for_task(task_id) for task_id, _ in chunk]
+        for (task_id, count), raw in zip(chunk, client.mget(keys)):
+            meta = backend.decode_result(raw) if raw else {}
+            state = meta.get('status')
+            result = meta.get('result')
+
+            if state == 'SUCCESS' and isinstance(result, dict) and 'results' in result:
+                # Sous-tâche par lot : compter chaque destinataire du lot
+                for item in result['results']:
+                    if item['status'] == 'success':
+                        stats['sent'] += 1
+                    elif item['status'] == 'failed':
+                        stats['failed'] += 1
+                    else:
+                        stats['pending'] += 1
+            elif state == 'SUCCESS':
+                if isinstance(result, dict) and result.get('status') == 'failed':
+                    stats['failed'] += count
+                else:
+                    stats['sent'] += count
+            elif state == 'FAILURE':
+                stats['failed'] += count
+            else:
+                stats['pending'] += count
+
+    return stats
+
+
+class ProgressTracker:
+    """
+    État d'un envoi suivi en direct : compteurs, débit sur les dernières
+    secondes, temps restant estimé et erreurs.
+    """
+
+    def __init__(self, stats: Optional[Dict[str, int]] = None):
+        self.total = 0
+        self.sent = 0
+        self.failed = 0
+        self.retries = 0
+        self.errors = deque(maxlen=5)  # derniers destinataires en erreur
+        self.last_latency = 0.0
+        self._done = deque()  # instants des derniers résultats
+        if stats:
+            self.sync(stats)
+
+    def sync(self, stats: Dict[str, int]):
+        """Recale les compteurs sur ceux tenus dans Redis (qui font foi)"""
+        self.total = stats.get('total', self.total)
+        self.sent = stats.get('sent', self.sent)
+        self.failed = stats.get('failed', self.failed)
+
+    def apply(self, event: str, recipient: str, latency: float):
+        """Prend en compte un événement publié par un worker"""
+        now = time.monotonic()
+        if event == EVENT_SENT:
+            self.sent += 1
+            self.last_latency = latency
+            self._done.append(now)
+        elif event == EVENT_FAILED:
+            self.failed += 1
+            self.errors.append(recipient)
+            self._done.append(now)
+        elif event == EVENT_RETRY:
+            self.retries += 1
+            self.errors.append(recipient)
+
+    @property
+    def pending(self) -> int:
+        return max(0, self.total - self.sent - self.failed)
+
+    @property
+    def rate(self) -> float:
+        """Débit (emails traités par seconde) sur les RATE_WINDOW dernières secondes"""
+        now = time.monotonic()
+        while self._done and now - self._done[0] > RATE_WINDOW:
+            self._done.popleft()
+        if not self._done:
+            return 0.0
+        return len(self._done) / max(1.0, min(RATE_WINDOW, now - self._done[0]))
+
+    @property
+    def eta(self) -> Optional[float]:
+        """Temps restant estimé (secondes), ou None si le débit est inconnu"""
+        rate = self.rate
+        return self.pending / rate if rate else None
+
+    def snapshot(self) -> Dict:
+        """Vue figée de l'état (pour l'affichage)"""
+        return {
+            'total': self.total,
+            'sent': self.sent,
+            'failed': self.failed,
+            'retries': self.retries,
+            'pending': self.pending,
+            'rate': self.rate,
+            'eta': self.eta,
+            'last_latency': self.last_latency,
+            'errors': list(self.errors),
+        }
+
+
+def follow_progress(client, bulk_id: str, tick: float = 1.0,
+                    resync_every: float = 5.0) -> Iterator[Dict]:
+    """
+    Suit un envoi en masse via son canal d'événements.
+
+    Produit un instantané (voir ProgressTracker.snapshot) après chaque
+    événement et au moins toutes les `tick` secondes, jusqu'à ce qu'il ne
+    reste plus aucun destinataire en attente. Les compteurs sont recalés
+    sur Redis toutes les `resync_every` secondes (événements manqués ou
+    comptés deux fois autour de l'abonnement) et avant de conclure.
+    """
+    pubsub = client.pubsub(ignore_subscribe_messages=True)
+    pubsub.subscribe(progress_channel(bulk_id))
+    try:
+        tracker = ProgressTracker()
+        synced = None
+        while True:
+            if synced is None or time.monotonic() - synced >= resync_every or not tracker.pending:
+                stats = get_bulk_stats(client, bulk_id)
+                synced = time.monotonic()
+                if stats:
+                    tracker.sync(stats)
+                    if not stats['pending']:
+                        yield tracker.snapshot()
+                        return
+
+            message = pubsub.get_message(timeout=tick)
+            if message and message.get('type') == 'message':
+                tracker.apply(*decode_event(message['data']))
+            yield tracker.snapshot()
+    finally:
+        pubsub.close()
+
+
+def format_duration(seconds: Optional[float]) -> str:
+    """Durée lisible (ex. '6 min 22 s'), ou '?' si inconnue"""
+    if seconds is None:
+        return "?"
+    seconds = int(round(seconds))
+    if seconds >= 3600:
+        return f"{seconds // 3600} h {seconds % 3600 // 60:02d} min"
+    if seconds >= 60:
+        return f"{seconds // 60} min {seconds % 60:02d} s"
+    return f"{seconds} s"
+
+
+def format_progress(snapshot: Dict) -> str:
+    """Ligne de suivi en direct : avancement, erreurs, débit et temps restant"""
+    done = snapshot['sent'] + snapshot['failed']
+    return (f"✅ {snapshot['sent']}/{snapshot['total']}   ❌ {snapshot['failed']}   "
+            f"🔄 {snapshot['retries']}   ⚡ {snapshot['rate']:.1f} emails/s   "
+            f"⏱️  reste {format_duration(snapshot['eta']) if done < snapshot['total'] else '0 s'}")
@@ -0,0 +1,113 @@
+"""
+Limitation de débit globale partagée via Redis
+Association Gamadji Saré
+
+Seau à jetons distribué : chaque envoi doit obtenir un jeton dans tous les
+budgets configurés (par minute, par heure, par jour) avant de partir. Les
+budgets sont stockés dans le Redis du broker Celery, ils s'appliquent donc
+à l'ensemble des workers, quel que soit leur nombre ou leur machine.
+"""
+
+import time
+from typing import Dict, Optional
+
+# Fenêtre (secondes) associée à chaque variable du fichier .env
+BUDGET_WINDOWS = {
+    "RATE_LIMIT_PER_MINUTE": 60,
+    "RATE_LIMIT_PER_HOUR": 3600,
+    "RATE_LIMIT_PER_DAY": 86400,
+}
+
+# Vérifie tous les seaux puis consomme un jeton dans chacun, de manière
+# atomique. Retourne "0" si le jeton est accordé, sinon l'attente en secondes.
+# KEYS: un seau par fenêtre ; ARGV: capacité et durée de chaque fenêtre
+_ACQUIRE_SCRIPT = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local tokens = {}
+local wait = 0
+for i = 1, #KEYS do
+    local capacity = tonumber(ARGV[2 * i - 1])
+    local window = tonumber(ARGV[2 * i])
+    local rate = capacity / window
+    local data = redis.call('HMGET', KEYS[i], 'tokens', 'ts')
+    local current = tonumber(data[1]) or capacity
+    local ts = tonumber(data[2]) or now
+    current = math.min(capacity, current + math.max(0, now - ts) * rate)
+    tokens[i] = current
+    if current < 1 then
+        wait = math.max(wait, (1 - current) / rate)
+    end
+end
+if wait > 0 then
+    return tostring(wait)
+end
+for i = 1, #KEYS do
+    redis.call('HSET', KEYS[i], 'tokens', tostring(tokens[i] - 1), 'ts', tostring(now))
+    redis.call('EXPIRE', KEYS[i], 2 * tonumber(ARGV[2 * i]))
+end
+return '0'
+"""
+
+
+class RedisTokenBucket:
+    """
+    Seau à jetons multi-fenêtres stocké dans Redis.
+
+    Args:
+        client: Client Redis
+        name: Identifiant du quota (par exemple l'adresse d'envoi)
+        budgets: Dictionnaire {durée de la fenêtre en secondes: nombre d'emails}
+    """
+
+    def __init__(self, client, name: str, budgets: Dict[int, int]):
+        self.client = client
+        self.budgets = {window: budget for window, budget in budgets.items() if budget > 0}
+        self.keys = [f"email_rate:{name}:{window}" for window in self.budgets]
+        self.args = [value for window, budget in self.budgets.items() for value in (budget, window)]
+        self._script = client.register_script(_ACQUIRE_SCRIPT) if self.budgets else None
+
+    def try_acquire(self) -> float:
+        """Tente de prendre un jeton : retourne 0 si accordé, sinon l'attente en secondes"""
+        if not self.budgets:
+            return 0.0
+        return float(self._script(keys=self.keys, args=self.args))
+
+    def acquire(self, max_wait: float = 60.0) -> float:
+        """
+        Attend un jeton pendant au plus max_wait secondes.
+
+        Returns:
+            float: 0 si le jeton est obtenu, sinon l'attente restante estimée
+                   (à utiliser comme countdown pour replanifier l'envoi)
+        """
+        deadline = time.monotonic() + max_wait
+        while True:
+            wait = self.try_acquire()
+            if not wait:
+                return 0.0
+            remaining = deadline - time.monotonic()
+            if wait > remaining:
+                return wait
+            time.sleep(wait)
+
+
+_limiter: Optional[RedisTokenBucket] = None
+
+
+def get_rate_limiter() -> RedisTokenBucket:
+    """Retourne le limiteur global du processus, configuré depuis le fichier .env"""
+    global _limiter
+    if _limiter is None:
+        from .celery_config import env_vars, get_redis_client
+
+        budgets = {
+            window: int(env_vars.get(variable, default))
+            for (variable, window), default in zip(BUDGET_WINDOWS.items(), ("20", "0", "0"))
+        }
+        _limiter = RedisTokenBucket(
+            get_redis_client(),
+            env_vars.get("EMAIL_SENDER", "default"),
+            budgets
+        )
+    return _limiter
@@ -0,0 +1,330 @@
+"""
+Base des destinataires (SQLite)
+Association Gamadji Saré
+
+Les destinataires sont rangés dans une base SQLite (destinataires.db) en
+mode WAL : l'interface graphique, le gestionnaire en ligne de commande et
+les workers la lisent en même temps qu'elle est modifiée, sans jamais voir
+un fichier à moitié réécrit. Un index unique sur l'email normalisé rend
+la détection des doublons et chaque ajout, modification ou suppression
+indépendants de la taille de la liste, et les envois parcourent les
+destinataires avec un curseur, par paquets.
+
+Le fichier destinataires.csv reste le format d'échange : il est importé
+dans la base à sa création, d'autres CSV peuvent y être importés (les
+nouveaux destinataires sont ajoutés, les noms mis à jour) et la base peut
+être exportée en CSV à tout moment. Une fois la base créée, c'est elle qui
+fait foi.
+"""
+
+import csv
+import os
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, Optional, Tuple
+
+DB_PATH = Path(__file__).parent / "destinataires.db"
+
+# Nombre de lignes lues par aller-retour du curseur
+FETCH_SIZE = 1000
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS recipients (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    email TEXT NOT NULL,
+    email_key TEXT NOT NULL
+);
+CREATE UNIQUE INDEX IF NOT EXISTS recipients_email_key ON recipients (email_key);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+
+def normalize_email(email: str) -> str:
+    """
+    Forme canonique d'une adresse (clé d'unicité) : minuscules, domaine
+    internationalisé converti en punycode. Utilisée par tous les chemins
+    d'ajout (interface, gestionnaire, import), pour qu'une même adresse ait
+    toujours la même clé.
+    """
+    email = email.strip().lower()
+    if not email.isascii():
+        local, sep, domain = email.rpartition("@")
+        if sep:
+            try:
+                email = f"{local}@{domain.encode('idna').decode('ascii')}"
+            except UnicodeError:
+                pass
+    return email
+
+
+class RecipientStore:
+    """
+    Dépôt des destinataires.
+
+    Args:
+        path: Fichier de la base (défaut: scripts/email_sender/destinataires.db)
+        csv_path: CSV importé à la création de la base (défaut: même nom,
+                  extension .csv ; None pour n'en importer aucun)
+    """
+
+    def __init__(self, path=None, csv_path=...):
+        self.path = Path(path or DB_PATH)
+        self.csv_path = self.path.with_suffix(".csv") if csv_path is ... else (
+            Path(csv_path) if csv_path else None)
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(str(self.path), timeout=30)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(_SCHEMA)
+
+        if self.csv_path is not None:
+            self._migrate_csv()
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # Lecture
+
+    def count(self) -> int:
+        return self.conn.execute("SELECT COUNT(*) FROM recipients").fetchone()[0]
+
+    def get(self, email: str) -> Optional[Dict[str, str]]:
+        row = self.conn.execute("SELECT name, email FROM recipients WHERE email_key = ?",
+                                (normalize_email(email),)).fetchone()
+        return {'name': row[0], 'email': row[1]} if row else None
+
+    def contains(self, email: str) -> bool:
+        return self.conn.execute("SELECT 1 FROM recipients WHERE email_key = ?",
+                                 (normalize_email(email),)).fetchone() is not None
+
+    def last_id(self) -> int:
+        """Identifiant du dernier destinataire ajouté (0 si la base est vide)"""
+        return self.conn.execute("SELECT COALESCE(MAX(id), 0) FROM recipients").fetchone()[0]
+
+    def iter_recipients(self, fetch_size: int = FETCH_SIZE, after_id: int = 0) -> Iterator[Dict[str, str]]:
+        """
+        Parcourt les destinataires dans l'ordre d'ajout, par paquets de
+        fetch_size lignes (after_id : seulement ceux ajoutés après cet identifiant)
+        """
+        cursor = self.conn.execute("SELECT name, email FROM recipients WHERE id > ? ORDER BY id",
+                                   (after_id,))
+        try:
+            while True:
+                rows = cursor.fetchmany(fetch_size)
+                if not rows:
+                    return
+                for name, email in rows:
+                    yield {'name': name, 'email': email}
+        finally:
+            cursor.close()
+
+    def iter_keys(self, fetch_size: int = FETCH_SIZE) -> Iterator[str]:
+        """Parcourt les emails normalisés de tous les destinataires"""
+        cursor = self.conn.execute("SELECT email_key FROM recipients")
+        try:
+            while True:
+                rows = cursor.fetchmany(fetch_size)
+                if not rows:
+                    return
+                for (key,) in rows:
+                    yield key
+        finally:
+            cursor.close()
+
+    # Modifications
+
+    def add(self, name: str, email: str) -> bool:
+        """Ajoute un destinataire ; retourne False si l'email est déjà présent"""
+        with self.conn:
+            cursor = self.conn.execute(
+                "INSERT OR IGNORE INTO recipients (name, email, email_key) VALUES (?, ?, ?)",
+                (name.strip(), email.strip(), normalize_email(email)))
+        return cursor.rowcount == 1
+
+    def add_many(self, recipients: Iterable[Tuple[str, str]]) -> int:
+        """Ajoute des destinataires (nom, email) en une transaction ; retourne le nombre d'ajouts"""
+        with self.conn:
+            before = self.conn.total_changes
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO recipients (name, email, email_key) VALUES (?, ?, ?)",
+                ((name.strip(), email.strip(), normalize_email(email)) for name, email in recipients))
+            return self.conn.total_changes - before
+
+    def add_normalized(self, rows: Iterable[Tuple[str, str, str]]) -> int:
+        """Ajoute des lignes (nom, email, email normalisé) déjà nettoyées ; retourne le nombre d'ajouts"""
+        with self.conn:
+            before = self.conn.total_changes
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO recipients (name, email, email_key) VALUES (?, ?, ?)", rows)
+            return self.conn.total_changes - before
+
+    def update(self, email: str, name: str, new_email: Optional[str] = None) -> bool:
+        """
+        Modifie le destinataire d'email donné.
+
+        Returns:
+            bool: False si new_email appartient déjà à un autre destinataire
+
+        Raises:
+            KeyError: si aucun destinataire n'a cet email
+        """
+        new_email = (new_email or email).strip()
+        try:
+            with self.conn:
+                cursor = self.conn.execute(
+                    "UPDATE recipients SET name = ?, email = ?, email_key = ? WHERE email_key = ?",
+                    (name.strip(), new_email, normalize_email(new_email), normalize_email(email)))
+        except sqlite3.IntegrityError:
+            return False
+        if cursor.rowcount == 0:
+            raise KeyError(f"Destinataire introuvable: {email}")
+        return True
+
+    def remove(self, email: str) -> bool:
+        """Supprime un destinataire ; retourne False s'il n'existait pas"""
+        with self.conn:
+            cursor = self.conn.execute("DELETE FROM recipients WHERE email_key = ?",
+                                       (normalize_email(email),))
+        return cursor.rowcount == 1
+
+    # Échange CSV
+
+    def import_csv(self, path) -> Tuple[int, int]:
+        """
+        Importe un CSV (colonnes name, email) : les nouveaux destinataires
+        sont ajoutés, ceux déjà présents gardent leur place mais prennent le
+        nom du fichier.
+
+        Returns:
+            tuple: (destinataires ajoutés, lignes ignorées : doublons ou emails invalides)
+        """
+        added = read = invalid = 0
+        with open(path, "r", encoding="utf-8", newline="") as csvfile, self.conn:
+            batch = []
+            for row in csv.DictReader(csvfile):
+                email = (row.get("email") or "").strip()
+                if not email or "@" not in email:
+                    invalid += 1
+                    continue
+                batch.append(((row.get("name") or "").strip(), email, normalize_email(email)))
+                if len(batch) >= FETCH_SIZE:
+                    added += self._merge(batch)
+                    read += len(batch)
+                    batch = []
+            if batch:
+                added += self._merge(batch)
+                read += len(batch)
+        return added, invalid + read - added
+
+    def _merge(self, batch) -> int:
+        """Ajoute un paquet de (nom, email, clé) et met à jour les noms des emails existants"""
+        before = self.conn.total_changes
+        self.conn.executemany(
+            "INSERT OR IGNORE INTO recipients (name, email, email_key) VALUES (?, ?, ?)", batch)
+        added = self.conn.total_changes - before
+        if added < len(batch):
+            self.conn.executemany(
+                "UPDATE recipients SET name = ? WHERE email_key = ? AND name != ?",
+                ((name, key, name) for name, _, key in batch))
+        return added
+
+    def export_csv(self, path) -> int:
+        """Exporte la base vers un CSV (colonnes name, email) ; retourne le nombre de lignes"""
+        path = Path(path)
+        tmp_path = path.with_name(path.name + ".tmp")
+        count = 0
+        with open(tmp_path, "w", newline="", encoding="utf-8") as csvfile:
+            writer = csv.DictWriter(csvfile, fieldnames=["name", "email"])
+            writer.writeheader()
+            for recipient in self.iter_recipients():
+                writer.writerow(recipient)
+                count += 1
+        os.replace(tmp_path, path)
+        if self.csv_path is not None and path.resolve() == self.csv_path.resolve():
+            self._remember_csv()
+        return count
+
+    def _csv_signature(self) -> Optional[str]:
+        try:
+            stat = os.stat(self.csv_path)
+        except OSError:
+            return None
+        return f"{stat.st_mtime_ns}:{stat.st_size}"
+
+    def _remember_csv(self):
+        with self.conn:
+            self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('csv_signature', ?)",
+                              (self._csv_signature() or "",))
+
+    def _migrate_csv(self):
+        """Importe le CSV associé à la création de la base ; signale ensuite ses modifications"""
+        signature = self._csv_signature()
+        if signature is None:
+            return
+        row = self.conn.execute("SELECT value FROM meta WHERE key = 'csv_signature'").fetchone()
+        if row is None:
+            added, _ = self.import_csv(self.csv_path)
+            self._remember_csv()
+            print(f"📥 {added} destinataire(s) importé(s) depuis {self.csv_path.name}")
+        elif row[0] != signature:
+            print(f"⚠️  {self.csv_path.name} a été modifié à la main : la base des destinataires fait foi, "
+                  f"importez-le avec 'python manage_recipients.py --import {self.csv_path}'")
+            self._remember_csv()
+
+
+# Bases ouvertes par le processus, par thread (une connexion SQLite ne se
+# partage pas entre threads) puis par chemin
+_stores = threading.local()
+
+
+def get_store(path=None) -> RecipientStore:
+    """
+    Retourne la base des destinataires, ouverte une seule fois par thread :
+    le schéma et le CSV associé ne sont vérifiés qu'à la première ouverture.
+    """
+    path = Path(path or DB_PATH).resolve()
+    stores = getattr(_stores, "by_path", None)
+    if stores is None:
+        stores = _stores.by_path = {}
+    store = stores.get(path)
+    if store is None:
+        store = stores[path] = RecipientStore(path)
+    return store
+
+
+def iter_recipients(path=None, limit: Optional[int] = None,
+                    store: Optional[RecipientStore] = None) -> Iterator[Dict[str, str]]:
+    """
+    Parcourt les destinataires d'une base (store, ou celle de path ouverte
+    par get_store ; défaut: destinataires.db) ou, pour les anciens appels,
+    directement d'un fichier CSV.
+    """
+    path = Path(path or DB_PATH)
+    count = 0
+    if path.suffix.lower() == ".csv":
+        with open(path, "r", encoding="utf-8") as csvfile:
+            for row in csv.DictReader(csvfile):
+                if limit and count >= limit:
+                    return
+                if row.get("email"):
+                    count += 1
+                    yield {'name': row.get("name") or "", 'email': row["email"]}
+        return
+
+    for recipient in (store or get_store(path)).iter_recipients():
+        if limit and count >= limit:
+            return
+        count += 1
+        yield recipient
@@ -0,0 +1,47 @@
+"""
+Contrôle d'un envoi en cours (pause, reprise, annulation)
+Association Gamadji Saré
+
+Objet partagé entre le thread qui envoie et celui qui le pilote (par
+exemple l'interface graphique) : la boucle d'envoi le consulte avant
+chaque email, et les pauses entre deux emails sont interrompues dès
+qu'une annulation est demandée.
+"""
+
+import threading
+
+
+class SendControl:
+    """Pause, reprise et annulation d'une boucle d'envoi depuis un autre thread"""
+
+    def __init__(self):
+        self._running = threading.Event()
+        self._running.set()
+        self._cancelled = threading.Event()
+
+    def pause(self):
+        self._running.clear()
+
+    def resume(self):
+        self._running.set()
+
+    def cancel(self):
+        self._cancelled.set()
+        self._running.set()  # débloquer une boucle en pause
+
+    @property
+    def paused(self) -> bool:
+        return not self._running.is_set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    def checkpoint(self) -> bool:
+        """Attend la fin d'une éventuelle pause ; retourne False si l'envoi est annulé"""
+        self._running.wait()
+        return not self._cancelled.is_set()
+
+    def sleep(self, seconds: float) -> bool:
+        """Pause interruptible par une annulation ; retourne False si l'envoi est annulé"""
+        return not self._cancelled.wait(seconds)
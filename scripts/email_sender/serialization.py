@@ -0,0 +1,74 @@
+"""
+Sérialisation compacte des messages Celery
+Association Gamadji Saré
+
+Profil "compact" : les messages des tâches et leurs résultats sont encodés
+en msgpack, puis compressés (zstd si le module zstandard est installé, zlib
+sinon) lorsqu'ils dépassent COMPRESS_THRESHOLD octets. Un octet d'en-tête
+indique la compression utilisée, ce qui permet de relire un message quel que
+soit le réglage du processus qui l'a écrit.
+"""
+
+import zlib
+
+SERIALIZER_NAME = "compact"
+CONTENT_TYPE = "application/x-gamadji-compact"
+
+# Taille (octets) au-delà de laquelle un message msgpack est compressé
+COMPRESS_THRESHOLD = 1024
+
+_RAW = 0
+_ZLIB = 1
+_ZSTD = 2
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+def dumps(obj) -> bytes:
+    """Encode un objet en msgpack, compressé s'il est volumineux"""
+    import msgpack
+
+    packed = msgpack.packb(obj, use_bin_type=True)
+    if len(packed) < COMPRESS_THRESHOLD:
+        return bytes((_RAW,)) + packed
+    if zstandard is not None:
+        return bytes((_ZSTD,)) + zstandard.ZstdCompressor(level=3).compress(packed)
+    return bytes((_ZLIB,)) + zlib.compress(packed, 6)
+
+
+def loads(data: bytes):
+    """Décode un message produit par dumps()"""
+    import msgpack
+
+    data = bytes(data)
+    flag, payload = data[0], data[1:]
+    if flag == _ZLIB:
+        payload = zlib.decompress(payload)
+    elif flag == _ZSTD:
+        if zstandard is None:
+            raise ValueError("Message compressé en zstd : installez le module zstandard")
+        payload = zstandard.ZstdDecompressor().decompress(payload)
+    elif flag != _RAW:
+        raise ValueError(f"Format de message inconnu: {flag}")
+    return msgpack.unpackb(payload, raw=False, strict_map_key=False)
+
+
+def register_compact_serializer() -> bool:
+    """
+    Enregistre le profil "compact" auprès de kombu.
+
+    Returns:
+        bool: False si msgpack n'est pas installé (le profil JSON reste utilisé)
+    """
+    try:
+        import msgpack  # noqa: F401
+    except ImportError:
+        return False
+
+    from kombu.serialization import register
+    register(SERIALIZER_NAME, dumps, loads,
+             content_type=CONTENT_TYPE, content_encoding="binary")
+    return True
@@ -0,0 +1,219 @@
+"""
+Pool de connexions SMTP persistantes
+Association Gamadji Saré
+
+Ce module maintient des sessions SMTP authentifiées (EHLO, STARTTLS, LOGIN)
+ouvertes et les réutilise pour plusieurs messages, au lieu d'ouvrir une
+nouvelle connexion par destinataire.
+"""
+
+import os
+import atexit
+import smtplib
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Dict, Optional, Tuple
+
+
+class PooledConnection:
+    """Connexion SMTP authentifiée gérée par le pool"""
+
+    def __init__(self, smtp: smtplib.SMTP):
+        self.smtp = smtp
+        self.messages_sent = 0
+        self.last_used = time.monotonic()
+        self.broken = False
+
+    def is_alive(self) -> bool:
+        """Vérifie que la session répond toujours (commande NOOP)"""
+        try:
+            code, _ = self.smtp.noop()
+            return code == 250
+        except (smtplib.SMTPException, OSError):
+            return False
+
+    def close(self):
+        """Ferme proprement la session (QUIT), ou le socket à défaut"""
+        try:
+            self.smtp.quit()
+        except (smtplib.SMTPException, OSError):
+            try:
+                self.smtp.close()
+            except OSError:
+                pass
+
+
+class SMTPConnectionPool:
+    """
+    Pool thread-safe de connexions SMTP authentifiées.
+
+    Args:
+        server: Adresse du serveur SMTP
+        port: Port du serveur SMTP
+        username: Identifiant de connexion
+        password: Mot de passe (d'application pour Gmail)
+        max_connections: Nombre maximum de sessions ouvertes simultanément
+        max_messages_per_connection: Nombre de messages avant de recycler une session
+        idle_check_after: Délai d'inactivité (secondes) au-delà duquel on vérifie la session par NOOP
+        use_tls: Si True, négocie STARTTLS après EHLO
+        timeout: Timeout réseau des sessions (secondes)
+    """
+
+    def __init__(self, server: str, port: int, username: str, password: str,
+                 max_connections: int = 2,
+                 max_messages_per_connection: int = 100,
+                 idle_check_after: float = 10.0,
+                 use_tls: bool = True,
+                 timeout: float = 30.0):
+        self.server = server
+        self.port = port
+        self.username = username
+        self.password = password
+        self.max_connections = max(1, max_connections)
+        self.max_messages_per_connection = max(1, max_messages_per_connection)
+        self.idle_check_after = idle_check_after
+        self.use_tls = use_tls
+        self.timeout = timeout
+
+        self._idle = deque()
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(self.max_connections)
+
+    def _connect(self) -> PooledConnection:
+        """Ouvre et authentifie une nouvelle session SMTP"""
+        smtp = smtplib.SMTP(self.server, self.port, timeout=self.timeout)
+        try:
+            smtp.ehlo()
+            if self.use_tls:
+                smtp.starttls()
+                smtp.ehlo()
+            if self.username and self.password:
+                smtp.login(self.username, self.password)
+        except Exception:
+            smtp.close()
+            raise
+        return PooledConnection(smtp)
+
+    def _checkout(self) -> PooledConnection:
+        """Récupère une session inactive valide ou en ouvre une nouvelle"""
+        while True:
+            with self._lock:
+                conn = self._idle.pop() if self._idle else None
+            if conn is None:
+                return self._connect()
+            idle_for = time.monotonic() - conn.last_used
+            if idle_for < self.idle_check_after or conn.is_alive():
+                return conn
+            conn.close()
+
+    def _checkin(self, conn: PooledConnection):
+        """Remet une session dans le pool, ou la ferme si elle est usée"""
+        if conn.broken or conn.messages_sent >= self.max_messages_per_connection:
+            conn.close()
+            return
+        conn.last_used = time.monotonic()
+        with self._lock:
+            self._idle.append(conn)
+
+    @contextmanager
+    def connection(self):
+        """Context manager qui prête une session authentifiée du pool"""
+        self._slots.acquire()
+        conn = None
+        try:
+            conn = self._checkout()
+            yield conn
+        except smtplib.SMTPResponseException as e:
+            # Réponse d'erreur du serveur (destinataire refusé...) : la session
+            # reste utilisable, sauf si le serveur annonce sa fermeture (421)
+            if conn is not None and e.smtp_code == 421:
+                conn.broken = True
+            raise
+        except smtplib.SMTPServerDisconnected:
+            if conn is not None:
+                conn.broken = True
+            raise
+        except smtplib.SMTPException:
+            # SMTPException hérite d'OSError : erreur de protocole, session intacte
+            raise
+        except OSError:
+            # Erreur réseau (hors SMTP) : la session n'est plus fiable
+            if conn is not None:
+                conn.broken = True
+            raise
+        finally:
+            if conn is not None:
+                self._checkin(conn)
+            self._slots.release()
+
+    def sendmail(self, from_addr: str, to_addrs, msg) -> dict:
+        """
+        Envoie un message via une session du pool.
+
+        En cas de session perdue (déconnexion ou code 421), la session est
+        jetée et l'envoi est retenté une fois sur une connexion neuve.
+        """
+        for attempt in range(2):
+            try:
+                with self.connection() as conn:
+                    refused = conn.smtp.sendmail(from_addr, to_addrs, msg)
+                    conn.messages_sent += 1
+                    return refused
+            except smtplib.SMTPServerDisconnected:
+                if attempt:
+                    raise
+            except smtplib.SMTPResponseException as e:
+                if attempt or e.smtp_code != 421:
+                    raise
+
+    def close_all(self):
+        """Ferme toutes les sessions inactives du pool"""
+        with self._lock:
+            idle, self._idle = list(self._idle), deque()
+        for conn in idle:
+            conn.close()
+
+
+# Pools partagés par processus, indexés par (serveur, port, identifiant)
+_pools: Dict[Tuple[str, int, str], SMTPConnectionPool] = {}
+_pools_lock = threading.Lock()
+
+
+def get_smtp_pool(server: str, port: int, username: str, password: str,
+                  **options) -> SMTPConnectionPool:
+    """
+    Retourne le pool partagé du processus pour ce serveur et cet identifiant.
+
+    Les options (max_connections, max_messages_per_connection, ...) ne sont
+    prises en compte qu'à la création du pool.
+    """
+    key = (server, port, username)
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = SMTPConnectionPool(server, port, username, password, **options)
+            _pools[key] = pool
+        return pool
+
+
+def close_all_pools():
+    """Ferme toutes les sessions de tous les pools du processus"""
+    with _pools_lock:
+        pools = list(_pools.values())
+    for pool in pools:
+        pool.close_all()
+
+
+def _reset_pools_after_fork():
+    # Les sockets hérités du parent ne doivent pas être partagés avec les
+    # processus enfants (workers Celery en mode prefork)
+    global _pools_lock
+    _pools.clear()
+    _pools_lock = threading.Lock()
+
+
+atexit.register(close_all_pools)
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_pools_after_fork)
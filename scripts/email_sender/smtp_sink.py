@@ -0,0 +1,120 @@
+"""
+Serveur SMTP local de test (puits)
+Association Gamadji Saré
+
+Serveur SMTP minimal qui accepte tous les messages et les jette, pour
+mesurer les performances des différents modes d'envoi sans solliciter
+Gmail. Accepte EHLO/HELO, AUTH PLAIN/LOGIN (tout identifiant), MAIL,
+RCPT, DATA, NOOP, RSET et QUIT. Pas de STARTTLS : les expéditeurs doivent
+être configurés avec SMTP_USE_TLS=false.
+"""
+
+import socketserver
+import threading
+import time
+
+
+class _SMTPHandler(socketserver.StreamRequestHandler):
+    """Gère une session SMTP cliente"""
+
+    def reply(self, line: str):
+        self.wfile.write(line.encode("ascii") + b"\r\n")
+
+    def handle(self):
+        sink = self.server.sink
+        self.reply("220 localhost SMTP sink")
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.decode("ascii", "replace").strip()
+            verb = command.split(" ", 1)[0].upper()
+
+            if verb == "EHLO":
+                self.wfile.write(b"250-localhost\r\n250-AUTH PLAIN LOGIN\r\n250-8BITMIME\r\n250 SIZE 52428800\r\n")
+            elif verb == "HELO":
+                self.reply("250 localhost")
+            elif verb == "AUTH":
+                # Identifiants acceptés sans vérification ; on se contente de
+                # consommer les réponses attendues par le mécanisme choisi
+                parts = command.split()
+                mechanism = parts[1].upper() if len(parts) > 1 else ""
+                if mechanism == "LOGIN":
+                    prompts = ["334 UGFzc3dvcmQ6"] if len(parts) > 2 else ["334 VXNlcm5hbWU6", "334 UGFzc3dvcmQ6"]
+                else:
+                    prompts = [] if len(parts) > 2 else ["334 "]
+                for prompt in prompts:
+                    self.reply(prompt)
+                    self.rfile.readline()
+                self.reply("235 Authentication successful")
+            elif verb in ("MAIL", "RCPT", "RSET", "NOOP"):
+                self.reply("250 OK")
+            elif verb == "DATA":
+                self.reply("354 End data with <CR><LF>.<CR><LF>")
+                size = 0
+                while True:
+                    data = self.rfile.readline()
+                    if not data or data == b".\r\n":
+                        break
+                    size += len(data)
+                if sink.latency:
+                    time.sleep(sink.latency)
+                sink.record(size)
+                self.reply("250 OK queued")
+            elif verb == "QUIT":
+                self.reply("221 Bye")
+                return
+            else:
+                self.reply("502 Command not implemented")
+
+
+class _ThreadingServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class SMTPSink:
+    """
+    Serveur SMTP local qui compte les messages reçus.
+
+    Args:
+        host: Adresse d'écoute
+        port: Port d'écoute (0 = port libre choisi par le système)
+        latency: Délai artificiel (secondes) avant d'accepter chaque message
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency: float = 0.0):
+        self.latency = latency
+        self.messages = 0
+        self.bytes = 0
+        self._lock = threading.Lock()
+        self._server = _ThreadingServer((host, port), _SMTPHandler)
+        self._server.sink = self
+        self._thread = None
+
+    @property
+    def address(self):
+        """(hôte, port) effectivement utilisés"""
+        return self._server.server_address
+
+    def record(self, size: int):
+        with self._lock:
+            self.messages += 1
+            self.bytes += size
+
+    def start(self) -> "SMTPSink":
+        """Démarre le serveur dans un thread d'arrière-plan"""
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Arrête le serveur"""
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
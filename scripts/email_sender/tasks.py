@@ -5,19 +5,51 @@ Association Gamadji Saré
 Ce module définit les tâches asynchrones pour l'envoi d'emails.
 """
 
-import csv
+import json
+import math
+import struct
 import time
 import sys
+import uuid
 from pathlib import Path
-from typing import Optional
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
 
-from .celery_config import celery_app
+from celery.exceptions import Retry
+
+from .celery_config import celery_app, env_vars, get_redis_client
+from .journal import STATUS_FAILED, STATUS_SENT, SendJournal, campaign_id_for, get_journal
+from .progress import EVENT_FAILED, EVENT_RETRY, EVENT_SENT, init_bulk_stats, record_outcome
+from .rate_limit import get_rate_limiter
+from .recipient_store import DB_PATH, iter_recipients
+from .template_store import get_template_store
+from .worker_state import get_sender, get_template
+
+# Attente maximale (secondes) d'un jeton dans le worker avant de replanifier l'envoi
+RATE_LIMIT_MAX_WAIT = float(env_vars.get("RATE_LIMIT_MAX_WAIT", "30"))
+
+# Durée de conservation dans Redis des données d'un envoi en masse (7 jours)
+BULK_DATA_TTL = 7 * 24 * 3600
+
+# Sous-tâche d'un envoi en masse, enregistrée dans bulk:<id>:tasks :
+# ID de tâche (UUID, 16 octets) + nombre de destinataires (4 octets)
+SUBTASK_RECORD = struct.Struct(">16sI")
 
 # Ajouter le répertoire parent au path
 project_root = Path(__file__).parent.parent.parent
 sys.path.insert(0, str(project_root))
 
 
+def _load_template(template_path: Optional[str], template_digest: Optional[str]):
+    """(contenu HTML, titre) depuis le magasin de templates si l'empreinte est connue, sinon depuis le fichier"""
+    if template_digest:
+        try:
+            return get_template_store().get(template_digest)
+        except KeyError:
+            if not template_path:
+                raise
+    return get_template(template_path)
+
+
 @celery_app.task(
     bind=True,
     name='scripts.email_sender.tasks.send_email_task',
@@ -27,7 +59,11 @@ sys.path.insert(0, str(project_root))
 def send_email_task(self, recipient_email: str, recipient_name: str, 
                     template_path: Optional[str] = None, 
                     subject: Optional[str] = None,
-                    dry_run: bool = False):
+                    dry_run: bool = False,
+                    throttle_retries: int = 0,
+                    campaign_id: Optional[str] = None,
+                    template_digest: Optional[str] = None,
+                    bulk_id: Optional[str] = None):
     """
     Tâche Celery pour envoyer un email à un destinataire.
     
@@ -38,20 +74,37 @@ def send_email_task(self, recipient_email: str, recipient_name: str,
         template_path: Chemin vers le template HTML (optionnel)
         subject: Sujet de l'email (optionnel)
         dry_run: Si True, simule l'envoi sans envoyer réellement (défaut: False)
+        throttle_retries: Nombre de replanifications dues au quota (usage interne)
+        campaign_id: Journal de campagne où consigner le résultat (optionnel)
+        template_digest: Empreinte SHA-256 du template, lu dans le magasin de templates
+                         et consignée dans le journal (optionnel)
+        bulk_id: Envoi en masse dont les compteurs d'avancement sont mis à jour (optionnel)
     
     Returns:
         dict: Résultat de l'envoi avec statut et informations
     """
+    # Obtenir un jeton du quota global avant d'envoyer ; si le quota est
+    # épuisé pour longtemps, replanifier sans compter une tentative d'échec
+    if not dry_run:
+        wait = get_rate_limiter().acquire(max_wait=RATE_LIMIT_MAX_WAIT)
+        if wait:
+            print(f"⏸️  Quota d'envoi atteint, nouvel essai dans {wait:.0f} s")
+            # max_retries=None reviendrait au défaut de la tâche : étendre le
+            # budget d'autant de replanifications que dues au quota
+            raise self.retry(
+                countdown=wait,
+                max_retries=self.max_retries + throttle_retries + 1,
+                kwargs={**self.request.kwargs, 'throttle_retries': throttle_retries + 1}
+            )
+    
+    started = time.perf_counter()
     try:
-        # Import local pour éviter les problèmes de circular imports
-        from .mail import EmailSender
-        
         if dry_run:
             print(f"🧪 [TEST] Simulation d'envoi à {recipient_name} <{recipient_email}>...")
             # Simuler un délai d'envoi (rapide pour les tests)
-            import time
             time.sleep(0.5)
             print(f"✅ [TEST] Envoi simulé avec succès à {recipient_name}")
+            record_outcome(bulk_id, sent=1, events=[(EVENT_SENT, recipient_email, 0.0)])
             return {
                 'status': 'success',
                 'recipient': recipient_email,
@@ -63,25 +116,25 @@ def send_email_task(self, recipient_email: str, recipient_name: str,
         
         print(f"📧 Envoi de l'email à {recipient_name} <{recipient_email}>...")
         
-        # Créer une instance d'EmailSender
-        sender = EmailSender()
-        
-        # Charger un template spécifique si fourni
-        if template_path and Path(template_path).exists():
-            with open(template_path, "r", encoding="utf-8") as f:
-                html_content = f.read()
-        else:
-            html_content = sender.html_template
+        # Expéditeur et template préparés une fois par processus worker
+        sender = get_sender()
+        html_content, title = _load_template(template_path, template_digest)
         
         # Envoyer l'email
+        started = time.perf_counter()
         success = sender.send_html_email(
             recipient=recipient_email,
-            subject=subject,
-            html_content=html_content
+            subject=subject or title,
+            html_content=html_content,
+            name=recipient_name
         )
         
         if success:
             print(f"✅ Email envoyé avec succès à {recipient_name}")
+            if campaign_id:
+                get_journal(campaign_id, template_digest).record(recipient_email, STATUS_SENT)
+            record_outcome(bulk_id, sent=1,
+                           events=[(EVENT_SENT, recipient_email, time.perf_counter() - started)])
             return {
                 'status': 'success',
                 'recipient': recipient_email,
@@ -94,12 +147,23 @@ def send_email_task(self, recipient_email: str, recipient_name: str,
     except Exception as exc:
         print(f"❌ Erreur lors de l'envoi à {recipient_name}: {str(exc)}")
         
-        # Réessayer en cas d'échec
-        if self.request.retries < self.max_retries:
-            print(f"🔄 Nouvelle tentative ({self.request.retries + 1}/{self.max_retries})...")
-            raise self.retry(exc=exc)
+        # Réessayer en cas d'échec (les replanifications dues au quota ne comptent pas)
+        failed_attempts = self.request.retries - throttle_retries
+        if failed_attempts < self.max_retries:
+            print(f"🔄 Nouvelle tentative ({failed_attempts + 1}/{self.max_retries})...")
+            try:
+                raise self.retry(exc=exc, max_retries=self.max_retries + throttle_retries)
+            except Retry:
+                record_outcome(bulk_id, events=[(EVENT_RETRY, recipient_email, time.perf_counter() - started)])
+                raise
+            except Exception as retry_exc:
+                print(f"⚠️  Replanification impossible: {retry_exc}")
         
-        # Échec définitif après toutes les tentatives
+        # Échec définitif après toutes les tentatives (ou replanification impossible)
+        if campaign_id and not dry_run:
+            get_journal(campaign_id, template_digest).record(recipient_email, STATUS_FAILED)
+        record_outcome(bulk_id, failed=1,
+                       events=[(EVENT_FAILED, recipient_email, time.perf_counter() - started)])
         return {
             'status': 'failed',
             'recipient': recipient_email,
@@ -109,6 +173,274 @@ def send_email_task(self, recipient_email: str, recipient_name: str,
         }
 
 
+@celery_app.task(
+    bind=True,
+    name='scripts.email_sender.tasks.send_batch_task',
+    max_retries=3,
+    default_retry_delay=60,  # Réessayer après 1 minute
+)
+def send_batch_task(self, recipients: List[Dict[str, str]],
+                    template_path: Optional[str] = None,
+                    subject: Optional[str] = None,
+                    delay_between_emails: float = 0,
+                    dry_run: bool = False,
+                    attempt: int = 0,
+                    campaign_id: Optional[str] = None,
+                    template_digest: Optional[str] = None,
+                    bulk_id: Optional[str] = None):
+    """
+    Tâche Celery pour envoyer un email à un lot de destinataires.
+    
+    Le template est lu une seule fois et tous les messages du lot passent par
+    la même session SMTP. Les destinataires en échec sont replanifiés dans un
+    nouveau lot, sans renvoyer l'email à ceux qui l'ont déjà reçu.
+    
+    Args:
+        self: Instance de la tâche Celery (bind=True)
+        recipients: Liste de dictionnaires {'email': ..., 'name': ...}
+        template_path: Chemin vers le template HTML (optionnel)
+        subject: Sujet de l'email (optionnel)
+        delay_between_emails: Pause en secondes entre deux emails du lot (défaut: 0)
+        dry_run: Si True, simule l'envoi sans envoyer réellement (défaut: False)
+        attempt: Numéro de la tentative pour ce lot (usage interne)
+        campaign_id: Journal de campagne où consigner les résultats (optionnel)
+        template_digest: Empreinte SHA-256 du template, lu dans le magasin de templates
+                         et consignée dans le journal (optionnel)
+        bulk_id: Envoi en masse dont les compteurs d'avancement sont mis à jour (optionnel)
+    
+    Returns:
+        dict: Résumé du lot avec un résultat par destinataire
+    """
+    results = []
+    failed = []
+    deferred = []
+    wait = 0
+    
+    try:
+        if dry_run:
+            print(f"🧪 [TEST] Simulation d'envoi d'un lot de {len(recipients)} emails...")
+            for recipient in recipients:
+                results.append({
+                    'status': 'success',
+                    'recipient': recipient['email'],
+                    'name': recipient['name'],
+                    'dry_run': True
+                })
+            time.sleep(0.5)
+            record_outcome(bulk_id, sent=len(recipients),
+                           events=[(EVENT_SENT, r['email'], 0.0) for r in recipients])
+        else:
+            print(f"📧 Envoi d'un lot de {len(recipients)} emails...")
+            
+            # Expéditeur et template préparés une fois par processus worker
+            sender = get_sender()
+            html_content, title = _load_template(template_path, template_digest)
+            
+            limiter = get_rate_limiter()
+            journal = get_journal(campaign_id, template_digest) if campaign_id else None
+            
+            for i, recipient in enumerate(recipients):
+                if i and delay_between_emails:
+                    time.sleep(delay_between_emails)
+                
+                # Quota global épuisé pour longtemps : replanifier le reste du lot
+                wait = limiter.acquire(max_wait=RATE_LIMIT_MAX_WAIT)
+                if wait:
+                    deferred = recipients[i:]
+                    break
+                
+                started = time.perf_counter()
+                success = sender.send_html_email(
+                    recipient=recipient['email'],
+                    subject=subject or title,
+                    html_content=html_content,
+                    name=recipient['name']
+                )
+                
+                if success:
+                    if journal:
+                        journal.record(recipient['email'], STATUS_SENT)
+                    record_outcome(bulk_id, sent=1,
+                                   events=[(EVENT_SENT, recipient['email'], time.perf_counter() - started)])
+                    results.append({
+                        'status': 'success',
+                        'recipient': recipient['email'],
+                        'name': recipient['name']
+                    })
+                else:
+                    failed.append(recipient)
+    
+    except Exception as exc:
+        # Erreur globale (template, configuration...) : tout ce qui n'a pas été envoyé est en échec
+        print(f"❌ Erreur lors de l'envoi du lot: {str(exc)}")
+        done = {r['recipient'] for r in results} | {r['email'] for r in failed}
+        failed.extend(r for r in recipients if r['email'] not in done)
+    
+    # Reporter les destinataires non traités faute de quota (sans compter de tentative)
+    if deferred:
+        deferred_task = send_batch_task.apply_async(
+            kwargs={
+                'recipients': deferred,
+                'template_path': template_path,
+                'subject': subject,
+                'delay_between_emails': delay_between_emails,
+                'dry_run': dry_run,
+                'attempt': attempt,
+                'campaign_id': campaign_id,
+                'template_digest': template_digest,
+                'bulk_id': bulk_id
+            },
+            countdown=wait
+        )
+        print(f"⏸️  Quota d'envoi atteint, {len(deferred)} destinataire(s) reporté(s) de {wait:.0f} s")
+        for recipient in deferred:
+            results.append({
+                'status': 'retry_scheduled',
+                'recipient': recipient['email'],
+                'name': recipient['name'],
+                'retry_task_id': deferred_task.id
+            })
+    
+    # Replanifier uniquement les destinataires en échec
+    if failed:
+        if attempt < self.max_retries:
+            retry_task = send_batch_task.apply_async(
+                kwargs={
+                    'recipients': failed,
+                    'template_path': template_path,
+                    'subject': subject,
+                    'delay_between_emails': delay_between_emails,
+                    'dry_run': dry_run,
+                    'attempt': attempt + 1,
+                    'campaign_id': campaign_id,
+                    'template_digest': template_digest,
+                    'bulk_id': bulk_id
+                },
+                countdown=self.default_retry_delay
+            )
+            print(f"🔄 {len(failed)} destinataire(s) replanifié(s) ({attempt + 1}/{self.max_retries})...")
+            record_outcome(bulk_id, events=[(EVENT_RETRY, r['email'], 0.0) for r in failed])
+            for recipient in failed:
+                results.append({
+                    'status': 'retry_scheduled',
+                    'recipient': recipient['email'],
+                    'name': recipient['name'],
+                    'retry_task_id': retry_task.id
+                })
+        else:
+            record_outcome(bulk_id, failed=len(failed),
+                           events=[(EVENT_FAILED, r['email'], 0.0) for r in failed])
+            for recipient in failed:
+                if campaign_id and not dry_run:
+                    get_journal(campaign_id, template_digest).record(recipient['email'], STATUS_FAILED)
+                results.append({
+                    'status': 'failed',
+                    'recipient': recipient['email'],
+                    'name': recipient['name']
+                })
+    
+    success_count = sum(1 for r in results if r['status'] == 'success')
+    print(f"✅ Lot terminé: {success_count}/{len(recipients)} emails envoyés")
+    
+    return {
+        'status': 'success' if success_count == len(recipients) else 'partial',
+        'sent': success_count,
+        'total': len(recipients),
+        'results': results,
+        'task_id': self.request.id,
+        'dry_run': dry_run
+    }
+
+
+def _publish_recipients(destinataires: List[Dict[str, str]],
+                        template_path: Optional[str],
+                        delay_between_emails: float,
+                        dry_run: bool,
+                        batch_size: Optional[int] = None,
+                        journal_ref: Optional[Dict[str, str]] = None,
+                        on_published: Optional[Callable[[str, int], None]] = None) -> List[Tuple[str, int]]:
+    """
+    Publie les sous-tâches d'envoi pour une liste de destinataires, avec un
+    délai progressif (countdown) relatif au moment de la publication.
+    
+    journal_ref ({'template_digest': ..., 'bulk_id': ..., 'campaign_id': ...})
+    est transmis aux sous-tâches : l'empreinte leur permet de lire le template
+    dans le magasin de templates, bulk_id de mettre à jour les compteurs
+    d'avancement, et campaign_id (absent en simulation) de consigner leurs
+    résultats dans le journal.
+    
+    on_published(ID, nombre de destinataires) est appelé dès qu'une
+    sous-tâche est publiée (avant la suivante).
+    
+    Returns:
+        list: (ID de la sous-tâche, nombre de destinataires) pour chaque sous-tâche créée
+    """
+    task_ids = []
+    journal_ref = journal_ref or {}
+    
+    # Envoi par lots : une sous-tâche et une session SMTP par lot
+    if batch_size and batch_size > 1:
+        for start in range(0, len(destinataires), batch_size):
+            batch = destinataires[start:start + batch_size]
+            
+            task = send_batch_task.apply_async(
+                kwargs={
+                    'recipients': batch,
+                    'template_path': template_path,
+                    'delay_between_emails': delay_between_emails,
+                    'dry_run': dry_run,
+                    **journal_ref
+                },
+                countdown=start * delay_between_emails
+            )
+            task_ids.append((task.id, len(batch)))
+            if on_published:
+                on_published(task.id, len(batch))
+        return task_ids
+    
+    # Créer une tâche pour chaque destinataire avec délai progressif
+    for i, destinataire in enumerate(destinataires):
+        task = send_email_task.apply_async(
+            args=[
+                destinataire['email'],
+                destinataire['name'],
+                template_path,
+                None,  # subject
+                dry_run  # dry_run parameter
+            ],
+            kwargs=journal_ref,
+            countdown=i * delay_between_emails  # délai progressif (secondes)
+        )
+        task_ids.append((task.id, 1))
+        if on_published:
+            on_published(task.id, 1)
+    return task_ids
+
+
+def pack_subtasks(task_ids: Iterable[Tuple[str, int]]) -> bytes:
+    """Encode des sous-tâches (ID, nombre de destinataires) en enregistrements binaires"""
+    return b"".join(SUBTASK_RECORD.pack(uuid.UUID(task_id).bytes, count) for task_id, count in task_ids)
+
+
+def unpack_subtasks(data: Optional[bytes]) -> List[Tuple[str, int]]:
+    """Décode les enregistrements produits par pack_subtasks()"""
+    return [(str(uuid.UUID(bytes=raw)), count) for raw, count in SUBTASK_RECORD.iter_unpack(data or b"")]
+
+
+def _record_subtasks(client, tasks_key: str, task_ids: List[Tuple[str, int]]):
+    """Ajoute des sous-tâches à la liste compacte d'un envoi en masse (Redis)"""
+    if task_ids:
+        pipe = client.pipeline()
+        pipe.append(tasks_key, pack_subtasks(task_ids))
+        pipe.expire(tasks_key, BULK_DATA_TTL)
+        pipe.execute()
+
+
+def _bulk_key(bulk_task_id: str, suffix: str) -> str:
+    """Clé Redis des données d'un envoi en masse"""
+    return f"bulk:{bulk_task_id}:{suffix}"
+
+
 @celery_app.task(
     bind=True,
     name='scripts.email_sender.tasks.send_bulk_emails_task'
@@ -117,51 +449,59 @@ def send_bulk_emails_task(self, csv_path: Optional[str] = None,
                           template_path: Optional[str] = None,
                           delay_between_emails: int = 5,
                           dry_run: bool = False,
-                          limit: Optional[int] = None):
+                          limit: Optional[int] = None,
+                          batch_size: Optional[int] = None,
+                          dispatch_mode: str = 'countdown',
+                          window_seconds: int = 60,
+                          resume: bool = True,
+                          template_digest: Optional[str] = None,
+                          recipients_path: Optional[str] = None):
     """
     Tâche Celery pour orchestrer l'envoi en masse d'emails.
-    Cette tâche crée des sous-tâches pour chaque destinataire.
+    Cette tâche crée une sous-tâche par destinataire, ou une sous-tâche
+    par lot de destinataires si batch_size est fourni.
+    
+    En mode 'countdown', toutes les sous-tâches sont publiées immédiatement
+    avec un délai progressif. En mode 'paced', les destinataires sont
+    stockés dans Redis et publiés fenêtre par fenêtre, juste à temps, par
+    dispatch_window_task : le nombre de tâches en attente (et la mémoire
+    des workers) reste constant quelle que soit la taille de la liste.
     
     Args:
         self: Instance de la tâche Celery (bind=True)
-        csv_path: Chemin vers le fichier CSV des destinataires (optionnel)
+        csv_path: Chemin d'un fichier CSV de destinataires (ancien paramètre, optionnel)
         template_path: Chemin vers le template HTML (optionnel)
         delay_between_emails: Délai en secondes entre chaque email (défaut: 5)
         dry_run: Si True, simule l'envoi sans envoyer réellement (défaut: False)
         limit: Limite le nombre de destinataires (pour les tests, optionnel)
+        batch_size: Nombre de destinataires par sous-tâche send_batch_task
+                    (None ou 1 = une sous-tâche send_email_task par destinataire)
+        dispatch_mode: 'countdown' (tout publier d'un coup) ou 'paced' (fenêtres successives)
+        window_seconds: Durée d'une fenêtre de publication en mode 'paced' (défaut: 60)
+        resume: Si True, ignore les destinataires déjà servis d'après le journal
+                de la campagne (identifiée par l'empreinte du template seule :
+                renvoyer le même template à une liste modifiée ignore ceux qui
+                l'ont déjà reçu) ; si False, archive le journal et renvoie à tous
+        template_digest: Empreinte d'un template déjà publié dans le magasin de
+                         templates (prioritaire sur template_path)
+        recipients_path: Base des destinataires (défaut: destinataires.db) ou fichier CSV
     
     Returns:
-        dict: Résumé de l'envoi en masse avec liste des tâches créées
+        dict: Résumé de l'envoi en masse ; les sous-tâches créées sont rangées
+              dans Redis sous la clé tasks_key (voir unpack_subtasks)
     """
     try:
-        # Import local
-        from .mail import EmailSender
-        
         print("📬 Démarrage de l'envoi en masse asynchrone...")
         
-        # Déterminer le chemin du CSV
-        if not csv_path:
-            csv_path = Path(__file__).parent / "destinataires.csv"
-        else:
-            csv_path = Path(csv_path)
-        
-        if not csv_path.exists():
-            raise FileNotFoundError(f"Fichier CSV non trouvé: {csv_path}")
-        
-        # Lire les destinataires
-        destinataires = []
-        with open(csv_path, "r", encoding="utf-8") as csvfile:
-            reader = csv.DictReader(csvfile)
-            for row in reader:
-                if 'email' in row and 'name' in row:
-                    destinataires.append({
-                        'email': row['email'],
-                        'name': row['name']
-                    })
+        # Base des destinataires (ou fichier CSV pour les anciens appels)
+        recipients_path = Path(recipients_path or csv_path or DB_PATH)
+        if recipients_path.suffix.lower() == '.csv' and not recipients_path.exists():
+            raise FileNotFoundError(f"Fichier CSV non trouvé: {recipients_path}")
         
-        # Limiter le nombre de destinataires si demandé (pour les tests)
+        # Lire les destinataires (limités si demandé, pour les tests)
+        destinataires = [{'email': row['email'], 'name': row['name']}
+                         for row in iter_recipients(recipients_path, limit if limit and limit > 0 else None)]
         if limit and limit > 0:
-            destinataires = destinataires[:limit]
             print(f"🧪 Mode test: limitation à {len(destinataires)} destinataires")
         
         print(f"📊 {len(destinataires)} destinataires {'(simulation)' if dry_run else ''}")
@@ -169,30 +509,98 @@ def send_bulk_emails_task(self, csv_path: Optional[str] = None,
         if dry_run:
             print("🧪 MODE TEST ACTIVÉ - Aucun email ne sera réellement envoyé")
         
-        # Créer une tâche pour chaque destinataire avec délai progressif
-        task_ids = []
-        for i, destinataire in enumerate(destinataires):
-            # Appliquer un délai progressif (countdown en secondes)
-            countdown = i * delay_between_emails
+        # Publier le template dans le magasin : les sous-tâches ne reçoivent
+        # que son empreinte et n'ont besoin d'aucun accès au fichier
+        if template_digest:
+            get_template_store().get(template_digest)
+        else:
+            html_content, title = get_template(template_path)
+            template_digest = get_template_store().publish(html_content, title)
+        template_path = None
+        journal_ref = {'template_digest': template_digest, 'bulk_id': self.request.id}
+        
+        # Journal de campagne : reprise sans renvoyer aux destinataires déjà servis
+        skipped = 0
+        if not dry_run:
+            journal_ref['campaign_id'] = campaign_id_for(template_digest)
+            with SendJournal(journal_ref['campaign_id'], template_digest) as journal:
+                if not resume:
+                    journal.archive()
+                elif journal.sent:
+                    remaining = [d for d in destinataires if not journal.is_sent(d['email'])]
+                    skipped = len(destinataires) - len(remaining)
+                    destinataires = remaining
+                    print(f"♻️  Reprise: {skipped} destinataire(s) déjà servi(s) ignoré(s)")
+        
+        # Compteurs d'avancement, incrémentés par les sous-tâches
+        init_bulk_stats(get_redis_client(), self.request.id, len(destinataires), skipped)
+        
+        if dispatch_mode == 'paced':
+            # Nombre de destinataires publiés par fenêtre (arrondi à des lots complets)
+            per_window = max(1, int(window_seconds / delay_between_emails)) if delay_between_emails else 500
+            if batch_size and batch_size > 1:
+                per_window = math.ceil(per_window / batch_size) * batch_size
             
-            task = send_email_task.apply_async(
-                args=[
-                    destinataire['email'],
-                    destinataire['name'],
-                    template_path,
-                    None,  # subject
-                    dry_run  # dry_run parameter
-                ],
-                countdown=countdown
-            )
+            # Stocker la liste dans Redis : chaque fenêtre n'en lit qu'une tranche
+            client = get_redis_client()
+            recipients_key = _bulk_key(self.request.id, 'recipients')
+            pipe = client.pipeline()
+            pipe.delete(recipients_key, _bulk_key(self.request.id, 'tasks'))
+            for start in range(0, len(destinataires), 1000):
+                chunk = destinataires[start:start + 1000]
+                pipe.rpush(recipients_key, *(json.dumps([d['email'], d['name']]) for d in chunk))
+            pipe.expire(recipients_key, BULK_DATA_TTL)
+            pipe.execute()
             
-            task_ids.append({
-                'task_id': task.id,
-                'recipient': destinataire['email'],
-                'name': destinataire['name'],
-                'scheduled_delay': countdown,
-                'dry_run': dry_run
+            dispatch_window_task.apply_async(kwargs={
+                'bulk_task_id': self.request.id,
+                'start': 0,
+                'window_size': per_window,
+                'template_path': template_path,
+                'delay_between_emails': delay_between_emails,
+                'dry_run': dry_run,
+                'batch_size': batch_size,
+                'journal_ref': journal_ref
             })
+            
+            print(f"✅ Publication cadencée: {per_window} destinataires par fenêtre")
+            
+            return {
+                'status': 'scheduled',
+                'total_emails': len(destinataires),
+                'batch_size': batch_size,
+                'dispatch_mode': 'paced',
+                'window_size': per_window,
+                'tasks_key': _bulk_key(self.request.id, 'tasks'),
+                'campaign_id': journal_ref.get('campaign_id'),
+                'skipped': skipped,
+                'bulk_task_id': self.request.id,
+                'message': f"{len(destinataires)} emails planifiés pour envoi cadencé"
+            }
+        
+        task_ids = _publish_recipients(destinataires, template_path, delay_between_emails, dry_run,
+                                       batch_size, journal_ref)
+        
+        # Les IDs des sous-tâches sont rangés dans Redis sous forme compacte,
+        # et non dans le résultat de cette tâche (relu à chaque consultation)
+        tasks_key = _bulk_key(self.request.id, 'tasks')
+        _record_subtasks(get_redis_client(), tasks_key, task_ids)
+        
+        if batch_size and batch_size > 1:
+            mode_text = "simulés" if dry_run else "créés et planifiés"
+            print(f"✅ {len(task_ids)} lots de {batch_size} destinataires maximum {mode_text}")
+            
+            return {
+                'status': 'scheduled',
+                'total_emails': len(destinataires),
+                'batch_size': batch_size,
+                'tasks_key': tasks_key,
+                'subtasks': len(task_ids),
+                'campaign_id': journal_ref.get('campaign_id'),
+                'skipped': skipped,
+                'bulk_task_id': self.request.id,
+                'message': f"{len(destinataires)} emails planifiés en {len(task_ids)} lots pour envoi asynchrone"
+            }
         
         mode_text = "simulées" if dry_run else "créées et planifiées"
         print(f"✅ {len(task_ids)} tâches d'envoi {mode_text}")
@@ -200,7 +608,10 @@ def send_bulk_emails_task(self, csv_path: Optional[str] = None,
         return {
             'status': 'scheduled',
             'total_emails': len(destinataires),
-            'tasks': task_ids,
+            'tasks_key': tasks_key,
+            'subtasks': len(task_ids),
+            'campaign_id': journal_ref.get('campaign_id'),
+            'skipped': skipped,
             'bulk_task_id': self.request.id,
             'message': f"{len(task_ids)} emails planifiés pour envoi asynchrone"
         }
@@ -214,6 +625,96 @@ def send_bulk_emails_task(self, csv_path: Optional[str] = None,
         }
 
 
+@celery_app.task(
+    bind=True,
+    name='scripts.email_sender.tasks.dispatch_window_task',
+    max_retries=5,
+    default_retry_delay=10,
+)
+def dispatch_window_task(self, bulk_task_id: str, start: int, window_size: int,
+                         template_path: Optional[str] = None,
+                         delay_between_emails: float = 5,
+                         dry_run: bool = False,
+                         batch_size: Optional[int] = None,
+                         journal_ref: Optional[Dict[str, str]] = None):
+    """
+    Publie la fenêtre suivante d'un envoi en masse cadencé, puis se
+    replanifie pour la fenêtre d'après (une seule tâche différée à la fois).
+    
+    Chaque sous-tâche publiée est consignée dans bulk:<id>:window:<start>
+    en même temps que dans bulk:<id>:tasks : si la tâche est réessayée
+    (échec d'une publication ou de la replanification), seuls les
+    destinataires de la fenêtre qui n'ont pas encore été publiés le sont.
+    
+    Args:
+        self: Instance de la tâche Celery (bind=True)
+        bulk_task_id: ID de la tâche d'envoi en masse
+        start: Index du premier destinataire de la fenêtre
+        window_size: Nombre de destinataires par fenêtre
+        template_path: Chemin vers le template HTML (optionnel)
+        delay_between_emails: Délai en secondes entre chaque email
+        dry_run: Si True, simule l'envoi sans envoyer réellement
+        batch_size: Nombre de destinataires par sous-tâche send_batch_task (optionnel)
+        journal_ref: Journal de campagne transmis aux sous-tâches (optionnel)
+    
+    Returns:
+        dict: Résumé de la fenêtre publiée
+    """
+    try:
+        client = get_redis_client()
+        recipients_key = _bulk_key(bulk_task_id, 'recipients')
+        tasks_key = _bulk_key(bulk_task_id, 'tasks')
+        window_key = _bulk_key(bulk_task_id, f'window:{start}')
+        
+        raw = client.lrange(recipients_key, start, start + window_size - 1)
+        destinataires = [dict(zip(('email', 'name'), json.loads(item))) for item in raw]
+        
+        # Reprise après un essai précédent : sauter les destinataires déjà publiés
+        published = sum(count for _, count in unpack_subtasks(client.get(window_key)))
+        if published:
+            print(f"🔁 Fenêtre {start}: {published} destinataire(s) déjà publié(s), reprise")
+        
+        def record(task_id: str, count: int):
+            # Consigné dans la fenêtre et dans la liste de l'envoi en une transaction
+            entry = pack_subtasks([(task_id, count)])
+            pipe = client.pipeline()
+            pipe.append(window_key, entry)
+            pipe.expire(window_key, BULK_DATA_TTL)
+            pipe.append(tasks_key, entry)
+            pipe.expire(tasks_key, BULK_DATA_TTL)
+            pipe.execute()
+        
+        _publish_recipients(destinataires[published:], template_path, delay_between_emails, dry_run,
+                            batch_size, journal_ref, on_published=record)
+        
+        # Fenêtre incomplète : tous les destinataires ont été publiés
+        if len(destinataires) < window_size:
+            client.delete(recipients_key)
+            print(f"✅ Envoi cadencé {bulk_task_id}: {start + len(destinataires)} destinataires publiés")
+            return {'status': 'completed', 'start': start, 'dispatched': len(destinataires)}
+        
+        dispatch_window_task.apply_async(
+            kwargs={
+                'bulk_task_id': bulk_task_id,
+                'start': start + window_size,
+                'window_size': window_size,
+                'template_path': template_path,
+                'delay_between_emails': delay_between_emails,
+                'dry_run': dry_run,
+                'batch_size': batch_size,
+                'journal_ref': journal_ref
+            },
+            countdown=window_size * delay_between_emails
+        )
+        
+        print(f"📤 Fenêtre {start}-{start + len(destinataires) - 1} publiée")
+        return {'status': 'dispatched', 'start': start, 'dispatched': len(destinataires)}
+    
+    except Exception as exc:
+        print(f"❌ Erreur lors de la publication de la fenêtre {start}: {str(exc)}")
+        raise self.retry(exc=exc)
+
+
 @celery_app.task(name='scripts.email_sender.tasks.get_task_status')
 def get_task_status(task_id: str):
     """
@@ -0,0 +1,136 @@
+"""
+Magasin de templates adressé par contenu
+Association Gamadji Saré
+
+Un template est publié une fois, sous son empreinte SHA-256, dans le Redis
+du broker (partagé par tous les workers, quelle que soit leur machine) et
+dans un dossier local (logs/templates/) qui sert de repli sans Redis. Les
+tâches ne transportent que l'empreinte ; chaque processus garde les derniers
+templates lus dans un cache LRU, si bien qu'une lecture répétée ne coûte ni
+accès disque ni aller-retour réseau.
+"""
+
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional, Tuple
+
+# Dossier de repli local des templates publiés
+STORE_DIR = Path(__file__).parent.parent.parent / "logs" / "templates"
+
+# Durée de conservation d'un template dans Redis (30 jours)
+TEMPLATE_TTL = 30 * 24 * 3600
+
+
+def _redis_key(digest: str) -> str:
+    return f"template:{digest}"
+
+
+class TemplateStore:
+    """
+    Magasin de templates indexé par empreinte SHA-256.
+
+    Args:
+        client: Client Redis partagé (None = dossier local uniquement)
+        directory: Dossier de repli local (défaut: logs/templates/)
+        max_entries: Nombre de templates gardés en mémoire dans le processus
+    """
+
+    def __init__(self, client=None, directory=None, max_entries: int = 8):
+        self.client = client
+        self.directory = Path(directory or STORE_DIR)
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _remember(self, digest: str, entry: Tuple[str, str]) -> Tuple[str, str]:
+        with self._lock:
+            self._entries[digest] = entry
+            self._entries.move_to_end(digest)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return entry
+
+    def publish(self, html_content: str, title: str) -> str:
+        """
+        Publie un template et retourne son empreinte.
+
+        Le contenu étant adressé par son empreinte, republier le même
+        template ne fait que prolonger sa durée de conservation.
+        """
+        digest = hashlib.sha256(html_content.encode("utf-8")).hexdigest()
+        payload = json.dumps({"title": title, "html": html_content}, ensure_ascii=False)
+
+        path = self.directory / f"{digest}.json"
+        if not path.exists():
+            self.directory.mkdir(parents=True, exist_ok=True)
+            tmp_path = path.with_suffix(".tmp")
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(payload)
+            os.replace(tmp_path, path)
+
+        if self.client is not None:
+            try:
+                key = _redis_key(digest)
+                if not self.client.set(key, payload, ex=TEMPLATE_TTL, nx=True):
+                    self.client.expire(key, TEMPLATE_TTL)
+            except Exception as e:
+                print(f"⚠️  Template {digest[:12]} non publié dans Redis (repli local): {str(e)}")
+
+        self._remember(digest, (html_content, title))
+        return digest
+
+    def get(self, digest: str) -> Tuple[str, str]:
+        """
+        Retourne (contenu HTML, titre) du template d'empreinte donnée.
+
+        Raises:
+            KeyError: si le template n'est ni en mémoire, ni dans Redis, ni en local
+        """
+        with self._lock:
+            entry = self._entries.get(digest)
+            if entry is not None:
+                self._entries.move_to_end(digest)
+                return entry
+
+        payload = None
+        if self.client is not None:
+            try:
+                payload = self.client.get(_redis_key(digest))
+            except Exception as e:
+                print(f"⚠️  Redis indisponible pour le template {digest[:12]}: {str(e)}")
+        if payload is None:
+            try:
+                with open(self.directory / f"{digest}.json", "r", encoding="utf-8") as f:
+                    payload = f.read()
+            except OSError:
+                raise KeyError(f"Template introuvable: {digest}")
+
+        data = json.loads(payload)
+        html_content = data["html"]
+        if hashlib.sha256(html_content.encode("utf-8")).hexdigest() != digest:
+            raise KeyError(f"Template corrompu: {digest}")
+        return self._remember(digest, (html_content, data["title"]))
+
+
+_store: Optional[TemplateStore] = None
+_store_lock = threading.Lock()
+
+
+def get_template_store() -> TemplateStore:
+    """Retourne le magasin de templates du processus (Redis du broker + repli local)"""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                client = None
+                try:
+                    from .celery_config import get_redis_client
+                    client = get_redis_client()
+                except ImportError:
+                    pass
+                _store = TemplateStore(client)
+    return _store
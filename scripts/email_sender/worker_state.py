@@ -0,0 +1,97 @@
+"""
+État partagé des processus worker Celery
+Association Gamadji Saré
+
+Construit l'EmailSender une seule fois par processus worker (signal
+worker_process_init), à partir des seuls paramètres SMTP : les templates
+viennent du magasin de templates, ou à défaut des fichiers, mis en cache
+par chemin et date de modification. Les tâches n'ont plus qu'à envoyer.
+"""
+
+import os
+import threading
+from typing import Dict, Optional, Tuple
+
+_sender = None
+_sender_lock = threading.Lock()
+
+# (chemin, mtime_ns) -> (contenu HTML, titre)
+_templates: Dict[Tuple[str, int], Tuple[str, str]] = {}
+_templates_lock = threading.Lock()
+
+
+def init_worker_sender(**kwargs):
+    """
+    Initialise l'EmailSender du processus (branché sur worker_process_init).
+
+    Une erreur (.env incomplet) ne doit pas empêcher le worker de démarrer :
+    la construction sera retentée à la première tâche.
+    """
+    try:
+        get_sender()
+    except Exception as e:
+        print(f"⚠️  Initialisation différée de l'expéditeur: {str(e)}")
+
+
+def get_sender():
+    """Retourne l'EmailSender du processus, en le construisant au besoin"""
+    global _sender
+    if _sender is None:
+        with _sender_lock:
+            if _sender is None:
+                from .mail import EmailSender
+                _sender = EmailSender(load_template=False)
+    return _sender
+
+
+def set_sender(sender):
+    """Installe un EmailSender déjà construit comme expéditeur du processus"""
+    global _sender
+    with _sender_lock:
+        _sender = sender
+        if sender.template_path:
+            _remember(sender.template_path, sender.html_template, sender.email_title)
+
+
+def get_template(template_path: Optional[str] = None) -> Tuple[str, str]:
+    """
+    Retourne (contenu HTML, titre) du template, lu une seule fois par version.
+
+    Args:
+        template_path: Chemin du template (défaut: celui chargé par l'expéditeur,
+                       ou le plus récent du dossier output/)
+    """
+    if not template_path or not os.path.exists(template_path):
+        sender = get_sender()
+        template_path = sender.template_path or sender.find_latest_template()
+
+    template_path = os.path.abspath(template_path)
+    key = (template_path, os.stat(template_path).st_mtime_ns)
+    cached = _templates.get(key)
+    if cached is not None:
+        return cached
+
+    from ..template_metadata import template_title
+    with open(template_path, "r", encoding="utf-8") as f:
+        html_content = f.read()
+    return _remember(template_path, html_content, template_title(template_path, html_content))
+
+
+def _remember(template_path, html_content: str, title: str) -> Tuple[str, str]:
+    """Ajoute un template au cache, en oubliant ses versions précédentes"""
+    path = os.path.abspath(template_path)
+    key = (path, os.stat(path).st_mtime_ns)
+    entry = (html_content, title)
+    with _templates_lock:
+        for old_key in [k for k in _templates if k[0] == path]:
+            del _templates[old_key]
+        _templates[key] = entry
+    return entry
+
+
+def reset():
+    """Oublie l'expéditeur et les templates mis en cache"""
+    global _sender
+    with _sender_lock, _templates_lock:
+        _sender = None
+        _templates.clear()
@@ -0,0 +1,162 @@
+"""
+Modèle de la table des destinataires (interface graphique)
+Association Gamadji Saré
+
+Les destinataires sont gardés en mémoire par colonnes (une liste de noms et
+une liste d'emails) avec un index des emails normalisés, si bien qu'un
+doublon est détecté sans parcourir la liste. Le modèle Qt lit directement
+ces colonnes : la vue ne demande que les cellules visibles, aucune ligne
+n'est construite à l'avance, et un ajout, une modification ou une
+suppression ne notifie que les lignes concernées.
+"""
+
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from PyQt5.QtCore import QAbstractTableModel, QModelIndex, QSortFilterProxyModel, Qt
+
+from .email_sender.recipient_store import normalize_email
+
+HEADERS = ("Nom", "Email")
+
+
+class RecipientColumns:
+    """Destinataires stockés par colonnes, indexés par email normalisé"""
+
+    def __init__(self):
+        self.names: List[str] = []
+        self.emails: List[str] = []
+        self._keys: Dict[str, int] = {}  # email normalisé -> nombre d'occurrences
+
+    @classmethod
+    def from_rows(cls, recipients: Iterable[Dict[str, str]]) -> "RecipientColumns":
+        """Construit les colonnes à partir de destinataires {'name', 'email'}"""
+        columns = cls()
+        for recipient in recipients:
+            columns.append(recipient['name'], recipient['email'])
+        return columns
+
+    def __len__(self) -> int:
+        return len(self.emails)
+
+    def row(self, index: int) -> Tuple[str, str]:
+        return self.names[index], self.emails[index]
+
+    def rows(self) -> Iterator[Dict[str, str]]:
+        """Destinataires sous forme de dictionnaires, construits à la demande"""
+        for name, email in zip(self.names, self.emails):
+            yield {'name': name, 'email': email}
+
+    def contains(self, email: str, exclude_row: Optional[int] = None) -> bool:
+        """Indique si l'email est déjà présent (hors ligne exclude_row)"""
+        key = normalize_email(email)
+        count = self._keys.get(key, 0)
+        if exclude_row is not None and normalize_email(self.emails[exclude_row]) == key:
+            count -= 1
+        return count > 0
+
+    def _index(self, email: str, delta: int):
+        key = normalize_email(email)
+        count = self._keys.get(key, 0) + delta
+        if count > 0:
+            self._keys[key] = count
+        else:
+            self._keys.pop(key, None)
+
+    def append(self, name: str, email: str):
+        self.names.append(name)
+        self.emails.append(email)
+        self._index(email, 1)
+
+    def set(self, index: int, name: str, email: str):
+        self._index(self.emails[index], -1)
+        self.names[index] = name
+        self.emails[index] = email
+        self._index(email, 1)
+
+    def pop(self, index: int) -> Tuple[str, str]:
+        name = self.names.pop(index)
+        email = self.emails.pop(index)
+        self._index(email, -1)
+        return name, email
+
+
+class RecipientTableModel(QAbstractTableModel):
+    """
+    Modèle Qt (Nom, Email) lisant les colonnes d'un RecipientColumns.
+
+    Args:
+        store: Destinataires en mémoire
+    """
+
+    def __init__(self, store: RecipientColumns, parent=None):
+        super().__init__(parent)
+        self.store = store
+
+    def rowCount(self, parent=QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(self.store)
+
+    def columnCount(self, parent=QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(HEADERS)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or role not in (Qt.DisplayRole, Qt.EditRole, Qt.ToolTipRole):
+            return None
+        column = self.store.names if index.column() == 0 else self.store.emails
+        return column[index.row()]
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole:
+            return None
+        if orientation == Qt.Horizontal:
+            return HEADERS[section]
+        return section + 1
+
+    def recipient(self, row: int) -> Dict[str, str]:
+        name, email = self.store.row(row)
+        return {'name': name, 'email': email}
+
+    def add_recipients(self, recipients: Iterable[Tuple[str, str]]) -> List[Dict[str, str]]:
+        """
+        Ajoute des destinataires en ignorant les emails déjà présents.
+
+        Returns:
+            list: Destinataires effectivement ajoutés
+        """
+        added = []
+        keys = set()
+        for name, email in recipients:
+            key = normalize_email(email)
+            if key not in keys and not self.store.contains(email):
+                keys.add(key)
+                added.append({'name': name, 'email': email})
+        if added:
+            # Une seule notification pour le lot, avant d'ajouter les lignes
+            first = len(self.store)
+            self.beginInsertRows(QModelIndex(), first, first + len(added) - 1)
+            for recipient in added:
+                self.store.append(recipient['name'], recipient['email'])
+            self.endInsertRows()
+        return added
+
+    def update_recipient(self, row: int, name: str, email: str) -> bool:
+        """Modifie une ligne ; retourne False si l'email appartient à un autre destinataire"""
+        if self.store.contains(email, exclude_row=row):
+            return False
+        self.store.set(row, name, email)
+        self.dataChanged.emit(self.index(row, 0), self.index(row, len(HEADERS) - 1))
+        return True
+
+    def remove_recipient(self, row: int) -> Dict[str, str]:
+        self.beginRemoveRows(QModelIndex(), row, row)
+        name, email = self.store.pop(row)
+        self.endRemoveRows()
+        return {'name': name, 'email': email}
+
+
+def make_filter_proxy(model: RecipientTableModel, parent=None) -> QSortFilterProxyModel:
+    """Proxy de recherche (nom ou email, sans tenir compte de la casse)"""
+    proxy = QSortFilterProxyModel(parent)
+    proxy.setSourceModel(model)
+    proxy.setFilterKeyColumn(-1)
+    proxy.setFilterCaseSensitivity(Qt.CaseInsensitive)
+    return proxy
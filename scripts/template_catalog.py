@@ -0,0 +1,191 @@
+"""
+Catalogue des templates générés
+Association Gamadji Saré
+
+Index des templates du dossier output/, tenu à jour par save_html : chaque
+nouveau template ajoute une ligne JSON à output/templates_index.jsonl. Le
+catalogue garde en mémoire un index par nom et par empreinte SHA-256, et ne
+relit que les lignes ajoutées depuis sa dernière lecture. Le template le plus
+récent, ou celui correspondant à un nom ou à une empreinte, est ainsi trouvé
+sans lister ni examiner les fichiers du dossier.
+"""
+
+import fnmatch
+import glob
+import json
+import os
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from .template_metadata import build_metadata, read_metadata
+
+INDEX_FILENAME = "templates_index.jsonl"
+TEMPLATE_PATTERN = "email_template_*.html"
+
+
+class TemplateCatalog:
+    """
+    Index des templates d'un dossier de sortie.
+
+    Args:
+        output_dir: Dossier contenant les templates (output/)
+    """
+
+    def __init__(self, output_dir):
+        self.output_dir = str(output_dir)
+        self.index_path = os.path.join(self.output_dir, INDEX_FILENAME)
+        self._by_name: Dict[str, Dict] = {}
+        self._by_hash: Dict[str, str] = {}
+        self._order: List[str] = []
+        self._offset = 0
+        self._lock = threading.Lock()
+
+    def _index(self, entry: Dict):
+        """Ajoute une entrée aux index en mémoire (la plus récente en dernier)"""
+        name = entry["name"]
+        if name in self._by_name:
+            self._order.remove(name)
+        self._by_name[name] = entry
+        self._order.append(name)
+        if entry.get("sha256"):
+            self._by_hash[entry["sha256"]] = name
+
+    def refresh(self):
+        """Lit les entrées ajoutées à l'index depuis la dernière lecture"""
+        with self._lock:
+            try:
+                size = os.path.getsize(self.index_path)
+            except OSError:
+                size = 0
+                if self._offset == 0:
+                    self._rebuild_locked()
+                    return
+
+            if size < self._offset:
+                # Index réécrit : tout relire
+                self._by_name.clear()
+                self._by_hash.clear()
+                self._order.clear()
+                self._offset = 0
+            if size == self._offset:
+                return
+
+            with open(self.index_path, "rb") as f:
+                f.seek(self._offset)
+                for line in f:
+                    if not line.endswith(b"\n"):
+                        break  # ligne en cours d'écriture
+                    self._offset += len(line)
+                    try:
+                        self._index(json.loads(line))
+                    except ValueError:
+                        continue
+
+    def _rebuild_locked(self):
+        """Construit l'index à partir des templates existants (anciens dossiers sans index)"""
+        paths = glob.glob(os.path.join(self.output_dir, TEMPLATE_PATTERN))
+        if not paths:
+            return
+
+        entries = []
+        for path in paths:
+            metadata = read_metadata(path)
+            if metadata is None:
+                with open(path, "r", encoding="utf-8") as f:
+                    metadata = build_metadata(f.read())
+                metadata["created"] = datetime.fromtimestamp(
+                    os.path.getmtime(path)).isoformat(timespec="seconds")
+            entries.append(dict(metadata, name=os.path.basename(path)))
+        entries.sort(key=lambda entry: str(entry.get("created", "")))
+
+        tmp_path = self.index_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            for entry in entries:
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        os.replace(tmp_path, self.index_path)
+
+        for entry in entries:
+            self._index(entry)
+        self._offset = os.path.getsize(self.index_path)
+
+    def rebuild(self):
+        """Reconstruit entièrement l'index à partir du dossier"""
+        with self._lock:
+            self._by_name.clear()
+            self._by_hash.clear()
+            self._order.clear()
+            self._offset = 0
+            if os.path.exists(self.index_path):
+                os.remove(self.index_path)
+            self._rebuild_locked()
+
+    def add(self, template_path, metadata: Dict) -> Dict:
+        """Enregistre un nouveau template (appelé par save_html)"""
+        entry = dict(metadata, name=os.path.basename(str(template_path)))
+        os.makedirs(self.output_dir, exist_ok=True)
+        self.refresh()
+        with self._lock:
+            indexed = self._by_name.get(entry["name"])
+            if indexed and indexed.get("sha256") == entry.get("sha256"):
+                return indexed  # déjà indexé (reconstruction de l'index)
+            with open(self.index_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            self._offset = os.path.getsize(self.index_path)
+            self._index(entry)
+        return entry
+
+    def _path(self, name: Optional[str]) -> Optional[str]:
+        return os.path.join(self.output_dir, name) if name else None
+
+    def latest(self) -> Optional[str]:
+        """
+        Chemin du template le plus récent encore présent, ou None.
+
+        Seuls les templates email_template_*.html sont candidats : les autres
+        fichiers indexés (demo_email_template_*.html...) ne sont jamais choisis
+        par défaut.
+        """
+        self.refresh()
+        for name in reversed(self._order):
+            if not fnmatch.fnmatchcase(name, TEMPLATE_PATTERN):
+                continue
+            path = self._path(name)
+            if os.path.exists(path):
+                return path
+        return None
+
+    def by_name(self, name: str) -> Optional[str]:
+        """Chemin du template portant ce nom de fichier, ou None"""
+        self.refresh()
+        return self._path(name) if name in self._by_name else None
+
+    def by_hash(self, sha256: str) -> Optional[str]:
+        """Chemin du template dont le contenu a cette empreinte SHA-256, ou None"""
+        self.refresh()
+        return self._path(self._by_hash.get(sha256))
+
+    def entry(self, name: str) -> Optional[Dict]:
+        """Métadonnées indexées d'un template"""
+        self.refresh()
+        return self._by_name.get(name)
+
+    def entries(self) -> List[Dict]:
+        """Métadonnées de tous les templates indexés, du plus récent au plus ancien"""
+        self.refresh()
+        return [self._by_name[name] for name in reversed(self._order)]
+
+
+_catalogs: Dict[str, TemplateCatalog] = {}
+_catalogs_lock = threading.Lock()
+
+
+def get_catalog(output_dir=None) -> TemplateCatalog:
+    """Retourne le catalogue (partagé dans le processus) d'un dossier de sortie"""
+    output_dir = os.path.abspath(str(output_dir or Path(__file__).parent.parent / "output"))
+    with _catalogs_lock:
+        catalog = _catalogs.get(output_dir)
+        if catalog is None:
+            catalog = _catalogs[output_dir] = TemplateCatalog(output_dir)
+        return catalog
@@ -5,30 +5,121 @@ Association Gamadji - Village en Afrique
 Génère des templates HTML responsives avec une palette de couleurs inspirée de l'Afrique
 """
 
-from typing import List, Dict
+from functools import lru_cache
+from typing import Dict, List, Tuple, Union
 import os
+import re
 
 BASE_DIR = os.path.dirname(os.path.dirname(__file__))
 LOGO_PATH = os.path.join(BASE_DIR, 'logo_base64.txt')
 
-with open(LOGO_PATH, 'r') as f:
-    _raw_logo = f.read().strip()
 
-if _raw_logo.startswith('data:image'):
-    LOGO_SRC = _raw_logo
-else:
-    LOGO_SRC = f"data:image/png;base64,{_raw_logo}"
+@lru_cache(maxsize=1)
+def logo_src() -> str:
+    """
+    Logo en data URI, lu dans logo_base64.txt à la première utilisation puis
+    gardé en mémoire ("" si le fichier est absent : le template reste généré).
+    """
+    try:
+        with open(LOGO_PATH, 'r') as f:
+            raw_logo = f.read().strip()
+    except OSError:
+        print(f"⚠️  Logo introuvable ({LOGO_PATH}) : templates générés sans logo")
+        return ""
+    if not raw_logo or raw_logo.startswith('data:image'):
+        return raw_logo
+    return f"data:image/png;base64,{raw_logo}"
 
 
-class EmailTemplate:
-    """Générateur de templates HTML pour emails"""
-    
-    def __init__(self):
-        self.css_styles = self._get_css_styles()
-    
-    def _get_css_styles(self) -> str:
-        """Retourne les styles CSS pour le template"""
-        return """
+def __getattr__(name):
+    # Compatibilité : LOGO_SRC reste disponible, mais n'est lu qu'à la demande
+    if name == 'LOGO_SRC':
+        return logo_src()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+# Identifiant du logo lorsqu'il est joint au message (partie image/png inline)
+LOGO_CID = "logo-gamadji"
+
+# Marque d'un emplacement dans le squelette du document : \x00nom\x00
+_SLOT_PATTERN = re.compile("\x00([a-z_]+)\x00")
+
+
+def _slot(name: str) -> str:
+    return f"\x00{name}\x00"
+
+
+def _encode(value) -> bytes:
+    return value if isinstance(value, bytes) else str(value).encode("utf-8")
+
+
+class CompiledTemplate:
+    """
+    Document découpé une fois pour toutes en segments d'octets immuables et
+    en emplacements nommés (titre, texte, photos...).
+
+    Le rendu se résume à une jointure des segments et des valeurs fournies ;
+    bind() fige une partie des emplacements (ceux d'une campagne, par
+    exemple) en fusionnant les segments voisins, pour ne laisser à remplir
+    que les champs qui varient d'un rendu à l'autre.
+    """
+
+    __slots__ = ("_pieces", "_parts", "_positions")
+
+    def __init__(self, pieces: Tuple[Union[bytes, str], ...]):
+        # pieces : segments statiques (bytes) et noms d'emplacements (str)
+        self._pieces = pieces
+        self._parts = [b"" if isinstance(piece, str) else piece for piece in pieces]
+        self._positions: Dict[str, List[int]] = {}
+        for i, piece in enumerate(pieces):
+            if isinstance(piece, str):
+                self._positions.setdefault(piece, []).append(i)
+
+    @classmethod
+    def from_source(cls, source: str, pattern=_SLOT_PATTERN) -> "CompiledTemplate":
+        """
+        Compile un document dont les emplacements sont marqués par _slot(nom)
+        (ou par pattern, expression dont l'unique groupe capture le nom)
+        """
+        pieces = []
+        for i, piece in enumerate(pattern.split(source)):
+            if i % 2:
+                pieces.append(piece)
+            elif piece:
+                pieces.append(piece.encode("utf-8"))
+        return cls(tuple(pieces))
+
+    @property
+    def slots(self) -> Tuple[str, ...]:
+        """Noms des emplacements restant à remplir"""
+        return tuple(self._positions)
+
+    def bind(self, **values) -> "CompiledTemplate":
+        """Nouveau template dont les emplacements donnés sont remplacés par leur valeur"""
+        pieces = []
+        for piece in self._pieces:
+            if isinstance(piece, str) and piece in values:
+                piece = _encode(values[piece])
+            if isinstance(piece, bytes) and pieces and isinstance(pieces[-1], bytes):
+                pieces[-1] += piece
+            elif piece != b"":
+                pieces.append(piece)
+        return CompiledTemplate(tuple(pieces))
+
+    def render(self, **values) -> bytes:
+        """Document UTF-8 ; les emplacements non fournis restent vides"""
+        parts = self._parts.copy()
+        positions = self._positions
+        for name, value in values.items():
+            value = _encode(value)
+            for i in positions.get(name, ()):
+                parts[i] = value
+        return b"".join(parts)
+
+
+@lru_cache(maxsize=None)
+def _css_styles() -> str:
+    """Styles CSS du template (construits une seule fois)"""
+    return """
         <style>
             /* Reset et base */
             * {
@@ -317,6 +408,81 @@ class EmailTemplate:
             }
         </style>
         """
+
+
+def _document_skeleton() -> str:
+    """Document complet dont les parties variables sont des emplacements nommés"""
+    return f"""
+<!DOCTYPE html>
+<html lang="fr">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <meta http-equiv="X-UA-Compatible" content="ie=edge">
+    <title>{_slot('title')}</title>
+    {_css_styles()}
+</head>
+<body>
+    <div class="email-container">
+        <!-- Header -->
+        <div class="header">
+            <img src="{_slot('logo_src')}" alt="Logo de l'association" class="logo">
+            <h1>{_slot('title')}</h1>
+            <div class="subtitle">Association Gamadji Saré</div>
+        </div>
+        
+        <!-- Contenu principal -->
+        <div class="content">
+            <!-- Texte -->
+            <div class="text-content">
+                {_slot('text')}
+            </div>
+            
+            <!-- Photos -->
+            {_slot('photos')}
+            
+            <!-- Vidéos -->
+            {_slot('videos')}
+        </div>
+        
+        <!-- Footer -->
+        <div class="footer">
+            <div class="association-name">Association Gamadji Saré</div>
+            <div class="timestamp">Généré le {_slot('timestamp')}</div>
+        </div>
+    </div>
+</body>
+</html>
+        """
+
+
+@lru_cache(maxsize=4)
+def _compiled_document(logo_src: str) -> "CompiledTemplate":
+    """Squelette compilé une fois par source de logo (data: ou cid:)"""
+    return CompiledTemplate.from_source(_document_skeleton().strip()).bind(logo_src=logo_src)
+
+
+class EmailTemplate:
+    """Générateur de templates HTML pour emails"""
+    
+    def __init__(self, logo_mode: str = "data", inline_css: bool = False):
+        """
+        Args:
+            logo_mode: "data" pour intégrer le logo en base64 dans le HTML (aperçu
+                       navigateur possible), "cid" pour le référencer comme pièce
+                       jointe inline (cid:) ajoutée à l'envoi
+            inline_css: Si True, recopie les styles dans l'attribut style de
+                        chaque élément (clients mail qui ignorent les blocs <style>)
+        """
+        self.inline_css = inline_css
+        self.css_styles = _css_styles()
+        self.logo_src = f"cid:{LOGO_CID}" if logo_mode == "cid" else logo_src()
+        # Squelette du document compilé une fois par processus, logo en place
+        self.compiled = _compiled_document(self.logo_src)
+    
+    def _get_css_styles(self) -> str:
+        """Retourne les styles CSS pour le template"""
+        return _css_styles()
     
     def _format_text_content(self, text: str) -> str:
         """Formate le texte en HTML en préservant les sauts de ligne"""
@@ -342,34 +508,15 @@ class EmailTemplate:
         
         photos_html = []
         for photo in photos:
-            # Générer plusieurs URLs de fallback
-            file_id = photo['id']
-            fallback_urls = [
-                photo['direct_url'],
-                f"https://drive.google.com/uc?export=view&id={file_id}",
-                f"https://drive.google.com/thumbnail?id={file_id}&sz=w800-h600",
-                photo['thumbnail_url']
-            ]
-            
-            # Script JavaScript pour essayer les URLs une par une
-            fallback_script = ""
-            for i, url in enumerate(fallback_urls[1:], 1):
-                fallback_script += f"if(this.dataset.fallback=='{i-1}') {{this.src='{url}'; this.dataset.fallback='{i}'; return;}} "
-            
+            # Une seule URL (miniature haute résolution) : les clients mail
+            # n'exécutent pas de JavaScript, un enchaînement d'URLs de secours
+            # (onerror) ne s'y déclencherait jamais. Valider les liens avec le
+            # testeur avant l'envoi.
             photo_html = f"""
             <div class="photo-item">
-                <img src="{fallback_urls[0]}" 
+                <img src="{photo['direct_url']}" 
                      alt="Photo {photo['info']['name']}" 
-                     data-fallback="0"
-                     onerror="{fallback_script}this.style.display='none'; this.nextElementSibling.style.display='block';" 
                      style="max-width: 100%; height: auto;" />
-                <div style="display: none; padding: 20px; text-align: center; background: #f8f9fa; border: 2px dashed #ddd; border-radius: 8px; color: #666;">
-                    <p>📷 Photo non disponible</p>
-                    <p style="font-size: 0.9em;">Vérifiez que le fichier Google Drive est partagé publiquement</p>
-                    <a href="https://drive.google.com/file/d/{file_id}/view" target="_blank" style="color: #d2691e; text-decoration: none;">
-                        🔗 Voir sur Google Drive
-                    </a>
-                </div>
             </div>
             """
             photos_html.append(photo_html)
@@ -427,48 +574,17 @@ class EmailTemplate:
         photos_section = self._generate_photos_html(photos)
         videos_section = self._generate_videos_html(videos)
         
-        # Template HTML complet
-        html_template = f"""
-<!DOCTYPE html>
-<html lang="fr">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <meta http-equiv="X-UA-Compatible" content="ie=edge">
-    <title>{title}</title>
-    {self.css_styles}
-</head>
-<body>
-    <div class="email-container">
-        <!-- Header -->
-        <div class="header">
-            <img src="{LOGO_SRC}" alt="Logo de l'association" class="logo">
-            <h1>{title}</h1>
-            <div class="subtitle">Association Gamadji Saré</div>
-        </div>
-        
-        <!-- Contenu principal -->
-        <div class="content">
-            <!-- Texte -->
-            <div class="text-content">
-                {formatted_text if formatted_text else '<p><em>Aucun texte fourni</em></p>'}
-            </div>
-            
-            <!-- Photos -->
-            {photos_section}
-            
-            <!-- Vidéos -->
-            {videos_section}
-        </div>
+        html_content = self.compiled.render(
+            title=title,
+            text=formatted_text if formatted_text else '<p><em>Aucun texte fourni</em></p>',
+            photos=photos_section,
+            videos=videos_section,
+            timestamp=timestamp
+        ).decode("utf-8")
         
-        <!-- Footer -->
-        <div class="footer">
-            <div class="association-name">Association Gamadji Saré</div>
-            <div class="timestamp">Généré le {timestamp}</div>
-        </div>
-    </div>
-</body>
-</html>
-        """
+        # Styles recopiés dans les balises (feuille compilée une fois par processus)
+        if self.inline_css:
+            from .css_inliner import inline_css
+            html_content = inline_css(html_content)
         
-        return html_template.strip()
\ No newline at end of file
+        return html_content
\ No newline at end of file
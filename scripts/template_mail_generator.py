@@ -15,17 +15,33 @@ import os
 import re
 from datetime import datetime
 from typing import List, Dict, Optional
-import requests
 from .utils import GoogleDriveUtils
 from .template_html import EmailTemplate
+from .template_catalog import get_catalog
+from .template_metadata import write_metadata
+from .template_optimizer import GMAIL_CLIP_SIZE, format_size_report, optimize_html
 
 
 class EmailTemplateGenerator:
-    """Générateur principal de templates d'emails"""
+    """
+    Générateur principal de templates d'emails
     
-    def __init__(self):
+    Args:
+        optimize: Si True, minifie le HTML et le CSS du template et retire le JavaScript
+        size_budget: Taille maximale souhaitée du template en octets
+                     (défaut: 102 Ko, seuil de troncature de Gmail ; 0 = pas de budget)
+        inline_css: Si True, recopie les styles CSS dans les balises (attribut style)
+                    pour les clients mail qui ignorent les blocs <style>
+    """
+    
+    def __init__(self, optimize: bool = True, size_budget: int = GMAIL_CLIP_SIZE,
+                 inline_css: bool = True):
         self.google_utils = GoogleDriveUtils()
-        self.template = EmailTemplate()
+        self.template = EmailTemplate(inline_css=inline_css)
+        self.optimize = optimize
+        self.size_budget = size_budget
+        # Rapport de la dernière optimisation (tailles, éléments retirés, budget)
+        self.last_report: Optional[Dict] = None
         
     def collect_user_input(self) -> Dict:
         """Collecte les informations saisies par l'utilisateur de manière interactive"""
@@ -39,6 +55,7 @@ class EmailTemplateGenerator:
         # Texte principal
         print("\n📝 Texte de l'email :")
         print("   (Tapez votre texte. Appuyez sur Entrée deux fois pour terminer)")
+        print("   ({{name}} et {{email}} sont remplacés par le nom et l'email de chaque destinataire)")
         text_lines = []
         empty_line_count = 0
         
@@ -118,10 +135,16 @@ class EmailTemplateGenerator:
             timestamp=data['timestamp']
         )
         
+        # Optimisation : chaque octet est envoyé à chaque destinataire
+        if self.optimize:
+            html_content, self.last_report = optimize_html(html_content, self.size_budget)
+            print(format_size_report(self.last_report))
+        
         return html_content
     
-    def save_html(self, html_content: str, filename: Optional[str] = None) -> str:
-        """Sauvegarde le HTML généré dans un fichier"""
+    def save_html(self, html_content: str, filename: Optional[str] = None,
+                  title: Optional[str] = None) -> str:
+        """Sauvegarde le HTML généré dans un fichier, avec son fichier de métadonnées (.json)"""
         if not filename:
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
             filename = f"email_template_{timestamp}.html"
@@ -135,6 +158,11 @@ class EmailTemplateGenerator:
         with open(filepath, 'w', encoding='utf-8') as f:
             f.write(html_content)
         
+        # Titre et empreinte lus par l'expéditeur sans analyser le HTML,
+        # puis ajout au catalogue des templates du dossier
+        metadata = write_metadata(filepath, html_content, title)
+        get_catalog(output_dir).add(filepath, metadata)
+        
         return filepath
     
     def run(self):
@@ -147,7 +175,7 @@ class EmailTemplateGenerator:
             html_content = self.generate_html(data)
             
             # Sauvegarde
-            filepath = self.save_html(html_content)
+            filepath = self.save_html(html_content, title=data['title'])
             
             print(f"\n✅ Template généré avec succès !")
             print(f"📁 Fichier sauvegardé : {filepath}")
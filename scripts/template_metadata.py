@@ -0,0 +1,90 @@
+"""
+Métadonnées des templates HTML (fichier compagnon JSON)
+Association Gamadji Saré
+
+Chaque template email_template_*.html est accompagné d'un fichier
+email_template_*.json écrit à la génération : titre (objet du mail),
+empreinte SHA-256 du contenu, taille, nombre de photos et de vidéos, date
+de création. L'expéditeur y lit le titre sans analyser le HTML ; pour les
+anciens templates sans fichier compagnon, une simple expression régulière
+remplace l'analyse complète du document.
+"""
+
+import hashlib
+import html
+import json
+import os
+import re
+from datetime import datetime
+from typing import Dict, Optional
+
+DEFAULT_TITLE = "Association Gamadji - Informations"
+
+_HEADER_H1 = re.compile(r'<div class="header"[^>]*>.*?<h1[^>]*>(.*?)</h1>', re.S | re.I)
+_TITLE_TAG = re.compile(r'<title[^>]*>(.*?)</title>', re.S | re.I)
+_TAGS = re.compile(r'<[^>]+>')
+
+
+def sidecar_path(template_path: str) -> str:
+    """Chemin du fichier de métadonnées associé à un template"""
+    return os.path.splitext(str(template_path))[0] + ".json"
+
+
+def extract_title(html_content: str) -> str:
+    """Extrait le titre h1 de l'en-tête du template (ou le <title> à défaut)"""
+    for pattern in (_HEADER_H1, _TITLE_TAG):
+        match = pattern.search(html_content)
+        if match:
+            title = html.unescape(_TAGS.sub("", match.group(1))).strip()
+            if title:
+                return title
+
+    # Fallback sur le titre généré
+    return DEFAULT_TITLE
+
+
+def build_metadata(html_content: str, title: Optional[str] = None) -> Dict:
+    """Construit les métadonnées d'un template"""
+    encoded = html_content.encode("utf-8")
+    return {
+        "title": title or extract_title(html_content),
+        "sha256": hashlib.sha256(encoded).hexdigest(),
+        "size": len(encoded),
+        "photos": html_content.count('class="photo-item"'),
+        "videos": html_content.count('class="video-item"'),
+        "created": datetime.now().isoformat(timespec="seconds"),
+    }
+
+
+def write_metadata(template_path: str, html_content: str, title: Optional[str] = None) -> Dict:
+    """Écrit le fichier de métadonnées d'un template et le retourne"""
+    metadata = build_metadata(html_content, title)
+    with open(sidecar_path(template_path), "w", encoding="utf-8") as f:
+        json.dump(metadata, f, ensure_ascii=False, indent=2)
+    return metadata
+
+
+def read_metadata(template_path: str) -> Optional[Dict]:
+    """
+    Lit les métadonnées d'un template.
+
+    Returns:
+        dict ou None si le fichier compagnon est absent, illisible, ou ne
+        correspond plus au template (taille différente : template modifié)
+    """
+    try:
+        with open(sidecar_path(template_path), "r", encoding="utf-8") as f:
+            metadata = json.load(f)
+        if metadata.get("size") != os.path.getsize(template_path):
+            return None
+        return metadata
+    except (OSError, ValueError):
+        return None
+
+
+def template_title(template_path: str, html_content: str) -> str:
+    """Titre d'un template : fichier compagnon, sinon extraction depuis le HTML"""
+    metadata = read_metadata(template_path)
+    if metadata and metadata.get("title"):
+        return metadata["title"]
+    return extract_title(html_content)
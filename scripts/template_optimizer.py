@@ -0,0 +1,421 @@
+"""
+Optimisation des templates HTML avant leur sauvegarde
+Association Gamadji Saré
+
+Chaque octet du template est envoyé à chaque destinataire. Cette étape
+allège le document produit par EmailTemplate :
+- HTML : commentaires et indentation supprimés, espaces des textes réduits ;
+- CSS : commentaires et espaces supprimés, règles dont aucun sélecteur ne
+  correspond à un élément du document retirées ;
+- JavaScript : balises <script> et attributs on* (onerror, onclick...)
+  retirés, les clients mail ne les exécutent pas.
+
+La taille finale est comparée à un budget : Gmail tronque l'affichage des
+messages dont le HTML dépasse 102 Ko.
+"""
+
+import re
+from functools import lru_cache
+from html.parser import HTMLParser
+from typing import Dict, List, Set, Tuple
+
+# Taille au-delà de laquelle Gmail tronque le message ("[Message tronqué]")
+GMAIL_CLIP_SIZE = 102 * 1024
+
+# Balises autour desquelles les espaces n'ont aucun effet sur le rendu
+BLOCK_TAGS = frozenset({
+    "html", "head", "body", "title", "meta", "link", "style", "script", "base",
+    "div", "p", "h1", "h2", "h3", "h4", "h5", "h6", "hr", "br", "center",
+    "table", "thead", "tbody", "tfoot", "tr", "td", "th", "caption", "colgroup", "col",
+    "ul", "ol", "li", "dl", "dt", "dd", "blockquote", "pre", "form",
+    "section", "header", "footer", "article", "aside", "nav", "main", "figure", "figcaption",
+})
+
+# Éléments sans balise fermante
+VOID_TAGS = frozenset({
+    "area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta",
+    "source", "track", "wbr",
+})
+
+# Éléments dont le contenu est gardé tel quel
+PRESERVE_TAGS = frozenset({"pre", "textarea"})
+
+# Groupes de règles CSS dont le contenu est lui-même une liste de règles
+CSS_GROUP_RULES = ("@media", "@supports", "@document")
+
+_WHITESPACE = re.compile(r"\s+")
+# Chaîne, commentaire, espaces ou texte ordinaire (un seul groupe non vide par jeton)
+_CSS_TOKENS = re.compile(r"""("(?:\\.|[^"\\])*"?|'(?:\\.|[^'\\])*'?)|(/\*.*?(?:\*/|$))|(\s+)|([{};,]|[^"'/\s{};,]+|/)""", re.S)
+_AMBIGUOUS_AMPERSAND = re.compile(r"&(?=#|[A-Za-z0-9]+;)")
+_SELECTOR_ARGUMENTS = re.compile(r"\[[^\]]*\]|\([^)]*\)")
+_SELECTOR_CLASS = re.compile(r"\.(-?[_a-zA-Z][\w-]*)")
+_SELECTOR_ID = re.compile(r"#(-?[_a-zA-Z][\w-]*)")
+_SELECTOR_TYPE = re.compile(r"(?:^|[\s>+~])([a-zA-Z][\w-]*)")
+
+
+# CSS
+
+def _compact_css(css: str) -> str:
+    """Supprime les commentaires et les espaces superflus (chaînes préservées)"""
+    out = []
+    space = False
+    for string, comment, blank, text in _CSS_TOKENS.findall(css):
+        if blank or comment:
+            space = True
+            continue
+        token = string or text
+        if space and out and out[-1][-1] not in "{};," and token[0] not in "{};,":
+            out.append(" ")
+        space = False
+        out.append(token)
+    return "".join(out)
+
+
+def _find(css: str, start: int, chars: str) -> int:
+    """Position du premier caractère de chars hors chaînes et parenthèses (-1 si absent)"""
+    depth = 0
+    i, n = start, len(css)
+    while i < n:
+        char = css[i]
+        if char in "\"'":
+            i += 1
+            while i < n and css[i] != char:
+                i += 2 if css[i] == "\\" else 1
+        elif char == "(":
+            depth += 1
+        elif char == ")":
+            depth = max(0, depth - 1)
+        elif depth == 0 and char in chars:
+            return i
+        i += 1
+    return -1
+
+
+def _split(text: str, separator: str) -> List[str]:
+    """Découpe text sur separator, hors chaînes et parenthèses"""
+    parts = []
+    start = 0
+    while True:
+        end = _find(text, start, separator)
+        if end < 0:
+            parts.append(text[start:])
+            return parts
+        parts.append(text[start:end])
+        start = end + 1
+
+
+def _matching_brace(css: str, start: int) -> int:
+    """Position de l'accolade fermant le bloc ouvert juste avant start"""
+    depth = 1
+    i = start
+    while depth:
+        i = _find(css, i, "{}")
+        if i < 0:
+            return len(css)
+        depth += 1 if css[i] == "{" else -1
+        i += 1
+    return i - 1
+
+
+def parse_css(css: str) -> List[Tuple]:
+    """
+    Analyse une feuille de style en une liste d'éléments :
+    ('rule', sélecteurs, déclarations), ('group', prélude, éléments) pour
+    @media et @supports, ('raw', texte) pour les autres règles @.
+    """
+    items, _ = _parse_block(_compact_css(css), 0)
+    return items
+
+
+def _parse_block(css: str, i: int) -> Tuple[List[Tuple], int]:
+    items = []
+    while i < len(css):
+        end = _find(css, i, "{};")
+        if end < 0:
+            break
+        prelude = css[i:end].strip()
+        if css[end] == "}":
+            return items, end + 1
+        if css[end] == ";":
+            if prelude:
+                items.append(('raw', prelude + ";"))
+            i = end + 1
+        elif prelude.lower().startswith(CSS_GROUP_RULES):
+            children, i = _parse_block(css, end + 1)
+            items.append(('group', prelude, children))
+        elif prelude.startswith("@"):
+            close = _matching_brace(css, end + 1)
+            items.append(('raw', css[i:close + 1].strip()))
+            i = close + 1
+        else:
+            close = _matching_brace(css, end + 1)
+            items.append(('rule', prelude, css[end + 1:close]))
+            i = close + 1
+    return items, len(css)
+
+
+def parse_declarations(declarations: str) -> List[Tuple[str, str]]:
+    """Découpe une liste de déclarations en couples (propriété, valeur) minifiés"""
+    parsed = []
+    for declaration in _split(_compact_css(declarations), ";"):
+        prop, sep, value = declaration.partition(":")
+        if sep and prop.strip() and value.strip():
+            parsed.append((prop.strip(), value.strip().replace(" !important", "!important")))
+    return parsed
+
+
+@lru_cache(maxsize=2048)
+def minify_declarations(declarations: str) -> str:
+    """Minifie une liste de déclarations ('color: red; margin: 0 auto;' -> 'color:red;margin:0 auto')"""
+    return ";".join(f"{prop}:{value}" for prop, value in parse_declarations(declarations))
+
+
+class _UsedNames:
+    """Balises, classes et identifiants présents dans un document"""
+
+    def __init__(self):
+        self.tags: Set[str] = {"html", "body"}
+        self.classes: Set[str] = set()
+        self.ids: Set[str] = set()
+
+    def matches(self, selector: str) -> bool:
+        """Indique si un sélecteur peut correspondre à un élément du document"""
+        selector = _SELECTOR_ARGUMENTS.sub("", selector)
+        return (all(name in self.classes for name in _SELECTOR_CLASS.findall(selector))
+                and all(name in self.ids for name in _SELECTOR_ID.findall(selector))
+                and all(name.lower() in self.tags for name in _SELECTOR_TYPE.findall(selector)))
+
+
+def _serialize_css(items: List[Tuple], used, stats: Dict) -> str:
+    out = []
+    for item in items:
+        if item[0] == 'rule':
+            selectors = [s.strip() for s in _split(item[1], ",")]
+            if used is not None:
+                kept = [s for s in selectors if used.matches(s)]
+                stats['selectors'] += len(selectors) - len(kept)
+                selectors = kept
+            declarations = minify_declarations(item[2])
+            if selectors and declarations:
+                out.append(f"{','.join(selectors)}{{{declarations}}}")
+        elif item[0] == 'group':
+            body = _serialize_css(item[2], used, stats)
+            if body:
+                out.append(f"{item[1].replace(': ', ':')}{{{body}}}")
+        else:
+            out.append(item[1])
+    return "".join(out)
+
+
+def serialize_css(items: List[Tuple]) -> str:
+    """Feuille de style minifiée à partir des éléments produits par parse_css()"""
+    return _serialize_css(items, None, {'selectors': 0})
+
+
+def minify_css(css: str, used=None, stats=None) -> str:
+    """
+    Minifie une feuille de style ; si used (noms présents dans le document)
+    est fourni, les sélecteurs qui n'y correspondent pas sont retirés.
+    """
+    stats = stats if stats is not None else {'selectors': 0}
+    return _serialize_css(parse_css(css), used, stats)
+
+
+# HTML
+
+class _Tokenizer(HTMLParser):
+    """Découpe un document en éléments, sans scripts, en relevant les noms utilisés"""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=False)
+        self.tokens: List[Tuple] = []
+        self.used = _UsedNames()
+        self.handlers = 0  # attributs on* et balises <script> retirés
+        self._script = 0
+        self._style = 0
+        self._preserve = 0
+
+    def _start(self, tag, attrs, closed):
+        if tag == "script":
+            self.handlers += 1
+            self._script += not closed
+            return
+        if self._script:
+            return
+        kept = []
+        for name, value in attrs:
+            if name.startswith("on"):
+                self.handlers += 1
+                continue
+            if name == "class" and value:
+                self.used.classes.update(value.split())
+            elif name == "id" and value:
+                self.used.ids.add(value)
+            kept.append((name, value))
+        self.used.tags.add(tag)
+        self.tokens.append(('start', tag, kept, closed))
+        if not closed and tag not in VOID_TAGS:
+            self._style += tag == "style"
+            self._preserve += tag in PRESERVE_TAGS
+
+    def handle_starttag(self, tag, attrs):
+        self._start(tag, attrs, False)
+
+    def handle_startendtag(self, tag, attrs):
+        self._start(tag, attrs, True)
+
+    def handle_endtag(self, tag):
+        if tag == "script":
+            self._script = max(0, self._script - 1)
+            return
+        if self._script:
+            return
+        if tag == "style":
+            self._style = max(0, self._style - 1)
+        elif tag in PRESERVE_TAGS:
+            self._preserve = max(0, self._preserve - 1)
+        self.tokens.append(('end', tag))
+
+    def handle_data(self, data):
+        if self._script:
+            return
+        if self._style:
+            self.tokens.append(('style', data))
+        else:
+            self.tokens.append(('raw' if self._preserve else 'text', data))
+
+    def handle_entityref(self, name):
+        if not self._script:
+            self.tokens.append(('raw', f"&{name};"))
+
+    def handle_charref(self, name):
+        if not self._script:
+            self.tokens.append(('raw', f"&#{name};"))
+
+    def handle_comment(self, data):
+        # Seuls les commentaires conditionnels (Outlook) ont un effet
+        if not self._script and (data.lstrip().startswith("[if") or data.rstrip().endswith("<![endif]")):
+            self.tokens.append(('raw', f"<!--{data}-->"))
+
+    def handle_decl(self, decl):
+        self.tokens.append(('decl', f"<!{decl}>"))
+
+    def unknown_decl(self, data):
+        self.tokens.append(('raw', f"<![{data}]>"))
+
+
+def format_attribute(name: str, value, minify: bool = True) -> str:
+    """Attribut sérialisé (' name="valeur"'), style minifié si minify=True"""
+    if value is None:
+        return f" {name}"
+    if name == "style" and minify:
+        value = minify_declarations(value)
+    elif name == "class":
+        value = " ".join(value.split())
+    value = _AMBIGUOUS_AMPERSAND.sub("&amp;", value).replace('"', "&quot;")
+    return f' {name}="{value}"'
+
+
+def _serialize_html(tokens: List[Tuple], used, stats: Dict) -> str:
+    out = []
+    pending_space = False  # espace en attente entre deux contenus en ligne
+    at_block = True        # dernier élément émis : limite de bloc (les espaces n'y comptent pas)
+
+    for token in tokens:
+        kind = token[0]
+        if kind in ('start', 'end'):
+            tag = token[1]
+            if tag in BLOCK_TAGS:
+                at_block = True
+            elif pending_space and not at_block:
+                out.append(" ")
+            else:
+                at_block = False
+            pending_space = False
+            if kind == 'start':
+                attributes = "".join(format_attribute(name, value) for name, value in token[2])
+                closing = " /" if token[3] and tag not in VOID_TAGS else ""
+                out.append(f"<{tag}{attributes}{closing}>")
+            else:
+                out.append(f"</{tag}>")
+        elif kind == 'text':
+            text = _WHITESPACE.sub(" ", token[1])
+            core = text.strip(" ")
+            if not core:
+                pending_space = pending_space or bool(text)
+                continue
+            if (pending_space or text[0] == " ") and not at_block:
+                out.append(" ")
+            out.append(core)
+            pending_space = text[-1] == " "
+            at_block = False
+        elif kind == 'style':
+            out.append(minify_css(token[1], used, stats))
+        elif kind == 'decl':
+            out.append(token[1])
+            pending_space = False
+            at_block = True
+        else:
+            if pending_space and not at_block:
+                out.append(" ")
+            out.append(token[1])
+            pending_space = at_block = False
+    return "".join(out)
+
+
+def minify_html(html_content: str, drop_unused_css: bool = True) -> Tuple[str, Dict]:
+    """
+    Minifie un document HTML (et ses feuilles de style), sans JavaScript.
+
+    Returns:
+        tuple: (HTML minifié, {'selectors': sélecteurs CSS retirés,
+                               'handlers': scripts et attributs on* retirés})
+    """
+    tokenizer = _Tokenizer()
+    tokenizer.feed(html_content)
+    tokenizer.close()
+    stats = {'selectors': 0, 'handlers': tokenizer.handlers}
+    used = tokenizer.used if drop_unused_css else None
+    return _serialize_html(tokenizer.tokens, used, stats), stats
+
+
+def optimize_html(html_content: str, size_budget: int = GMAIL_CLIP_SIZE) -> Tuple[str, Dict]:
+    """
+    Minifie un template et mesure sa taille.
+
+    Returns:
+        tuple: (HTML optimisé, rapport : original, size, budget, over_budget,
+                selectors, handlers)
+    """
+    optimized, stats = minify_html(html_content)
+    size = len(optimized.encode("utf-8"))
+    report = {
+        'original': len(html_content.encode("utf-8")),
+        'size': size,
+        'budget': size_budget,
+        'over_budget': bool(size_budget) and size > size_budget,
+        **stats,
+    }
+    return optimized, report
+
+
+def format_size_report(report: Dict) -> str:
+    """Résumé lisible d'une optimisation"""
+    saved = 1 - report['size'] / report['original'] if report['original'] else 0.0
+    lines = [f"📦 Template optimisé : {report['original'] / 1024:.1f} Ko → "
+             f"{report['size'] / 1024:.1f} Ko (-{saved:.0%})"]
+    removed = []
+    if report['selectors']:
+        removed.append(f"{report['selectors']} sélecteur(s) CSS inutilisé(s)")
+    if report['handlers']:
+        removed.append(f"{report['handlers']} script(s) JavaScript")
+    if removed:
+        lines.append(f"   Retirés : {', '.join(removed)}")
+    if report['budget']:
+        if report['over_budget']:
+            clipped = " ; Gmail risque de tronquer le message" if report['size'] > GMAIL_CLIP_SIZE else ""
+            lines.append(f"⚠️  {report['size'] / 1024:.1f} Ko dépasse le budget de "
+                         f"{report['budget'] / 1024:.0f} Ko{clipped} (réduisez le texte ou le nombre de médias)")
+        else:
+            lines.append(f"✅ {report['size'] / 1024:.1f} Ko sur un budget de {report['budget'] / 1024:.0f} Ko")
+    return "\n".join(lines)
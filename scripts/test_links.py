@@ -7,7 +7,6 @@ Script pour tester et valider les liens Google Drive avant de générer un templ
 """
 
 from .utils import GoogleDriveUtils
-import requests
 
 
 class GoogleDriveTester:
@@ -18,6 +17,8 @@ class GoogleDriveTester:
     
     def test_photo_urls(self, file_id: str) -> dict:
         """Teste différentes URLs pour une photo et retourne les résultats"""
+        import requests
+
         urls_to_test = {
             'Thumbnail (nouveau)': f"https://drive.google.com/thumbnail?id={file_id}&sz=w1000-h1000",
             'UC Export': f"https://drive.google.com/uc?export=view&id={file_id}",
@@ -53,6 +54,8 @@ class GoogleDriveTester:
     
     def test_video_urls(self, file_id: str) -> dict:
         """Teste les URLs pour une vidéo"""
+        import requests
+
         urls_to_test = {
             'Thumbnail vidéo': f"https://drive.google.com/thumbnail?id={file_id}&sz=w480-h360",
             'Lien direct': f"https://drive.google.com/file/d/{file_id}/view",
@@ -6,7 +6,6 @@ Fonctions pour traiter les liens Google Drive et extraire les informations néce
 """
 
 import re
-import requests
 from typing import Dict, Optional
 from urllib.parse import urlparse, parse_qs
 
@@ -116,6 +115,8 @@ class GoogleDriveUtils:
     @staticmethod
     def test_link_accessibility(url: str) -> bool:
         """Teste si un lien est accessible publiquement"""
+        import requests  # chargé à la demande : coûteux au démarrage
+
         try:
             response = requests.head(url, timeout=5)
             return response.status_code == 200
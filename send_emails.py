@@ -35,8 +35,14 @@ def main():
     print("   ⚠️  Peut prendre beaucoup de temps (200+ destinataires)")
     print("   ✅ Ne nécessite pas de configuration supplémentaire")
     print()
+    print("4) ⚡ Envoi CONCURRENT (asyncio)")
+    print("   ✅ Plusieurs sessions SMTP en parallèle depuis un seul processus")
+    print("   ✅ Débit global limité (emails/minute) pour respecter le relais SMTP")
+    print("   ✅ Ne nécessite ni Redis ni worker Celery")
+    print("   ⏳ Bloquant - attend la fin de tous les envois")
+    print()
     
-    choice = input("Votre choix (1-3, défaut 1) : ").strip()
+    choice = input("Votre choix (1-4, défaut 1) : ").strip()
     choice = choice if choice else "1"
     
     try:
@@ -94,7 +100,14 @@ def main():
             delay_input = input("Délai entre chaque email en secondes (défaut: 5) : ").strip()
             delay = int(delay_input) if delay_input.isdigit() else 5
             
-            result = sender.send_bulk_emails_async(delay_between_emails=delay)
+            # Envoi par lots (une tâche et une session SMTP pour N destinataires)
+            batch_input = input("Taille des lots (1 = une tâche par email, défaut: 50) : ").strip()
+            batch_size = int(batch_input) if batch_input.isdigit() and int(batch_input) > 0 else 50
+            
+            result = sender.send_bulk_emails_async(
+                delay_between_emails=delay,
+                batch_size=batch_size
+            )
             
             if result.get('status') == 'scheduled':
                 print()
@@ -172,6 +185,10 @@ def main():
             delay_input = input("Délai entre chaque email en secondes (défaut: 1 pour test) : ").strip()
             delay = int(delay_input) if delay_input.isdigit() else 1
             
+            # Envoi par lots (une tâche pour N destinataires)
+            batch_input = input("Taille des lots (1 = une tâche par email, défaut: 50) : ").strip()
+            batch_size = int(batch_input) if batch_input.isdigit() and int(batch_input) > 0 else 50
+            
             print()
             print("🧪 Lancement du TEST asynchrone...")
             print("💡 Aucun email ne sera réellement envoyé")
@@ -179,7 +196,8 @@ def main():
             result = sender.send_bulk_emails_async(
                 delay_between_emails=delay,
                 dry_run=True,
-                limit=limit
+                limit=limit,
+                batch_size=batch_size
             )
             
             if result.get('status') == 'scheduled':
@@ -227,8 +245,50 @@ def main():
             else:
                 print("❌ Envoi annulé")
         
+        elif choice == "4":
+            print()
+            print("⚡ MODE CONCURRENT SÉLECTIONNÉ")
+            print("-" * 60)
+            
+            try:
+                import aiosmtplib
+                print("✅ aiosmtplib est installé")
+            except ImportError as e:
+                print(f"❌ Dépendance manquante: {e}")
+                print("💡 Installez les dépendances: pip install -r requirements.txt")
+                return
+            
+            default_concurrency = sender.env_vars.get("ASYNC_SMTP_CONCURRENCY", "4")
+            concurrency_input = input(f"Nombre de sessions SMTP simultanées (défaut: {default_concurrency}) : ").strip()
+            concurrency = int(concurrency_input) if concurrency_input.isdigit() and int(concurrency_input) > 0 else int(default_concurrency)
+            
+            default_rate = sender.env_vars.get("ASYNC_RATE_PER_MINUTE", "60")
+            rate_input = input(f"Débit maximum en emails par minute (0 = illimité, défaut: {default_rate}) : ").strip()
+            rate = int(rate_input) if rate_input.isdigit() else float(default_rate)
+            
+            response = input("Lancer l'envoi concurrent? (o/n) : ").strip().lower()
+            
+            if response in ['o', 'oui', 'y', 'yes']:
+                print()
+                print("📬 Démarrage de l'envoi concurrent...")
+                print()
+                stats = sender.send_bulk_emails_asyncio(concurrency=concurrency, rate_per_minute=rate)
+                
+                if stats.get('status') == 'completed':
+                    print()
+                    print("=" * 60)
+                    print(f"✅ {stats['sent']} EMAILS ENVOYÉS en {stats['elapsed']:.1f} s "
+                          f"({stats['rate_per_second'] * 60:.1f} emails/minute)")
+                    if stats['failed']:
+                        print(f"❌ {len(stats['failed'])} échec(s): {', '.join(stats['failed'][:10])}")
+                    print("=" * 60)
+                else:
+                    print(f"❌ {stats.get('message', 'Erreur inconnue')}")
+            else:
+                print("❌ Envoi annulé")
+        
         else:
-            print("❌ Choix invalide. Veuillez choisir 1, 2 ou 3.")
+            print("❌ Choix invalide. Veuillez choisir 1, 2, 3 ou 4.")
     
     except KeyboardInterrupt:
         print("\n\n❌ Envoi annulé par l'utilisateur")